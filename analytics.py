@@ -0,0 +1,320 @@
+# analytics.py - Reportes de ventas sobre agregados diarios materializados
+#
+#   flask analitica refrescar             # sólo los días con pedidos nuevos o modificados
+#   flask analitica refrescar --completo  # recalcula todo (p. ej. tras borrar pedidos)
+#
+# El refresco lee pedidos e ítems en bloques con un cursor del lado del
+# servidor, los convierte en DataFrames y agrega por día y restaurante con
+# operaciones vectorizadas. El resultado reemplaza las filas de esos días en
+# ventas_diarias, ventas_diarias_items y entregas_diarias; los reportes sólo
+# leen esas tablas. pandas y numpy se importan dentro de las funciones: los
+# workers web que nunca refrescan no los cargan.
+from datetime import date, datetime, timedelta
+
+import click
+from flask import Blueprint, jsonify, request, abort
+from sqlalchemy import and_, func, or_, select
+
+from auth import requiere_admin
+from models import (db, Pedido, PedidoItem, ConfiguracionSistema, VentaDiaria, VentaDiariaItem,
+                    EntregaDiaria)
+
+analytics_bp = Blueprint('analytics', __name__, cli_group='analitica')
+
+ESTADOS = ('pendiente', 'preparando', 'enviado', 'entregado', 'cancelado', 'rechazado')
+# Columna de ventas_diarias para cada estado
+COLUMNAS_ESTADO = dict(zip(ESTADOS, ('pendientes', 'preparando', 'enviados', 'entregados', 'cancelados',
+                                     'rechazados')))
+SIN_VENTA = ('cancelado', 'rechazado')
+# Límites superiores (minutos) de cada tramo de tiempo de entrega; el último es abierto
+TRAMOS_ENTREGA = (10, 20, 30, 40, 50, 60, 75, 90, 120, 180, None)
+
+CLAVE_MARCA = 'analitica.ultima_actualizacion'
+
+
+# ====================================================
+# REFRESCO
+# ====================================================
+
+def _marca():
+    registro = ConfiguracionSistema.query.filter_by(clave=CLAVE_MARCA).first()
+    return datetime.fromisoformat(registro.valor) if registro and registro.valor else None
+
+
+def _guardar_marca(momento):
+    registro = ConfiguracionSistema.query.filter_by(clave=CLAVE_MARCA).first()
+    if registro is None:
+        registro = ConfiguracionSistema(clave=CLAVE_MARCA, tipo='texto', grupo='analitica', editable=False,
+                                        descripcion='Inicio del último refresco de los agregados de ventas')
+        db.session.add(registro)
+    registro.valor = momento.isoformat()
+
+
+def _a_fecha(valor):
+    # func.date() devuelve texto en SQLite y date en MySQL
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+def _dias_pendientes(desde):
+    # Días (de fecha_pedido) con algún pedido creado o modificado después de "desde"
+    consulta = db.session.query(func.date(Pedido.fecha_pedido)).distinct()
+    if desde is not None:
+        consulta = consulta.filter(or_(Pedido.updated_at > desde, Pedido.created_at > desde))
+    return sorted({_a_fecha(dia) for dia, in consulta if dia is not None})
+
+
+def _rangos(dias, hueco=7):
+    # Una lectura por tramo de días cercanos: con hueco=1, [d1, d2, d3, d9] ->
+    # [(d1, d3), (d9, d9)]. Los días intermedios sin cambios se recalculan
+    # igual (dan lo mismo) y se ahorran lecturas.
+    rangos = []
+    for dia in dias:
+        if rangos and dia - rangos[-1][1] <= timedelta(days=hueco):
+            rangos[-1][1] = dia
+        else:
+            rangos.append([dia, dia])
+    return [tuple(r) for r in rangos]
+
+
+def _bloques(conexion, consulta, tamano_bloque):
+    import pandas as pd
+    for bloque in pd.read_sql(consulta, conexion, chunksize=tamano_bloque):
+        if not bloque.empty:
+            yield bloque
+
+
+def _agregar_pedidos(bloque):
+    import numpy as np
+    import pandas as pd
+
+    bloque['fecha'] = pd.to_datetime(bloque['fecha_pedido']).dt.date
+    con_venta = ~bloque['estado'].isin(SIN_VENTA)
+    bloque['pedidos'] = 1
+    bloque['ingresos'] = bloque['total'].astype(float).where(con_venta, 0.0)
+    bloque['descuentos'] = bloque['descuento'].fillna(0).astype(float).where(con_venta, 0.0)
+    for estado, columna in COLUMNAS_ESTADO.items():
+        bloque[columna] = (bloque['estado'] == estado).astype(int)
+
+    demora = pd.to_datetime(bloque['fecha_entrega']) - pd.to_datetime(bloque['fecha_pedido'])
+    minutos = demora.dt.total_seconds() / 60
+    medidos = minutos.notna() & (minutos >= 0) & (bloque['estado'] == 'entregado')
+    bloque['entregas_medidas'] = medidos.astype(int)
+    bloque['minutos_entrega'] = minutos.where(medidos, 0).round().astype('int64')
+
+    claves = ['fecha', 'restaurante_id']
+    ventas = bloque.groupby(claves)[['pedidos', *COLUMNAS_ESTADO.values(), 'ingresos', 'descuentos',
+                                     'entregas_medidas', 'minutos_entrega']].sum()
+
+    limites = np.array([t for t in TRAMOS_ENTREGA if t is not None])
+    entregas = bloque.loc[medidos, claves].copy()
+    entregas['tramo'] = np.searchsorted(limites, minutos[medidos].to_numpy(), side='left')
+    entregas = entregas.groupby([*claves, 'tramo']).size().rename('pedidos').to_frame()
+    return ventas, entregas
+
+
+def _agregar_items(bloque):
+    import pandas as pd
+
+    bloque['fecha'] = pd.to_datetime(bloque['fecha_pedido']).dt.date
+    bloque['ingresos'] = bloque['subtotal'].astype(float)
+    bloque['menu_item_id'] = bloque['menu_item_id'].astype('Int64')
+    return bloque.groupby(['fecha', 'restaurante_id', 'menu_item_id', 'nombre_item'], dropna=False)[
+        ['cantidad', 'ingresos']].sum()
+
+
+def _combinar(partes):
+    # Las sumas parciales de cada bloque se vuelven a sumar: un día puede
+    # quedar repartido entre dos bloques
+    import pandas as pd
+    if not partes:
+        return None
+    return pd.concat(partes).groupby(level=list(range(partes[0].index.nlevels)), dropna=False).sum()
+
+
+def _entero(valor):
+    return None if valor is None or valor != valor else int(valor)  # NaN/NA -> None
+
+
+def _refrescar_rango(conexion, desde, hasta, tamano_bloque):
+    inicio, fin = datetime.combine(desde, datetime.min.time()), datetime.combine(hasta + timedelta(days=1),
+                                                                                  datetime.min.time())
+    en_rango = and_(Pedido.fecha_pedido >= inicio, Pedido.fecha_pedido < fin)
+
+    partes_ventas, partes_entregas, partes_items = [], [], []
+    pedidos = select(Pedido.fecha_pedido, Pedido.fecha_entrega, Pedido.restaurante_id, Pedido.estado,
+                     Pedido.total, Pedido.descuento).where(en_rango)
+    for bloque in _bloques(conexion, pedidos, tamano_bloque):
+        ventas, entregas = _agregar_pedidos(bloque)
+        partes_ventas.append(ventas)
+        partes_entregas.append(entregas)
+    items = (select(Pedido.fecha_pedido, Pedido.restaurante_id, PedidoItem.menu_item_id, PedidoItem.nombre_item,
+                    PedidoItem.cantidad, PedidoItem.subtotal)
+             .join(Pedido, Pedido.id == PedidoItem.pedido_id)
+             .where(en_rango, Pedido.estado.notin_(SIN_VENTA)))
+    for bloque in _bloques(conexion, items, tamano_bloque):
+        partes_items.append(_agregar_items(bloque))
+
+    ventas = _combinar(partes_ventas)
+    entregas = _combinar(partes_entregas)
+    items = _combinar(partes_items)
+    if ventas is not None and items is not None:
+        vendidos = items['cantidad'].groupby(level=['fecha', 'restaurante_id']).sum()
+        ventas['items_vendidos'] = vendidos.reindex(ventas.index, fill_value=0)
+
+    # Reemplazo de los días del rango en una transacción
+    for modelo in (VentaDiaria, VentaDiariaItem, EntregaDiaria):
+        db.session.query(modelo).filter(modelo.fecha >= desde, modelo.fecha <= hasta).delete(
+            synchronize_session=False)
+    ahora = datetime.utcnow()
+    if ventas is not None:
+        filas = []
+        for (fecha, restaurante_id), fila in ventas.iterrows():
+            registro = {columna: int(fila[columna]) for columna in
+                        ('pedidos', *COLUMNAS_ESTADO.values(), 'entregas_medidas', 'minutos_entrega')}
+            registro.update(fecha=fecha, restaurante_id=int(restaurante_id), updated_at=ahora,
+                            ingresos=round(float(fila['ingresos']), 2),
+                            descuentos=round(float(fila['descuentos']), 2),
+                            items_vendidos=int(fila.get('items_vendidos', 0)))
+            filas.append(registro)
+        db.session.execute(VentaDiaria.__table__.insert(), filas)
+    if entregas is not None and len(entregas):
+        db.session.execute(EntregaDiaria.__table__.insert(), [
+            {'fecha': fecha, 'restaurante_id': int(rid), 'tramo': int(tramo), 'pedidos': int(n)}
+            for (fecha, rid, tramo), n in entregas['pedidos'].items()])
+    if items is not None and len(items):
+        db.session.execute(VentaDiariaItem.__table__.insert(), [
+            {'fecha': fecha, 'restaurante_id': int(rid), 'menu_item_id': _entero(menu_item_id),
+             'nombre_item': nombre, 'cantidad': int(fila['cantidad']), 'ingresos': round(float(fila['ingresos']), 2)}
+            for (fecha, rid, menu_item_id, nombre), fila in items.iterrows()])
+    return 0 if ventas is None else len(ventas)
+
+
+def refrescar(completo=False, tamano_bloque=50000):
+    # La marca se toma antes de leer: un pedido modificado durante el
+    # refresco vuelve a entrar en el siguiente
+    inicio = datetime.utcnow()
+    dias = _dias_pendientes(None if completo else _marca())
+    if completo:
+        for modelo in (VentaDiaria, VentaDiariaItem, EntregaDiaria):
+            db.session.query(modelo).delete(synchronize_session=False)
+    filas = 0
+    # Conexión propia para el cursor del lado del servidor; las escrituras
+    # van por la sesión
+    with db.engine.connect() as conexion:
+        conexion = conexion.execution_options(stream_results=True)
+        for desde, hasta in _rangos(dias):
+            filas += _refrescar_rango(conexion, desde, hasta, tamano_bloque)
+            db.session.commit()
+    _guardar_marca(inicio)
+    db.session.commit()
+    return {'dias': len(dias), 'filas': filas}
+
+
+# ====================================================
+# REPORTES
+# ====================================================
+
+def _percentil(conteos, p):
+    # Límite superior del tramo donde cae el percentil p (0-1)
+    import numpy as np
+    total = conteos.sum()
+    if total == 0:
+        return None
+    indice = int(np.searchsorted(np.cumsum(conteos), p * total, side='left'))
+    return TRAMOS_ENTREGA[indice]
+
+
+def resumen(desde, hasta, restaurante_id=None, top=10):
+    # Tres consultas sobre los agregados, sin tocar pedidos ni pedido_items
+    import numpy as np
+
+    def filtro(modelo):
+        condiciones = [modelo.fecha >= desde, modelo.fecha <= hasta]
+        if restaurante_id is not None:
+            condiciones.append(modelo.restaurante_id == restaurante_id)
+        return condiciones
+
+    columnas = ('pedidos', *COLUMNAS_ESTADO.values(), 'ingresos', 'descuentos', 'items_vendidos',
+                'entregas_medidas', 'minutos_entrega')
+    dias = (db.session.query(VentaDiaria.fecha, *[func.sum(getattr(VentaDiaria, c)) for c in columnas])
+            .filter(*filtro(VentaDiaria))
+            .group_by(VentaDiaria.fecha)
+            .order_by(VentaDiaria.fecha)
+            .all())
+    matriz = np.array([[float(v or 0) for v in fila[1:]] for fila in dias]).reshape(-1, len(columnas))
+    totales = dict(zip(columnas, matriz.sum(axis=0)))
+    pedidos = int(totales['pedidos'])
+    con_venta = pedidos - int(totales['cancelados']) - int(totales['rechazados'])
+
+    top_items = (db.session.query(VentaDiariaItem.menu_item_id, func.max(VentaDiariaItem.nombre_item),
+                                  func.sum(VentaDiariaItem.cantidad), func.sum(VentaDiariaItem.ingresos))
+                 .filter(*filtro(VentaDiariaItem))
+                 .group_by(VentaDiariaItem.menu_item_id)
+                 .order_by(func.sum(VentaDiariaItem.cantidad).desc())
+                 .limit(top)
+                 .all())
+
+    conteos = np.zeros(len(TRAMOS_ENTREGA), dtype=np.int64)
+    for tramo, n in (db.session.query(EntregaDiaria.tramo, func.sum(EntregaDiaria.pedidos))
+                     .filter(*filtro(EntregaDiaria))
+                     .group_by(EntregaDiaria.tramo)):
+        conteos[tramo] = n
+    medidas = int(totales['entregas_medidas'])
+
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'pedidos': pedidos,
+        'ingresos': round(totales['ingresos'], 2),
+        'descuentos': round(totales['descuentos'], 2),
+        'ticket_medio': round(totales['ingresos'] / con_venta, 2) if con_venta else None,
+        'items_vendidos': int(totales['items_vendidos']),
+        'estados': {estado: int(totales[columna]) for estado, columna in COLUMNAS_ESTADO.items()},
+        'tasa_cancelacion': round((pedidos - con_venta) / pedidos, 4) if pedidos else None,
+        'por_dia': [{'fecha': fecha.isoformat(), 'pedidos': int(fila[columnas.index('pedidos')]),
+                     'ingresos': round(fila[columnas.index('ingresos')], 2)}
+                    for (fecha, *_), fila in zip(dias, matriz)],
+        'top_items': [{'menu_item_id': mid, 'nombre': nombre, 'cantidad': int(cantidad),
+                       'ingresos': round(float(ingresos), 2)} for mid, nombre, cantidad, ingresos in top_items],
+        'entrega_minutos': {
+            'entregas': medidas,
+            'promedio': round(totales['minutos_entrega'] / medidas, 1) if medidas else None,
+            'p50': _percentil(conteos, 0.5),
+            'p90': _percentil(conteos, 0.9),
+            'histograma': [{'hasta': limite, 'pedidos': int(n)} for limite, n in zip(TRAMOS_ENTREGA, conteos)],
+        },
+    }
+
+
+# ====================================================
+# API Y CLI
+# ====================================================
+
+def _fecha_param(nombre, defecto):
+    valor = request.args.get(nombre)
+    if not valor:
+        return defecto
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        abort(400)
+
+
+@analytics_bp.route('/api/admin/analytics/sales')
+def ventas():
+    requiere_admin()
+    hasta = _fecha_param('to', datetime.utcnow().date())
+    desde = _fecha_param('from', hasta - timedelta(days=29))
+    if desde > hasta:
+        return jsonify({'success': False, 'error': 'Rango de fechas inválido'}), 400
+    return jsonify(resumen(desde, hasta, request.args.get('restaurant_id', type=int),
+                           min(request.args.get('top', 10, type=int), 100)))
+
+
+@analytics_bp.cli.command('refrescar')
+@click.option('--completo', is_flag=True, help='Recalcula todos los días.')
+@click.option('--bloque', default=50000, help='Filas por bloque de lectura.')
+def refrescar_command(completo, bloque):
+    """Actualiza los agregados diarios de ventas."""
+    resultado = refrescar(completo, bloque)
+    click.echo(f"{resultado['dias']} días recalculados ({resultado['filas']} filas restaurante-día).")
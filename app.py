@@ -1,50 +1,87 @@
-# app.py
+# app.py - Fábrica de la aplicación
+import os
+
+import click
 from flask import Flask, render_template, request, redirect, url_for, flash, session
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from models import db, Usuario
+from config import config
+from search import search_bp
+from catalog import catalog_bp
+from geo import geo_bp
+from reservations import reservations_bp
+from orders import orders_bp
+from promotions import promotions_bp
+from ratings import ratings_bp
+from notifications import notifications_bp
+from synthetic import synthetic_bp
+from catalog_io import catalog_io_bp
+from images import images_bp
+from backups import backups_bp
+from analytics import analytics_bp
+from favorites import favorites_bp
+from tracking import tracking_bp
+from settings import settings_bp
+from banners import banners_bp
+from pages import pages_bp
+from db_logging import instalar_log_bd
+from metrics import metrics_bp, instalar_metricas, presupuesto_consultas
+from profiles import cargar_perfil
+from passwords import hasheador, autenticar, instalar_hash, HashSaturado
 
-app = Flask(__name__)
-app.secret_key = 'tu_clave_secreta_aqui'
 
-# Configuración de la base de datos
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql://root:@localhost/final_project'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def create_app(nombre_config=None, ajustes=None):
+    # Crear la aplicación no abre conexiones ni arranca hilos: el pool de la
+    # base se llena con la primera consulta y los hilos de logs y métricas
+    # con la primera petición, en el proceso que la atiende (ver wsgi.py)
+    nombre_config = nombre_config or os.environ.get('FLASK_CONFIG', 'default')
+    app = Flask(__name__)
+    app.config.from_object(config[nombre_config])
+    app.config.update(ajustes or {})
 
-db = SQLAlchemy(app)
+    db.init_app(app)
 
-# Modelo de Usuario
-class Usuario(db.Model):
-    __tablename__ = 'usuarios'
-    id = db.Column(db.Integer, primary_key=True)
-    nombre = db.Column(db.String(100), nullable=False)
-    apellido = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=False)
-    password_hash = db.Column(db.String(255), nullable=False)
-    telefono = db.Column(db.String(20))
-    direccion = db.Column(db.Text)
-    ciudad = db.Column(db.String(100))
-    codigo_postal = db.Column(db.String(10))
-    fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
-    ultima_sesion = db.Column(db.DateTime)
-    estado = db.Column(db.Enum('activo', 'inactivo', 'suspendido'), default='activo')
-    rol = db.Column(db.Enum('usuario', 'administrador', 'restaurante'), default='usuario')
-    verificado = db.Column(db.Boolean, default=False)
-    genero = db.Column(db.Enum('masculino', 'femenino', 'otro', 'no_especifica'))
-    fecha_nacimiento = db.Column(db.Date)
-    foto_perfil = db.Column(db.String(500))
-    
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    # El esquema se maneja con "flask db upgrade". Flask-Migrate (y alembic)
+    # sólo se importa cuando la app se carga desde la línea de comandos de
+    # flask; los workers de gunicorn no lo necesitan
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    app.register_blueprint(search_bp)
+    app.register_blueprint(catalog_bp)
+    app.register_blueprint(geo_bp)
+    app.register_blueprint(reservations_bp)
+    app.register_blueprint(orders_bp)
+    app.register_blueprint(promotions_bp)
+    app.register_blueprint(ratings_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(synthetic_bp)
+    app.register_blueprint(catalog_io_bp)
+    app.register_blueprint(images_bp)
+    app.register_blueprint(backups_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(favorites_bp)
+    app.register_blueprint(tracking_bp)
+    app.register_blueprint(settings_bp)
+    app.register_blueprint(banners_bp)
+    app.register_blueprint(pages_bp)
+    app.register_blueprint(metrics_bp)
+
+    app.add_url_rule('/', 'index', index)
+    app.add_url_rule('/login', 'login', login, methods=['GET', 'POST'])
+    app.add_url_rule('/register', 'register', register, methods=['GET', 'POST'])
+    app.add_url_rule('/profile', 'profile', profile)
+    app.add_url_rule('/logout', 'logout', logout)
 
-# Crear tablas
-with app.app_context():
-    db.create_all()
+    # Logs (system_logs) y métricas (system_metrics) se escriben desde hilos aparte
+    if app.config.get('LOG_DB_ENABLED', True):
+        instalar_log_bd(app)
+    if app.config.get('METRICS_FLUSH_ENABLED', True):
+        instalar_metricas(app)
+    # Hash de contraseñas con concurrencia acotada (PASSWORD_HASH_*)
+    instalar_hash(app)
+    return app
 
-@app.route('/')
 def index():
     user_logged_in = 'user_id' in session
     user_name = session.get('user_name', '')
@@ -52,15 +89,18 @@ def index():
                          user_logged_in=user_logged_in, 
                          user_name=user_name)
 
-@app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
         
-        user = Usuario.query.filter_by(email=email).first()
+        try:
+            user = autenticar(email, password)
+        except HashSaturado:
+            flash('Hay demasiados inicios de sesión en curso. Inténtalo en unos segundos.', 'error')
+            return render_template('index.html'), 503
         
-        if user and user.check_password(password):
+        if user:
             session['user_id'] = user.id
             session['user_name'] = f"{user.nombre} {user.apellido}"
             flash('¡Bienvenido de vuelta!', 'success')
@@ -70,7 +110,6 @@ def login():
     
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         nombre = request.form.get('nombre')
@@ -102,7 +141,11 @@ def register():
             genero=genero,
             fecha_nacimiento=fecha_nacimiento if fecha_nacimiento else None
         )
-        new_user.set_password(password)
+        try:
+            new_user.password_hash = hasheador.generar(password)
+        except HashSaturado:
+            flash('Hay demasiados registros en curso. Inténtalo en unos segundos.', 'error')
+            return render_template('index.html'), 503
         
         try:
             db.session.add(new_user)
@@ -116,11 +159,26 @@ def register():
     
     return render_template('index.html')
 
-@app.route('/logout')
+@presupuesto_consultas(8)
+def profile():
+    if 'user_id' not in session:
+        flash('Inicia sesión para ver tu perfil.', 'info')
+        return redirect(url_for('index'))
+
+    datos = cargar_perfil(
+        session['user_id'],
+        pagina_reservas=max(request.args.get('reservas', 1, type=int), 1),
+        pagina_pedidos=max(request.args.get('pedidos', 1, type=int), 1),
+    )
+    if datos is None:
+        session.clear()
+        return redirect(url_for('index'))
+    return render_template('profile.html', **datos)
+
 def logout():
     session.clear()
     flash('Has cerrado sesión correctamente.', 'info')
     return redirect(url_for('index'))
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
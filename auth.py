@@ -0,0 +1,15 @@
+# auth.py - Autorización de las rutas de administración
+import hmac
+
+from flask import abort, current_app, request
+
+
+def requiere_admin():
+    # Sin sesión de administradores en la app: la API pide el token de
+    # ADMIN_API_TOKEN y no existe si no está configurado
+    esperado = current_app.config.get('ADMIN_API_TOKEN')
+    if not esperado:
+        abort(404)
+    recibido = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(recibido.encode(), esperado.encode()):
+        abort(401)
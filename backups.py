@@ -0,0 +1,346 @@
+# backups.py - Backups comprimidos por bloques, registrados en system_backups
+#
+#   flask backups crear [--incremental]
+#   flask backups verificar <archivo>
+#   flask backups restaurar <archivo>
+#
+# Formato del archivo: MAGIA y luego una serie de bloques. Cada bloque es
+# una cabecera JSON (precedida por su largo en 4 bytes) con la tabla, la
+# cantidad de filas, el largo y el SHA-256 del contenido, seguida del
+# contenido: las filas en NDJSON comprimidas con zlib. El último bloque no
+# tiene tabla y lleva el resumen; un archivo sin él está truncado.
+#
+# Un incremental trae las filas nuevas o modificadas, no los borrados: para
+# reflejarlos hace falta un completo. Los contadores que se mueven sin tocar
+# updated_at (numero_favoritos, usos_actuales) no viajan en los
+# incrementales: se recalculan al terminar cada restauración.
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import Date, DateTime, LargeBinary, Numeric, Time, bindparam, or_, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+import favorites
+import promotions
+import ratings
+from models import db, BackupSistema
+
+backups_bp = Blueprint('backups', __name__, cli_group='backups')
+
+MAGIA = b'FPBACKUP1\n'
+LARGO = struct.Struct('>I')
+INTERVALO_PROGRESO = 2.0  # segundos entre actualizaciones de tamaño_bytes
+
+# El propio registro de backups no se respalda: restaurarlo lo pisaría
+EXCLUIDAS = ('system_backups',)
+# Tablas sin columna de modificación cuyas filas no cambian una vez
+# escritas: en un incremental basta con las nuevas. Las demás tablas sin
+# columna de modificación (usuarios, favoritos...) van completas.
+SOLO_INSERCIONES = ('pedido_items', 'system_logs', 'system_metrics', 'uso_promociones')
+
+
+class ErrorBackup(Exception):
+    pass
+
+
+def _tablas():
+    # En orden de dependencias: restaurar en este orden respeta las FK
+    return [t for t in db.metadata.sorted_tables if t.name not in EXCLUIDAS]
+
+
+# ====================================================
+# SERIALIZACIÓN
+# ====================================================
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date, hora)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, bytes):
+        return base64.b64encode(valor).decode('ascii')
+    return valor
+
+
+def _desde_json(columna, valor):
+    if valor is None:
+        return None
+    tipo = columna.type
+    if isinstance(tipo, DateTime):
+        return datetime.fromisoformat(valor)
+    if isinstance(tipo, Date):
+        return date.fromisoformat(valor)
+    if isinstance(tipo, Time):
+        return hora.fromisoformat(valor)
+    if isinstance(tipo, Numeric) and isinstance(valor, str):
+        return Decimal(valor)
+    if isinstance(tipo, LargeBinary):
+        return base64.b64decode(valor)
+    return valor
+
+
+# default= sólo se llama para fechas, decimales y bytes
+_CODIFICADOR = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_a_json)
+
+
+class Escritor:
+    def __init__(self, archivo, nivel=6):
+        self.archivo = archivo
+        self.nivel = nivel
+        self.bytes = len(MAGIA)
+        archivo.write(MAGIA)
+
+    def _bloque(self, cabecera, contenido):
+        cabecera = dict(cabecera, bytes=len(contenido), sha256=hashlib.sha256(contenido).hexdigest())
+        crudo = json.dumps(cabecera, ensure_ascii=False).encode('utf-8')
+        self.archivo.write(LARGO.pack(len(crudo)))
+        self.archivo.write(crudo)
+        self.archivo.write(contenido)
+        self.bytes += LARGO.size + len(crudo) + len(contenido)
+
+    def filas(self, tabla, columnas, filas):
+        lineas = b''.join(_CODIFICADOR.encode(tuple(fila)).encode('utf-8') + b'\n' for fila in filas)
+        self._bloque({'tabla': tabla, 'columnas': columnas, 'filas': len(filas)},
+                     zlib.compress(lineas, self.nivel))
+
+    def cierre(self, resumen):
+        self._bloque({'tabla': None, 'resumen': resumen}, b'')
+
+
+def leer_bloques(archivo):
+    # Entrega (cabecera, filas) de a un bloque, verificando cada checksum
+    if archivo.read(len(MAGIA)) != MAGIA:
+        raise ErrorBackup('No es un archivo de backup')
+    while True:
+        prefijo = archivo.read(LARGO.size)
+        if not prefijo:
+            raise ErrorBackup('Archivo truncado: falta el bloque final')
+        try:
+            cabecera = json.loads(archivo.read(LARGO.unpack(prefijo)[0]))
+            contenido = archivo.read(cabecera['bytes'])
+        except (ValueError, KeyError, struct.error):
+            raise ErrorBackup('Cabecera de bloque dañada')
+        if len(contenido) != cabecera['bytes'] or hashlib.sha256(contenido).hexdigest() != cabecera['sha256']:
+            raise ErrorBackup(f"Checksum inválido en un bloque de {cabecera.get('tabla')}")
+        if cabecera['tabla'] is None:
+            yield cabecera, None
+            return
+        yield cabecera, [json.loads(linea) for linea in zlib.decompress(contenido).splitlines()]
+
+
+# ====================================================
+# CREACIÓN
+# ====================================================
+
+class Regulador:
+    # Limita la fracción del tiempo que el backup tiene ocupada a la base:
+    # con carga 0.5, por cada segundo leyendo duerme otro segundo
+    def __init__(self, carga=0.5, dormir=time.sleep):
+        self.carga = carga
+        self.dormir = dormir
+        self.pausado = 0.0
+
+    def pausa(self, trabajo):
+        if 0 < self.carga < 1:
+            espera = trabajo * (1 - self.carga) / self.carga
+            self.pausado += espera
+            self.dormir(espera)
+
+
+def _desde_ultimo():
+    # Un incremental exporta lo modificado desde el inicio del último backup
+    # completado (de cualquier tipo)
+    ultimo = (BackupSistema.query
+              .filter(BackupSistema.estado == 'completado',
+                      BackupSistema.tipo_backup.in_(('completo', 'incremental')))
+              .order_by(BackupSistema.fecha_inicio.desc())
+              .first())
+    return ultimo.fecha_inicio if ultimo else None
+
+
+def _consulta(tabla, desde):
+    consulta = select(tabla).order_by(*tabla.primary_key.columns)
+    if desde is None:
+        return consulta
+    modificacion = [c for c in tabla.c if isinstance(c.type, DateTime) and c.onupdate is not None]
+    creacion = [c for c in tabla.c if isinstance(c.type, DateTime) and c.default is not None]
+    if modificacion or tabla.name in SOLO_INSERCIONES:
+        return consulta.where(or_(*[c > desde for c in modificacion + creacion]))
+    return consulta
+
+
+def _progreso(registro, tamano):
+    # Informativo: si la base no acepta la escritura mientras dura la lectura
+    # (SQLite sin WAL) devuelve False y el backup sigue sin registrar avance
+    try:
+        registro.tamaño_bytes = tamano
+        db.session.commit()
+        return True
+    except SQLAlchemyError:
+        db.session.rollback()
+        return False
+
+
+def crear_backup(directorio, incremental=False, tamano_bloque=5000, carga=0.5, nivel=6, admin_id=None):
+    inicio = datetime.utcnow()
+    desde = _desde_ultimo() if incremental else None
+    tipo = 'incremental' if desde is not None else 'completo'
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"backup-{tipo}-{inicio.strftime('%Y%m%d-%H%M%S')}.fpbk"
+    ruta = os.path.join(directorio, nombre)
+
+    registro = BackupSistema(admin_id=admin_id, nombre_archivo=nombre, ruta_archivo=ruta, tamaño_bytes=0,
+                             tipo_backup=tipo, estado='en_progreso', fecha_inicio=inicio)
+    db.session.add(registro)
+    db.session.commit()
+
+    regulador = Regulador(carga)
+    avisado = 0.0
+    resumen = {'tipo': tipo, 'desde': _a_json(desde), 'hasta': _a_json(inicio), 'tablas': {}}
+    parcial = ruta + '.parcial'
+    try:
+        # Una sola transacción de lectura en su propia conexión: en InnoDB
+        # (REPEATABLE READ) todas las tablas salen del mismo instante
+        with db.engine.connect() as conexion, open(parcial, 'wb') as archivo:
+            escritor = Escritor(archivo, nivel)
+            conexion = conexion.execution_options(stream_results=True, yield_per=tamano_bloque)
+            for tabla in _tablas():
+                columnas = [c.name for c in tabla.c]
+                resultado = conexion.execute(_consulta(tabla, desde))
+                filas = 0
+                while True:
+                    t = time.perf_counter()
+                    bloque = resultado.fetchmany(tamano_bloque)
+                    regulador.pausa(time.perf_counter() - t)
+                    if not bloque:
+                        break
+                    escritor.filas(tabla.name, columnas, bloque)
+                    filas += len(bloque)
+                    if avisado is not None and time.monotonic() - avisado >= INTERVALO_PROGRESO:
+                        avisado = time.monotonic() if _progreso(registro, escritor.bytes) else None
+                resumen['tablas'][tabla.name] = filas
+            escritor.cierre(resumen)
+        os.replace(parcial, ruta)
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        registro.estado = 'fallido'
+        registro.mensaje_error = str(e)
+        registro.fecha_finalizacion = datetime.utcnow()
+        registro.duracion_segundos = int((registro.fecha_finalizacion - inicio).total_seconds())
+        db.session.commit()
+        raise
+
+    registro.estado = 'completado'
+    registro.tamaño_bytes = os.path.getsize(ruta)
+    registro.fecha_finalizacion = datetime.utcnow()
+    registro.duracion_segundos = int((registro.fecha_finalizacion - inicio).total_seconds())
+    db.session.commit()
+    return registro
+
+
+# ====================================================
+# VERIFICACIÓN Y RESTAURACIÓN
+# ====================================================
+
+def verificar_backup(ruta):
+    # Recorre todo el archivo sin tocar la base; devuelve el resumen
+    with open(ruta, 'rb') as archivo:
+        for cabecera, _ in leer_bloques(archivo):
+            if cabecera['tabla'] is None:
+                return cabecera['resumen']
+
+
+def _guardar(conexion, tabla, columnas, filas):
+    # Upsert por clave primaria: UPDATE de las que existen, INSERT del resto
+    registros = [{c: _desde_json(tabla.c[c], v) for c, v in zip(columnas, fila)} for fila in filas]
+    ids = [r['id'] for r in registros]
+    existentes = set(conexion.scalars(select(tabla.c.id).where(tabla.c.id.in_(ids))))
+    nuevas = [r for r in registros if r['id'] not in existentes]
+    cambios = [{f'v_{c}': v for c, v in r.items()} for r in registros if r['id'] in existentes]
+    if nuevas:
+        conexion.execute(tabla.insert(), nuevas)
+    if cambios:
+        conexion.execute(tabla.update().where(tabla.c.id == bindparam('v_id'))
+                         .values({c: bindparam(f'v_{c}') for c in columnas if c != 'id'}), cambios)
+
+
+def restaurar_backup(ruta):
+    # Primero se verifica el archivo entero: uno dañado no toca la base.
+    # Un completo reemplaza el contenido; un incremental se aplica encima
+    # (los incrementales se restauran en orden, después de su completo).
+    resumen = verificar_backup(ruta)
+    tablas = {t.name: t for t in _tablas()}
+    with db.engine.begin() as conexion:
+        if conexion.dialect.name == 'mysql':
+            conexion.execute(text('SET FOREIGN_KEY_CHECKS=0'))
+        if resumen['tipo'] == 'completo':
+            for tabla in reversed(list(tablas.values())):
+                conexion.execute(tabla.delete())
+        with open(ruta, 'rb') as archivo:
+            for cabecera, filas in leer_bloques(archivo):
+                if filas:
+                    _guardar(conexion, tablas[cabecera['tabla']], cabecera['columnas'], filas)
+        if conexion.dialect.name == 'mysql':
+            conexion.execute(text('SET FOREIGN_KEY_CHECKS=1'))
+    db.session.expire_all()
+    _recalcular_contadores()
+    return resumen
+
+
+def _recalcular_contadores():
+    # Desnormalizados a partir de las filas ya restauradas
+    favorites.reconciliar()
+    promotions.reconciliar_usos()
+    ratings.reconciliar()
+
+
+# ====================================================
+# CLI
+# ====================================================
+
+@backups_bp.cli.command('crear')
+@click.option('--incremental', is_flag=True, help='Sólo lo modificado desde el último backup completado.')
+@click.option('--directorio', help='Por defecto BACKUP_DIR o instance/backups.')
+def crear_command(incremental, directorio):
+    """Respalda la base en un archivo comprimido por bloques."""
+    directorio = directorio or current_app.config.get('BACKUP_DIR') or os.path.join(current_app.instance_path,
+                                                                                     'backups')
+    registro = crear_backup(directorio, incremental,
+                            tamano_bloque=current_app.config.get('BACKUP_CHUNK_ROWS', 5000),
+                            carga=current_app.config.get('BACKUP_MAX_LOAD', 0.5))
+    click.echo(f'{registro.tipo_backup}: {registro.ruta_archivo} ({registro.tamaño_bytes} bytes, '
+               f'{registro.duracion_segundos} s)')
+
+
+@backups_bp.cli.command('verificar')
+@click.argument('ruta')
+def verificar_command(ruta):
+    """Comprueba los checksums de todos los bloques."""
+    try:
+        resumen = verificar_backup(ruta)
+    except ErrorBackup as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{resumen['tipo']} válido: {sum(resumen['tablas'].values())} filas en {len(resumen['tablas'])} tablas")
+
+
+@backups_bp.cli.command('restaurar')
+@click.argument('ruta')
+@click.confirmation_option(prompt='Esto reemplaza datos de la base. ¿Continuar?')
+def restaurar_command(ruta):
+    """Restaura un backup (completo o incremental) tras verificarlo."""
+    try:
+        resumen = restaurar_backup(ruta)
+    except ErrorBackup as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restaurado {resumen['tipo']} ({sum(resumen['tablas'].values())} filas).")
@@ -0,0 +1,280 @@
+# banners.py - Selección de banners por público con reglas precompiladas
+import json
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+
+from cache import CacheLRU
+from models import db, BannerPromocional, Usuario
+
+banners_bp = Blueprint('banners', __name__)
+
+# target_audience es un objeto JSON; todas sus claves deben cumplirse:
+#   {"sesion": "registrado", "ciudad": ["santiago", "valparaíso"],
+#    "genero": "femenino", "edad": {"min": 18, "max": 34}, "nuevo": true}
+# Sin target_audience el banner es para todos. Una regla que no se entiende
+# deja el banner fuera (mejor no mostrarlo que mostrarlo a quien no es).
+DIMENSIONES = ('sesion', 'ciudad', 'genero', 'edad', 'nuevo')
+DIAS_NUEVO = 30
+MAXIMO_RESUELTOS = 10000
+
+# usuario_id -> perfil con las dimensiones de arriba
+cache_perfiles = CacheLRU(maxsize=50000, ttl=600)
+
+
+class ReglaInvalida(ValueError):
+    pass
+
+
+@banners_bp.record_once
+def _configurar(state):
+    cache_perfiles.configurar(
+        maxsize=state.app.config.get('BANNERS_PERFILES_CACHE_SIZE', 50000),
+        ttl=state.app.config.get('BANNERS_PERFILES_CACHE_TTL', 600),
+    )
+
+
+def _normalizar(texto):
+    return texto.strip().lower() if isinstance(texto, str) and texto.strip() else None
+
+
+def _opciones(valor):
+    valores = valor if isinstance(valor, list) else [valor]
+    opciones = frozenset(_normalizar(v) for v in valores)
+    if None in opciones or not opciones:
+        raise ReglaInvalida(f'valores no válidos: {valor!r}')
+    return opciones
+
+
+def _entero(valor):
+    if valor is not None and (isinstance(valor, bool) or not isinstance(valor, int)):
+        raise ReglaInvalida(f'edad no válida: {valor!r}')
+    return valor
+
+
+def compilar_regla(regla):
+    # Devuelve ([(dimension, predicado)], cortes de edad) a partir del JSON
+    if isinstance(regla, str):
+        try:
+            regla = json.loads(regla)
+        except ValueError:
+            raise ReglaInvalida('target_audience no es JSON válido')
+    if not regla:
+        return [], ()
+    if not isinstance(regla, dict):
+        raise ReglaInvalida('target_audience debe ser un objeto')
+    predicados, cortes = [], []
+    for clave, valor in regla.items():
+        if clave in ('sesion', 'ciudad', 'genero'):
+            opciones = _opciones(valor)
+            predicados.append((clave, lambda v, o=opciones: v in o))
+        elif clave == 'nuevo':
+            if not isinstance(valor, bool):
+                raise ReglaInvalida(f'nuevo debe ser true o false: {valor!r}')
+            predicados.append((clave, lambda v, esperado=valor: v is esperado))
+        elif clave == 'edad':
+            if not isinstance(valor, dict):
+                raise ReglaInvalida('edad debe ser {"min": .., "max": ..}')
+            minimo, maximo = _entero(valor.get('min')), _entero(valor.get('max'))
+            predicados.append((clave, lambda v, a=minimo, b=maximo:
+                               v is not None and (a is None or v >= a) and (b is None or v <= b)))
+            cortes += [c for c in (minimo, maximo + 1 if maximo is not None else None) if c is not None]
+        else:
+            raise ReglaInvalida(f'clave desconocida: {clave}')
+    return predicados, tuple(cortes)
+
+
+class BannerCompilado:
+    # Copia inmutable de un BannerPromocional, sin depender de la sesión
+    __slots__ = ('id', 'grupo', 'orden', 'fecha_inicio', 'fecha_fin', 'predicados', 'cortes', 'datos')
+
+    def __init__(self, b):
+        self.id = b.id
+        self.grupo = (b.tipo_banner or 'principal', b.posicion or 'top')
+        self.orden = (b.orden_visualizacion or 0, b.id)
+        self.fecha_inicio = b.fecha_inicio
+        self.fecha_fin = b.fecha_fin
+        self.predicados, self.cortes = compilar_regla(b.target_audience)
+        self.datos = {
+            'id': b.id,
+            'titulo': b.titulo,
+            'descripcion': b.descripcion,
+            'imagen_url': b.imagen_url,
+            'link_destino': b.link_destino,
+        }
+
+    def acepta(self, perfil):
+        return all(predicado(perfil[dimension]) for dimension, predicado in self.predicados)
+
+
+class _Estado:
+    # Lo que se reemplaza entero en cada recarga: los lectores toman una
+    # referencia y nunca ven una mezcla de dos versiones
+    def __init__(self, grupos=None, dimensiones=(), cortes=()):
+        self.grupos = grupos or {}        # (tipo, posicion) -> [BannerCompilado] ya ordenados
+        self.dimensiones = dimensiones    # sólo las que usa alguna regla vigente
+        self.cortes = cortes              # límites de edad de todas las reglas
+        self.resueltos = {}               # (tipo, posicion, segmento) -> [datos]
+
+    def segmento(self, perfil):
+        # Dos perfiles con la misma clave reciben los mismos banners: las
+        # edades se agrupan por los cortes de las reglas, no año por año
+        clave = []
+        for dimension in self.dimensiones:
+            valor = perfil[dimension]
+            if dimension == 'edad' and valor is not None:
+                valor = bisect_right(self.cortes, valor)
+            clave.append(valor)
+        return tuple(clave)
+
+
+class IndiceBanners:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estado = _Estado()
+        self._version = None
+        self._ultima_comprobacion = 0.0
+        # Primer día en que cambia el conjunto vigente (empieza o termina un banner)
+        self._valido_hasta = None
+        self.sucio = True
+
+    def _cargar(self, hoy):
+        banners = BannerPromocional.query.filter(
+            BannerPromocional.activo.is_(True),
+            or_(BannerPromocional.fecha_fin.is_(None), BannerPromocional.fecha_fin >= hoy),
+        ).all()
+        grupos, dimensiones, cortes, cambios = {}, set(), set(), []
+        for b in banners:
+            try:
+                compilado = BannerCompilado(b)
+            except ReglaInvalida as e:
+                current_app.logger.warning('Banner %s sin mostrar: %s', b.id, e)
+                continue
+            if compilado.fecha_inicio is not None and compilado.fecha_inicio > hoy:
+                cambios.append(compilado.fecha_inicio)
+                continue
+            if compilado.fecha_fin is not None:
+                cambios.append(compilado.fecha_fin + timedelta(days=1))
+            grupos.setdefault(compilado.grupo, []).append(compilado)
+            dimensiones.update(d for d, _ in compilado.predicados)
+            cortes.update(compilado.cortes)
+        for lista in grupos.values():
+            lista.sort(key=lambda c: c.orden)
+        estado = _Estado(grupos, tuple(d for d in DIMENSIONES if d in dimensiones), tuple(sorted(cortes)))
+        return estado, min(cambios, default=None)
+
+    def refrescar(self, forzar=False, hoy=None):
+        # Como el índice de promociones: cada BANNERS_REFRESH_SECONDS se
+        # compara (máximo updated_at, número de filas) y sólo si cambió, o si
+        # llegó la fecha en que empieza o termina algún banner, se recompila
+        intervalo = current_app.config.get('BANNERS_REFRESH_SECONDS', 30)
+        hoy = hoy or datetime.now().date()
+        vencido = self._valido_hasta is not None and hoy >= self._valido_hasta
+        ahora = time.monotonic()
+        if not (forzar or self.sucio or vencido) and ahora - self._ultima_comprobacion < intervalo:
+            return
+        self._ultima_comprobacion = ahora
+        version = tuple(db.session.query(func.max(BannerPromocional.updated_at),
+                                         func.count(BannerPromocional.id)).one())
+        if not (self.sucio or vencido) and version == self._version:
+            return
+        with self._lock:
+            estado, valido_hasta = self._cargar(hoy)
+            self._estado = estado
+            self._valido_hasta = valido_hasta
+            self._version = version
+            self.sucio = False
+
+    def seleccionar(self, perfil, tipo='principal', posicion='top'):
+        estado = self._estado
+        clave = (tipo, posicion, estado.segmento(perfil))
+        resueltos = estado.resueltos.get(clave)
+        if resueltos is None:
+            resueltos = [b.datos for b in estado.grupos.get((tipo, posicion), ()) if b.acepta(perfil)]
+            if len(estado.resueltos) >= MAXIMO_RESUELTOS:
+                estado.resueltos.clear()
+            estado.resueltos[clave] = resueltos
+        return resueltos
+
+
+indice_banners = IndiceBanners()
+
+
+# ====================================================
+# PERFIL DEL VISITANTE
+# ====================================================
+
+ANONIMO = {'sesion': 'anonimo', 'ciudad': None, 'genero': None, 'edad': None, 'nuevo': None}
+
+
+def _edad(nacimiento, hoy):
+    if nacimiento is None:
+        return None
+    return hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+
+
+def _cargar_perfil(usuario_id):
+    fila = (db.session.query(Usuario.ciudad, Usuario.genero, Usuario.fecha_nacimiento, Usuario.fecha_registro)
+            .filter(Usuario.id == usuario_id).first())
+    if fila is None:
+        return ANONIMO
+    hoy = date.today()
+    return {
+        'sesion': 'registrado',
+        'ciudad': _normalizar(fila.ciudad),
+        'genero': fila.genero,
+        'edad': _edad(fila.fecha_nacimiento, hoy),
+        'nuevo': fila.fecha_registro is not None and fila.fecha_registro >= datetime.utcnow() - timedelta(days=DIAS_NUEVO),
+    }
+
+
+def perfil_visitante():
+    if 'user_id' not in session:
+        return ANONIMO
+    usuario_id = session['user_id']
+    return cache_perfiles.get_or_set(usuario_id, lambda: _cargar_perfil(usuario_id))
+
+
+def banners_para(posicion='top', tipo='principal'):
+    indice_banners.refrescar()
+    return indice_banners.seleccionar(perfil_visitante(), tipo, posicion)
+
+
+@banners_bp.app_context_processor
+def _plantillas():
+    return {'banners_para': banners_para}
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, BannerPromocional):
+            session.info['banners_cambiados'] = True
+        elif isinstance(obj, Usuario) and obj.id is not None:
+            session.info.setdefault('perfiles_cambiados', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    if session.info.pop('banners_cambiados', False):
+        indice_banners.sucio = True
+    for usuario_id in session.info.pop('perfiles_cambiados', ()):
+        cache_perfiles.delete(usuario_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('banners_cambiados', None)
+    session.info.pop('perfiles_cambiados', None)
+
+
+@banners_bp.route('/api/banners')
+def api_banners():
+    tipo = request.args.get('tipo', 'principal')
+    posicion = request.args.get('posicion', 'top')
+    return jsonify({'success': True, 'banners': banners_para(posicion, tipo)})
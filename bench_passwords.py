@@ -0,0 +1,64 @@
+# bench_passwords.py - Inicios de sesión por segundo en un worker
+#
+#   python bench_passwords.py --hilos 8 --logins 64
+#
+# Simula un worker con N hilos atendiendo logins y compara el hash sin
+# límite con el límite de hashes simultáneos de passwords.py, para cada
+# costo. También mide la latencia de una petición liviana que llega durante
+# la ráfaga, que es lo que el límite protege. El rendimiento en logins/s no
+# cambia: el límite es control de carga, el hash no sale del proceso.
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from passwords import Hasheador
+
+
+def rafaga(verificar, password_hash, hilos, logins):
+    latencias = []
+    parar = threading.Event()
+
+    def liviana():
+        # Una "petición" barata cada 5 ms mientras dura la ráfaga
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            sum(range(2000))
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.005)
+
+    observador = threading.Thread(target=liviana)
+    observador.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as worker:
+        list(worker.map(lambda _: verificar(password_hash, 'secreta'), range(logins)))
+    duracion = time.perf_counter() - inicio
+    parar.set()
+    observador.join()
+    p95 = statistics.quantiles(latencias, n=20)[-1] if len(latencias) > 1 else 0.0
+    return logins / duracion, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicios de sesión por segundo en un worker')
+    parser.add_argument('--hilos', type=int, default=8, help='Hilos del worker simulado.')
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrencia', type=int, default=2, help='Hashes simultáneos permitidos.')
+    parser.add_argument('--metodos', nargs='+',
+                        default=['pbkdf2:sha256:600000', 'pbkdf2:sha256:260000', 'scrypt:16384:8:1'])
+    args = parser.parse_args()
+
+    print(f"{'método':<24} {'modo':<8} {'logins/s':>9} {'p95 liviana (ms)':>17}")
+    for metodo in args.metodos:
+        password_hash = generate_password_hash('secreta', method=metodo)
+        hasheador = Hasheador(hilos=args.concurrencia, pendientes=args.logins, metodo=metodo, espera=60)
+        for modo, verificar in (('directo', check_password_hash), ('acotado', hasheador.verificar)):
+            por_segundo, p95 = rafaga(verificar, password_hash, args.hilos, args.logins)
+            print(f'{metodo:<24} {modo:<8} {por_segundo:>9.1f} {p95:>17.2f}')
+
+
+if __name__ == '__main__':
+    main()
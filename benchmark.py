@@ -0,0 +1,254 @@
+# benchmark.py - Carga reproducible sobre SQLite con las rutas reales
+#
+#   python benchmark.py --perfil chico
+#   python benchmark.py --perfil chico --guardar benchmarks/chico.json
+#   python benchmark.py --perfil chico --comparar benchmarks/chico.json
+#
+# Crea la app con la configuración de pruebas sobre SQLite (en memoria por
+# defecto), siembra un volumen fijo de datos con synthetic.Generador y recorre cada
+# escenario con el cliente de pruebas de Flask. Informa p50/p95/p99,
+# peticiones por segundo y consultas por petición. Con --comparar sale con
+# código 1 si algún escenario hace más consultas por petición que la base;
+# eso no depende de la máquina. Los tiempos sólo se comparan con
+# --tolerancia, y relativos a una calibración medida en la misma corrida
+# (los milisegundos absolutos de otra máquina no sirven de referencia).
+#
+# Borra y recrea todas las tablas de la base: con una URL que no sea SQLite
+# se niega a correr salvo que se pase --destruir.
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from catalog import cache_catalogo, cache_menus
+from geo import indice_geo
+from metrics import contar_consultas
+from models import db
+from notifications import cache_no_leidas
+from promotions import indice_promociones
+from reservations import cache_disponibilidad
+from search import indice
+from synthetic import COCINAS, Generador
+
+PERFILES = {
+    'chico': {'usuarios': 200, 'restaurantes': 50, 'items': 10, 'reservas': 400, 'pedidos': 400, 'repeticiones': 100},
+    'mediano': {'usuarios': 5000, 'restaurantes': 500, 'items': 20, 'reservas': 10000, 'pedidos': 10000, 'repeticiones': 300},
+    'grande': {'usuarios': 50000, 'restaurantes': 2000, 'items': 30, 'reservas': 100000, 'pedidos': 100000, 'repeticiones': 500},
+}
+
+# Santiago, la ciudad con más restaurantes en los datos sintéticos
+LAT, LNG = -33.45, -70.66
+
+# Margen de ruido: por debajo de esto una diferencia relativa no cuenta
+# (con la calibración en torno a 8 ms equivale a poco más de 1 ms)
+RUIDO_RELATIVO = 0.15
+
+
+# ====================================================
+# DATOS
+# ====================================================
+
+def sembrar(volumenes, semilla=1):
+    # Base vacía: los ids empiezan en 1 y los escenarios pueden elegirlos sin
+    # consultarlos. Devuelve los platos de cada restaurante.
+    generador = Generador(semilla)
+    generador.generar(volumenes['usuarios'], volumenes['restaurantes'], volumenes['items'],
+                      volumenes['reservas'], volumenes['pedidos'])
+    return {restaurante_id: [plato[0] for plato in menu] for restaurante_id, menu in generador.menus.items()}
+
+
+def _reiniciar_estado():
+    # Índices y cachés son globales del proceso: se vacían para no arrastrar
+    # datos de otra base
+    indice.reiniciar()
+    indice_geo.reiniciar()
+    indice_promociones.refrescar(forzar=True)
+    for cache in (cache_catalogo, cache_menus, cache_disponibilidad, cache_no_leidas):
+        cache.clear()
+
+
+# ====================================================
+# ESCENARIOS
+# ====================================================
+# Cada escenario recibe (rng, volumenes, items) y devuelve los argumentos
+# para client.open()
+
+def _pedido(rng, volumenes, items):
+    r = rng.randint(1, volumenes['restaurantes'])
+    return {
+        'path': '/api/orders',
+        'method': 'POST',
+        'json': {'restaurant_id': r, 'items': [{'menu_item_id': rng.choice(items[r]), 'cantidad': 2}]},
+        'headers': {'Idempotency-Key': f'bench-{rng.getrandbits(64):x}'},
+    }
+
+
+ESCENARIOS = {
+    'catalogo_lista': lambda rng, v, items: {'path': '/api/v1/restaurants'},
+    'catalogo_detalle': lambda rng, v, items: {'path': f"/api/v1/restaurants/{rng.randint(1, v['restaurantes'])}"},
+    'busqueda': lambda rng, v, items: {'path': f'/api/search?q={rng.choice(list(COCINAS))[:5]}'},
+    'cercanos': lambda rng, v, items: {
+        'path': f'/api/v1/restaurants/nearby?lat={LAT + rng.uniform(-0.1, 0.1):.5f}'
+                f'&lng={LNG + rng.uniform(-0.1, 0.1):.5f}&k=10'},
+    'disponibilidad': lambda rng, v, items: {
+        'path': f"/api/v1/restaurants/{rng.randint(1, v['restaurantes'])}/availability"
+                f"?date={(date.today() + timedelta(days=rng.randint(1, 7))).isoformat()}"},
+    'perfil': lambda rng, v, items: {'path': '/profile'},
+    'pedido': _pedido,
+}
+
+
+def calibrar(repeticiones=30):
+    # Trabajo fijo en Python puro (ordenar y serializar) que mide la
+    # velocidad de esta máquina; las latencias se comparan divididas por esto
+    datos = [{'id': i, 'nombre': f'restaurante {i}', 'precio': (i * 7919) % 1000 / 10} for i in range(2000)]
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        json.loads(json.dumps(sorted(datos, key=lambda d: (d['precio'], d['id']))))
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return statistics.median(tiempos)
+
+
+def _percentil(valores, p):
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def medir(client, nombre, volumenes, items, repeticiones, calentamiento=5, semilla=1):
+    rng = random.Random(f'{semilla}-{nombre}')
+    armar = ESCENARIOS[nombre]
+    for _ in range(calentamiento):
+        client.open(**armar(rng, volumenes, items))
+
+    latencias, consultas = [], 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        argumentos = armar(rng, volumenes, items)
+        with contar_consultas() as sentencias:
+            t = time.perf_counter()
+            respuesta = client.open(**argumentos)
+            latencias.append((time.perf_counter() - t) * 1000)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f'{nombre}: {argumentos["path"]} respondió {respuesta.status_code}')
+        consultas += len(sentencias)
+    duracion = time.perf_counter() - inicio
+
+    return {
+        'peticiones': repeticiones,
+        'p50_ms': round(_percentil(latencias, 50), 3),
+        'p95_ms': round(_percentil(latencias, 95), 3),
+        'p99_ms': round(_percentil(latencias, 99), 3),
+        'rps': round(repeticiones / duracion, 1),
+        'consultas': round(consultas / repeticiones, 2),
+    }
+
+
+def ejecutar(perfil='chico', url='sqlite://', escenarios=None, semilla=1, volumenes=None, destruir=False):
+    if not url.startswith('sqlite:') and not destruir:
+        raise ValueError(f'{url.split("://")[0]}: el benchmark borra todas las tablas; '
+                         'sólo corre sobre SQLite salvo con destruir=True')
+    volumenes = dict(PERFILES[perfil], **(volumenes or {}))
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': url})
+    resultado = {
+        'perfil': perfil,
+        'volumenes': volumenes,
+        'semilla': semilla,
+        'python': platform.python_version(),
+        'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+        'escenarios': {},
+    }
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        t = time.perf_counter()
+        items = sembrar(volumenes, semilla)
+        resultado['siembra_s'] = round(time.perf_counter() - t, 2)
+        _reiniciar_estado()
+
+        client = app.test_client()
+        with client.session_transaction() as sesion:
+            sesion['user_id'] = 1
+        resultado['calibracion_ms'] = round(calibrar(), 3)
+        for nombre in escenarios or ESCENARIOS:
+            medido = medir(client, nombre, volumenes, items, volumenes['repeticiones'], semilla=semilla)
+            medido['p95_relativo'] = round(medido['p95_ms'] / resultado['calibracion_ms'], 3)
+            resultado['escenarios'][nombre] = medido
+        db.session.remove()
+        db.drop_all()
+    return resultado
+
+
+def comparar(actual, base, tolerancia=None):
+    # Regresiones: más consultas por petición que la base y, si se da una
+    # tolerancia, un p95 relativo a la calibración peor que el de la base
+    # más esa tolerancia (una base sin calibración no se compara en tiempos)
+    regresiones = []
+    for nombre, medido in actual['escenarios'].items():
+        referencia = base.get('escenarios', {}).get(nombre)
+        if referencia is None:
+            continue
+        relativo, anterior = medido.get('p95_relativo'), referencia.get('p95_relativo')
+        if tolerancia is not None and relativo is not None and anterior is not None:
+            if relativo > anterior * (1 + tolerancia) and relativo - anterior > RUIDO_RELATIVO:
+                regresiones.append(f"{nombre}: p95 {relativo}x la calibración > {anterior}x (+{tolerancia:.0%})")
+        if medido['consultas'] > referencia['consultas'] + 0.5:
+            regresiones.append(f"{nombre}: {medido['consultas']} consultas por petición > {referencia['consultas']}")
+    return regresiones
+
+
+def imprimir(resultado):
+    print(f"perfil {resultado['perfil']}: {resultado['volumenes']} (siembra {resultado['siembra_s']} s, "
+          f"calibración {resultado['calibracion_ms']} ms)")
+    print(f"{'escenario':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'pet/s':>8} {'consultas':>10}")
+    for nombre, m in resultado['escenarios'].items():
+        print(f"{nombre:<18} {m['p50_ms']:>8.2f} {m['p95_ms']:>8.2f} {m['p99_ms']:>8.2f} "
+              f"{m['rps']:>8.1f} {m['consultas']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de las rutas principales sobre SQLite')
+    parser.add_argument('--perfil', choices=sorted(PERFILES), default='chico')
+    parser.add_argument('--db', default='sqlite://', help='URL de la base (por defecto SQLite en memoria).')
+    parser.add_argument('--destruir', action='store_true',
+                        help='Permite una --db que no sea SQLite. Borra TODAS sus tablas.')
+    parser.add_argument('--escenario', action='append', choices=sorted(ESCENARIOS),
+                        help='Repetible; por defecto todos.')
+    parser.add_argument('--repeticiones', type=int)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--guardar', help='Escribe el resultado como nueva base JSON.')
+    parser.add_argument('--comparar', help='Base JSON contra la que comparar.')
+    parser.add_argument('--tolerancia', type=float,
+                        help='Compara también el p95 relativo a la calibración con este margen '
+                             '(p. ej. 0.5). Sin esto sólo se comparan consultas.')
+    args = parser.parse_args(argv)
+    if not args.db.startswith('sqlite:') and not args.destruir:
+        parser.error('el benchmark borra todas las tablas de --db; para una base que no es SQLite '
+                     'hay que pasar --destruir')
+
+    ajustes = {'repeticiones': args.repeticiones} if args.repeticiones else None
+    resultado = ejecutar(args.perfil, args.db, args.escenario, args.semilla, ajustes, destruir=args.destruir)
+    imprimir(resultado)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write('\n')
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(resultado, json.load(archivo), args.tolerancia)
+        for regresion in regresiones:
+            print(f'REGRESIÓN {regresion}')
+        if regresiones:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
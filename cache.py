@@ -0,0 +1,56 @@
+# cache.py - Caché en memoria con política LRU y caducidad (TTL)
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, maxsize=512, ttl=300):
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()
+        self.configurar(maxsize, ttl)
+
+    def configurar(self, maxsize=None, ttl=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def get_or_set(self, clave, cargar):
+        # Lectura a través de la caché: si no está (o caducó) se calcula y guarda
+        valor = self.get(clave)
+        if valor is None:
+            valor = cargar()
+            if valor is not None:
+                self.set(clave, valor)
+        return valor
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,259 @@
+# catalog.py - API del catálogo de restaurantes con caché y ETag
+import hashlib
+import json
+
+from flask import Blueprint, current_app, request, abort
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from cache import CacheLRU
+from models import db, Restaurante, CategoriaMenu, MenuItem
+
+catalog_bp = Blueprint('catalog', __name__, url_prefix='/api/v1')
+
+# Guarda el cuerpo JSON ya serializado y su ETag, listos para responder
+cache_catalogo = CacheLRU()
+# Menú de cada restaurante, ya agrupado y serializado. Sólo cambia cuando
+# cambia un plato o una categoría, así que vive más que el detalle.
+cache_menus = CacheLRU(maxsize=2048, ttl=3600)
+
+CLAVE_LISTA = 'lista'
+DIETAS = ('vegetariano', 'vegano', 'sin_gluten', 'picante')
+
+
+@catalog_bp.record_once
+def _configurar(state):
+    cache_catalogo.configurar(
+        maxsize=state.app.config.get('CATALOG_CACHE_SIZE', 512),
+        ttl=state.app.config.get('CATALOG_CACHE_TTL', 300),
+    )
+    cache_menus.configurar(
+        maxsize=state.app.config.get('MENU_CACHE_SIZE', 2048),
+        ttl=state.app.config.get('MENU_CACHE_TTL', 3600),
+    )
+
+
+def _decimal(valor):
+    return float(valor) if valor is not None else None
+
+
+def _hora(valor):
+    return valor.strftime('%H:%M') if valor is not None else None
+
+
+def resumen_restaurante(r):
+    return {
+        'id': r.id,
+        'nombre': r.nombre,
+        'slug': r.slug,
+        'tipo_cocina': r.tipo_cocina,
+        'rating': _decimal(r.rating),
+        'numero_reviews': r.numero_reviews,
+        'favoritos': r.numero_favoritos or 0,
+        'precio_rango': r.precio_rango,
+        'distancia': r.distancia,
+        'imagen_portada': r.imagen_portada,
+        'delivery': bool(r.delivery),
+        'pickup': bool(r.pickup),
+        'dine_in': bool(r.dine_in),
+    }
+
+
+def serializar_item(item):
+    return {
+        'id': item.id,
+        'nombre': item.nombre,
+        'descripcion': item.descripcion,
+        'precio': _decimal(item.precio),
+        'precio_descuento': _decimal(item.precio_descuento),
+        'categoria': item.categoria,
+        'imagen_url': item.imagen_url,
+        'disponible': bool(item.disponible),
+        'vegetariano': bool(item.vegetariano),
+        'vegano': bool(item.vegano),
+        'sin_gluten': bool(item.sin_gluten),
+        'picante': bool(item.picante),
+        'destacado': bool(item.destacado),
+    }
+
+
+def _cargar_lista():
+    restaurantes = (Restaurante.query
+                    .filter(Restaurante.estado != 'inactivo')
+                    .order_by(Restaurante.nombre)
+                    .all())
+    return _empaquetar({'restaurants': [resumen_restaurante(r) for r in restaurantes]})
+
+
+def _cargar_menu(restaurante_id):
+    # Snapshot del menú: categorías visibles y platos disponibles, en orden.
+    # Devuelve (cuerpo, etag, menu); el detalle reutiliza "menu".
+    categorias = (CategoriaMenu.query
+                  .filter_by(restaurante_id=restaurante_id, visible=True)
+                  .order_by(CategoriaMenu.orden, CategoriaMenu.id)
+                  .all())
+    items = (MenuItem.query
+             .filter_by(restaurante_id=restaurante_id, disponible=True)
+             .order_by(MenuItem.orden, MenuItem.id)
+             .all())
+
+    por_categoria = {c.id: [] for c in categorias}
+    sueltos = {}
+    dietas = dict.fromkeys(DIETAS, 0)
+    for item in items:
+        if item.categoria_id in por_categoria:
+            por_categoria[item.categoria_id].append(serializar_item(item))
+        elif item.categoria_id is None:
+            # Platos sin CategoriaMenu: se agrupan por el texto de "categoria"
+            sueltos.setdefault(item.categoria or 'Otros', []).append(serializar_item(item))
+        else:
+            continue
+        for dieta in DIETAS:
+            dietas[dieta] += bool(getattr(item, dieta))
+
+    menu = [{'id': c.id, 'nombre': c.nombre, 'descripcion': c.descripcion, 'items': por_categoria[c.id]}
+            for c in categorias]
+    menu.extend({'id': None, 'nombre': nombre, 'descripcion': None, 'items': lista}
+                for nombre, lista in sueltos.items())
+    cuerpo, etag = _empaquetar({'restaurant_id': restaurante_id, 'menu': menu, 'dietas': dietas})
+    return cuerpo, etag, menu
+
+
+def menu_restaurante(restaurante_id):
+    return cache_menus.get_or_set(restaurante_id, lambda: _cargar_menu(restaurante_id))
+
+
+def _activo(restaurante_id):
+    r = db.session.get(Restaurante, restaurante_id)
+    return r if r is not None and r.estado != 'inactivo' else None
+
+
+def _cargar_detalle(restaurante_id):
+    r = _activo(restaurante_id)
+    if r is None:
+        return None
+
+    datos = resumen_restaurante(r)
+    datos.update({
+        'descripcion': r.descripcion,
+        'direccion': r.direccion,
+        'ciudad': r.ciudad,
+        'telefono': r.telefono,
+        'horario_apertura': _hora(r.horario_apertura),
+        'horario_cierre': _hora(r.horario_cierre),
+        'dias_abierto': r.dias_abierto,
+        'logo_restaurante': r.logo_restaurante,
+        'menu': menu_restaurante(r.id)[2],
+    })
+    return _empaquetar({'restaurant': datos})
+
+
+def _empaquetar(datos):
+    cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(cuerpo).hexdigest()[:32]
+    return cuerpo, etag
+
+
+def _responder(entrada):
+    cuerpo, etag = entrada
+    respuesta = current_app.response_class(cuerpo, mimetype='application/json')
+    respuesta.set_etag(etag)
+    # El navegador guarda la copia pero siempre revalida: con If-None-Match
+    # la respuesta es un 304 sin cuerpo
+    respuesta.cache_control.public = True
+    respuesta.cache_control.no_cache = True
+    return respuesta.make_conditional(request)
+
+
+@catalog_bp.route('/restaurants')
+def lista_restaurantes():
+    return _responder(cache_catalogo.get_or_set(CLAVE_LISTA, _cargar_lista))
+
+
+@catalog_bp.route('/restaurants/<int:restaurante_id>')
+def detalle_restaurante(restaurante_id):
+    entrada = cache_catalogo.get_or_set(('detalle', restaurante_id),
+                                        lambda: _cargar_detalle(restaurante_id))
+    if entrada is None:
+        abort(404)
+    return _responder(entrada)
+
+
+@catalog_bp.route('/restaurants/<int:restaurante_id>/menu')
+def menu_de_restaurante(restaurante_id):
+    # Con el snapshot en caché la respuesta no hace consultas. El estado del
+    # restaurante sólo se consulta al armarlo.
+    entrada = cache_menus.get(restaurante_id)
+    if entrada is None:
+        if _activo(restaurante_id) is None:
+            abort(404)
+        entrada = menu_restaurante(restaurante_id)
+    return _responder(entrada[:2])
+
+
+# ====================================================
+# INVALIDACIÓN
+# ====================================================
+# Cada cambio en Restaurante, CategoriaMenu o MenuItem (que es lo que mueve su
+# updated_at) marca las entradas afectadas; se borran sólo si el commit llega
+# a completarse. Los demás procesos dependen del TTL.
+# El snapshot del menú sólo se marca por cambios en platos y categorías (o si
+# el restaurante se desactiva): un cambio de rating no lo reconstruye.
+
+def invalidar_restaurante(session, restaurante_id):
+    # Para cambios hechos con UPDATE directos, que no pasan por los eventos del ORM
+    pendientes = session.info.setdefault('catalogo_invalidar', set())
+    pendientes.add(('detalle', restaurante_id))
+    pendientes.add(CLAVE_LISTA)
+
+
+def invalidar_menu(session, restaurante_id):
+    # Ídem, para UPDATE o INSERT directos sobre platos o categorías
+    session.info.setdefault('menus_invalidar', set()).add(restaurante_id)
+    session.info.setdefault('catalogo_invalidar', set()).add(('detalle', restaurante_id))
+
+
+# Sin active_history, reasignar restaurante_id a un plato expirado no carga
+# el valor anterior y el menú de origen quedaría sin invalidar
+def _conservar_anterior(target, value, oldvalue, initiator):
+    return value
+
+
+for _atributo in (MenuItem.restaurante_id, CategoriaMenu.restaurante_id):
+    event.listen(_atributo, 'set', _conservar_anterior, active_history=True, retval=True)
+
+
+def _restaurantes_de(obj):
+    # Un plato movido de restaurante afecta al menú de origen y al de destino
+    historial = inspect(obj).attrs.restaurante_id.history
+    return {rid for rid in (obj.restaurante_id, *historial.deleted) if rid is not None}
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    pendientes = session.info.setdefault('catalogo_invalidar', set())
+    menus = session.info.setdefault('menus_invalidar', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Restaurante):
+            pendientes.add(('detalle', obj.id))
+            pendientes.add(CLAVE_LISTA)
+            if inspect(obj).attrs.estado.history.has_changes():
+                menus.add(obj.id)
+        elif isinstance(obj, (MenuItem, CategoriaMenu)):
+            for restaurante_id in _restaurantes_de(obj):
+                pendientes.add(('detalle', restaurante_id))
+                menus.add(restaurante_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    for clave in session.info.pop('catalogo_invalidar', ()):
+        cache_catalogo.delete(clave)
+    for restaurante_id in session.info.pop('menus_invalidar', ()):
+        cache_menus.delete(restaurante_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('catalogo_invalidar', None)
+    session.info.pop('menus_invalidar', None)
@@ -0,0 +1,455 @@
+# catalog_io.py - Importación y exportación masiva del catálogo (CSV y NDJSON)
+import csv
+import json
+import re
+import sys
+from datetime import datetime, time as hora
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import Blueprint
+from sqlalchemy import Boolean, Enum, Integer, Numeric, String, Time, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from catalog import invalidar_restaurante, invalidar_menu
+from models import db, Restaurante, HorarioRestaurante, CategoriaMenu, MenuItem
+
+catalog_io_bp = Blueprint('catalog_io', __name__, cli_group='catalogo')
+
+CAMPOS_RESTAURANTE = ('nombre', 'descripcion', 'tipo_cocina', 'precio_rango', 'direccion', 'ciudad',
+                      'codigo_postal', 'latitud', 'longitud', 'telefono', 'whatsapp', 'email', 'sitio_web',
+                      'horario_apertura', 'horario_cierre', 'dias_abierto', 'delivery', 'pickup', 'dine_in',
+                      'imagen_portada', 'logo_restaurante', 'estado')
+CAMPOS_HORARIO = ('dia_semana', 'hora_apertura', 'hora_cierre', 'abierto')
+CAMPOS_CATEGORIA = ('nombre', 'descripcion', 'orden', 'visible')
+CAMPOS_PLATO = ('nombre', 'descripcion', 'precio', 'precio_descuento', 'categoria', 'subcategoria', 'imagen_url',
+                'disponible', 'tiempo_preparacion', 'calorias', 'vegetariano', 'vegano', 'sin_gluten', 'picante',
+                'destacado', 'orden')
+
+# En CSV cada fila lleva el slug del restaurante y su tipo de registro; las
+# filas de un mismo restaurante van seguidas. Las columnas que no aplican al
+# tipo de registro quedan vacías. Una celda vacía no cambia la columna (en CSV
+# no se distingue vacío de NULL); en NDJSON un null explícito sí la vacía.
+REGISTROS = ('restaurante', 'horario', 'categoria', 'plato')
+COLUMNAS_CSV = ('registro', 'slug') + tuple(dict.fromkeys(
+    CAMPOS_RESTAURANTE + CAMPOS_HORARIO + CAMPOS_CATEGORIA + CAMPOS_PLATO))
+
+PATRON_SLUG = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+VERDADEROS = ('1', 'true', 'si', 'sí', 'yes', 'x')
+FALSOS = ('0', 'false', 'no')
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+# ====================================================
+# VALIDACIÓN
+# ====================================================
+
+def _convertir(columna, valor):
+    # El tipo de la columna del modelo decide cómo se interpreta el valor
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (list, dict)):
+        raise ErrorImportacion(f'{columna.name}: se esperaba un valor simple')
+    tipo = columna.type
+    try:
+        if isinstance(tipo, Boolean):
+            if isinstance(valor, bool):
+                return valor
+            if str(valor).lower() in VERDADEROS:
+                return True
+            if str(valor).lower() in FALSOS:
+                return False
+            raise ValueError
+        if isinstance(tipo, Enum):
+            if valor not in tipo.enums:
+                raise ValueError
+            return valor
+        if isinstance(tipo, Numeric):
+            # NaN e Infinity se leen sin error pero no se pueden comparar ni guardar
+            numero = Decimal(str(valor))
+            if not numero.is_finite():
+                raise ValueError
+            return numero
+        if isinstance(tipo, Integer):
+            return int(valor)
+        if isinstance(tipo, Time):
+            return valor if isinstance(valor, hora) else hora.fromisoformat(str(valor))
+        if isinstance(tipo, String):
+            valor = str(valor)
+            if tipo.length and len(valor) > tipo.length:
+                raise ErrorImportacion(f'{columna.name}: máximo {tipo.length} caracteres')
+    except (ValueError, TypeError, OverflowError, InvalidOperation):
+        raise ErrorImportacion(f'{columna.name}: valor no válido ({valor!r})')
+    return valor
+
+
+def _lista(datos, clave):
+    # Lista de objetos de un documento NDJSON (o de las filas CSV agrupadas)
+    valor = datos.get(clave) or []
+    if not isinstance(valor, list) or not all(isinstance(v, dict) for v in valor):
+        raise ErrorImportacion(f'{clave} debe ser una lista de objetos')
+    return valor
+
+
+def _campos(modelo, campos, datos, obligatorios=()):
+    resultado = {}
+    for campo in campos:
+        if campo in datos:
+            resultado[campo] = _convertir(modelo.__table__.c[campo], datos[campo])
+    for campo in obligatorios:
+        if resultado.get(campo) is None:
+            raise ErrorImportacion(f'falta {campo}')
+    return resultado
+
+
+class Documento:
+    # Un restaurante ya validado, con sus hijos. horarios, categorias o
+    # platos en None significa que el archivo no los trae y no se tocan.
+    __slots__ = ('linea', 'slug', 'restaurante', 'horarios', 'categorias', 'platos')
+
+    def __init__(self, linea, datos):
+        self.linea = linea
+        self.slug = datos.get('slug') or ''
+        if not isinstance(self.slug, str):
+            raise ErrorImportacion('slug no válido')
+        self.slug = self.slug.strip()
+        if not PATRON_SLUG.match(self.slug) or len(self.slug) > 255:
+            raise ErrorImportacion('slug no válido')
+        self.restaurante = _campos(Restaurante, CAMPOS_RESTAURANTE, datos, obligatorios=('nombre',))
+
+        self.horarios = None
+        if datos.get('horarios') is not None:
+            self.horarios = {}
+            for h in _lista(datos, 'horarios'):
+                horario = _campos(HorarioRestaurante, CAMPOS_HORARIO, h,
+                                  obligatorios=('dia_semana', 'hora_apertura', 'hora_cierre'))
+                if horario['dia_semana'] in self.horarios:
+                    raise ErrorImportacion(f"horario repetido: {horario['dia_semana']}")
+                self.horarios[horario['dia_semana']] = horario
+
+        self.categorias = self.platos = None
+        if datos.get('categorias') is not None or datos.get('platos') is not None:
+            self.categorias = {}
+            for c in _lista(datos, 'categorias'):
+                categoria = _campos(CategoriaMenu, CAMPOS_CATEGORIA, c, obligatorios=('nombre',))
+                self.categorias[categoria['nombre']] = categoria
+            self.platos = {}
+            for p in _lista(datos, 'platos'):
+                plato = _campos(MenuItem, CAMPOS_PLATO, p, obligatorios=('nombre', 'precio'))
+                if plato['nombre'] in self.platos:
+                    raise ErrorImportacion(f"plato repetido: {plato['nombre']}")
+                if plato['precio'] < 0:
+                    raise ErrorImportacion(f"precio negativo: {plato['nombre']}")
+                # Una categoría nombrada sólo en los platos se crea igual
+                if plato.get('categoria') and plato['categoria'] not in self.categorias:
+                    self.categorias[plato['categoria']] = {'nombre': plato['categoria']}
+                self.platos[plato['nombre']] = plato
+
+
+# ====================================================
+# LECTURA INCREMENTAL
+# ====================================================
+# Ambos lectores entregan (linea, datos) de a un restaurante; la memoria no
+# depende del tamaño del archivo.
+
+def leer_ndjson(archivo):
+    for numero, linea in enumerate(archivo, 1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+            if not isinstance(datos, dict):
+                raise ValueError('se esperaba un objeto')
+        except ValueError as e:
+            yield numero, ErrorImportacion(f'JSON no válido: {e}')
+            continue
+        yield numero, datos
+
+
+def _celdas(fila, campos):
+    return {c: fila[c] for c in campos if fila.get(c) is not None and fila[c].strip()}
+
+
+def leer_csv(archivo):
+    lector = csv.DictReader(archivo)
+    actual, inicio = None, None
+    for fila in lector:
+        slug = (fila.get('slug') or '').strip()
+        if actual is not None and slug != actual['slug']:
+            yield inicio, actual
+            actual = None
+        if actual is None:
+            actual = {'slug': slug}
+            inicio = lector.line_num
+        registro = (fila.get('registro') or 'restaurante').strip()
+        if registro == 'restaurante':
+            actual.update(_celdas(fila, CAMPOS_RESTAURANTE))
+        elif registro == 'horario':
+            actual.setdefault('horarios', []).append(_celdas(fila, CAMPOS_HORARIO))
+        elif registro == 'categoria':
+            actual.setdefault('categorias', []).append(_celdas(fila, CAMPOS_CATEGORIA))
+        elif registro == 'plato':
+            actual.setdefault('platos', []).append(_celdas(fila, CAMPOS_PLATO))
+        else:
+            actual['_error'] = f'línea {lector.line_num}: registro desconocido {registro!r}'
+    if actual is not None:
+        yield inicio, actual
+
+
+# ====================================================
+# IMPORTACIÓN
+# ====================================================
+
+class Informe:
+    def __init__(self, al_error=None):
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+        self.al_error = al_error
+
+    def error(self, linea, slug, mensaje):
+        self.errores.append({'linea': linea, 'slug': slug, 'error': mensaje})
+        if self.al_error is not None:
+            self.al_error(linea, slug, mensaje)
+
+
+def _hijos(modelo, clave, restaurante_ids):
+    # {(restaurante_id, clave): id} de las filas existentes del lote
+    columna = getattr(modelo, clave)
+    return {(rid, valor): id_ for id_, rid, valor in db.session.query(modelo.id, modelo.restaurante_id, columna)
+            .filter(modelo.restaurante_id.in_(restaurante_ids))}
+
+
+def _insertar(modelo, filas):
+    # executemany exige las mismas columnas en todas las filas: se agrupan por
+    # columnas presentes y las vacías se omiten para que apliquen los defaults
+    grupos = {}
+    for fila in filas:
+        fila = {k: v for k, v in fila.items() if v is not None}
+        grupos.setdefault(tuple(sorted(fila)), []).append(fila)
+    for grupo in grupos.values():
+        db.session.execute(modelo.__table__.insert(), grupo)
+
+
+def _sincronizar_hijos(modelo, clave, por_restaurante, existentes, al_faltar=None):
+    # Inserta las filas nuevas, actualiza las que coinciden por clave y a las
+    # que ya no vienen en el archivo les aplica al_faltar (no se borran: los
+    # pedidos antiguos siguen apuntando a sus platos)
+    nuevas, cambios, vistas = [], [], set()
+    for restaurante_id, filas in por_restaurante.items():
+        for valor, fila in filas.items():
+            id_ = existentes.get((restaurante_id, valor))
+            vistas.add((restaurante_id, valor))
+            if id_ is None:
+                nuevas.append(dict(fila, restaurante_id=restaurante_id))
+            else:
+                cambios.append(dict(fila, id=id_))
+    if al_faltar:
+        cambios.extend(dict(al_faltar, id=id_) for llave, id_ in existentes.items()
+                       if llave[0] in por_restaurante and llave not in vistas)
+    if nuevas:
+        _insertar(modelo, nuevas)
+    if cambios:
+        db.session.execute(update(modelo), cambios)
+
+
+def _aplicar(documentos):
+    ahora = datetime.utcnow()
+    slugs = [d.slug for d in documentos]
+    ids = dict(db.session.query(Restaurante.slug, Restaurante.id).filter(Restaurante.slug.in_(slugs)))
+    nuevos = [d for d in documentos if d.slug not in ids]
+    existentes = [d for d in documentos if d.slug in ids]
+
+    if nuevos:
+        _insertar(Restaurante, [dict(d.restaurante, slug=d.slug, created_at=ahora, updated_at=ahora)
+                                for d in nuevos])
+        ids.update(db.session.query(Restaurante.slug, Restaurante.id)
+                   .filter(Restaurante.slug.in_([d.slug for d in nuevos])))
+    if existentes:
+        # updated_at explícito: es lo que miran los índices de búsqueda y geo
+        db.session.execute(update(Restaurante), [
+            dict(d.restaurante, id=ids[d.slug], updated_at=ahora) for d in existentes])
+
+    restaurante_ids = [ids[d.slug] for d in documentos]
+    con_horarios = {ids[d.slug]: d.horarios for d in documentos if d.horarios is not None}
+    if con_horarios:
+        _sincronizar_hijos(HorarioRestaurante, 'dia_semana', con_horarios,
+                           _hijos(HorarioRestaurante, 'dia_semana', list(con_horarios)))
+
+    con_menu = [d for d in documentos if d.categorias is not None]
+    if con_menu:
+        menu_ids = [ids[d.slug] for d in con_menu]
+        _sincronizar_hijos(CategoriaMenu, 'nombre', {ids[d.slug]: d.categorias for d in con_menu},
+                           _hijos(CategoriaMenu, 'nombre', menu_ids), al_faltar={'visible': False})
+        categorias = _hijos(CategoriaMenu, 'nombre', menu_ids)
+        platos = {}
+        for d in con_menu:
+            rid = ids[d.slug]
+            platos[rid] = {nombre: dict(p, categoria_id=categorias.get((rid, p.get('categoria'))), updated_at=ahora)
+                           for nombre, p in d.platos.items()}
+        _sincronizar_hijos(MenuItem, 'nombre', platos, _hijos(MenuItem, 'nombre', menu_ids),
+                           al_faltar={'disponible': False, 'updated_at': ahora})
+
+    for restaurante_id in restaurante_ids:
+        invalidar_restaurante(db.session, restaurante_id)
+    for documento in con_menu:
+        invalidar_menu(db.session, ids[documento.slug])
+    return len(nuevos), len(existentes)
+
+
+def _aplicar_lote(documentos, informe):
+    # Un error de la base en el lote se aísla reintentando de a un documento,
+    # cada uno en su propio savepoint
+    try:
+        with db.session.begin_nested():
+            creados, actualizados = _aplicar(documentos)
+    except SQLAlchemyError:
+        creados = actualizados = 0
+        for documento in documentos:
+            try:
+                with db.session.begin_nested():
+                    c, a = _aplicar([documento])
+                creados += c
+                actualizados += a
+            except SQLAlchemyError as e:
+                informe.error(documento.linea, documento.slug, str(getattr(e, 'orig', None) or e))
+    db.session.commit()
+    informe.creados += creados
+    informe.actualizados += actualizados
+
+
+def importar(filas, tamano_lote=100, al_error=None):
+    # filas: iterable de (linea, datos) como los de leer_csv / leer_ndjson
+    informe = Informe(al_error)
+    lote, slugs = [], set()
+    for linea, datos in filas:
+        try:
+            if isinstance(datos, Exception):
+                raise datos
+            if datos.get('_error'):
+                raise ErrorImportacion(datos['_error'])
+            try:
+                documento = Documento(linea, datos)
+            except (TypeError, KeyError) as e:
+                # Cualquier forma de datos que la validación no prevea se
+                # informa en su fila en vez de cortar la importación
+                raise ErrorImportacion(f'datos no válidos: {e}')
+            if documento.slug in slugs:
+                raise ErrorImportacion('slug repetido en el mismo lote')
+        except ErrorImportacion as e:
+            slug = datos.get('slug') if isinstance(datos, dict) else None
+            informe.error(linea, slug if isinstance(slug, str) else None, str(e))
+            continue
+        lote.append(documento)
+        slugs.add(documento.slug)
+        if len(lote) >= tamano_lote:
+            _aplicar_lote(lote, informe)
+            lote, slugs = [], set()
+    if lote:
+        _aplicar_lote(lote, informe)
+    return informe
+
+
+# ====================================================
+# EXPORTACIÓN
+# ====================================================
+
+def _valor(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, hora):
+        return valor.strftime('%H:%M')
+    return valor
+
+
+def _filas(modelo, campos, restaurante_ids, orden):
+    por_restaurante = {}
+    columnas = [modelo.restaurante_id] + [getattr(modelo, c) for c in campos]
+    for fila in db.session.execute(select(*columnas).where(modelo.restaurante_id.in_(restaurante_ids))
+                                   .order_by(*orden)):
+        por_restaurante.setdefault(fila[0], []).append({c: _valor(v) for c, v in zip(campos, fila[1:])})
+    return por_restaurante
+
+
+def documentos_catalogo(tamano_lote=500):
+    # Los restaurantes se leen con un cursor del lado del servidor en una
+    # conexión propia (en MySQL no se puede consultar otra cosa por la misma
+    # conexión mientras se recorre); los hijos de cada tanda se cargan con
+    # tres consultas IN por la conexión de la sesión
+    tabla = Restaurante.__table__
+    consulta = select(tabla.c.id, tabla.c.slug, *[tabla.c[c] for c in CAMPOS_RESTAURANTE]).order_by(tabla.c.id)
+    with db.engine.connect() as conexion:
+        resultado = conexion.execution_options(stream_results=True, yield_per=tamano_lote).execute(consulta)
+        for tanda in resultado.partitions():
+            ids = [fila.id for fila in tanda]
+            horarios = _filas(HorarioRestaurante, CAMPOS_HORARIO, ids, (HorarioRestaurante.id,))
+            categorias = _filas(CategoriaMenu, CAMPOS_CATEGORIA, ids, (CategoriaMenu.orden, CategoriaMenu.id))
+            platos = _filas(MenuItem, CAMPOS_PLATO, ids, (MenuItem.orden, MenuItem.id))
+            for fila in tanda:
+                documento = {'slug': fila.slug}
+                documento.update({c: _valor(fila._mapping[c]) for c in CAMPOS_RESTAURANTE})
+                documento['horarios'] = horarios.get(fila.id, [])
+                documento['categorias'] = categorias.get(fila.id, [])
+                documento['platos'] = platos.get(fila.id, [])
+                yield documento
+
+
+def escribir_ndjson(documentos, salida):
+    for documento in documentos:
+        salida.write(json.dumps(documento, ensure_ascii=False, separators=(',', ':')))
+        salida.write('\n')
+
+
+def escribir_csv(documentos, salida):
+    escritor = csv.DictWriter(salida, fieldnames=COLUMNAS_CSV, extrasaction='ignore')
+    escritor.writeheader()
+    for documento in documentos:
+        slug = documento['slug']
+        escritor.writerow(dict(documento, registro='restaurante'))
+        for registro, clave in (('horario', 'horarios'), ('categoria', 'categorias'), ('plato', 'platos')):
+            for hijo in documento[clave]:
+                escritor.writerow(dict(hijo, registro=registro, slug=slug))
+
+
+LECTORES = {'csv': leer_csv, 'ndjson': leer_ndjson}
+ESCRITORES = {'csv': escribir_csv, 'ndjson': escribir_ndjson}
+
+
+def _formato(ruta, formato):
+    if formato:
+        return formato
+    return 'csv' if ruta.lower().endswith('.csv') else 'ndjson'
+
+
+@catalog_io_bp.cli.command('importar')
+@click.argument('ruta')
+@click.option('--formato', type=click.Choice(sorted(LECTORES)), help='Por defecto según la extensión.')
+@click.option('--lote', default=100, help='Restaurantes por transacción.')
+def importar_command(ruta, formato, lote):
+    """Crea o actualiza restaurantes (por slug) con sus horarios y menú."""
+    def al_error(linea, slug, mensaje):
+        click.echo(f'línea {linea} ({slug or "sin slug"}): {mensaje}', err=True)
+
+    lector = LECTORES[_formato(ruta, formato)]
+    with (sys.stdin if ruta == '-' else open(ruta, encoding='utf-8', newline='')) as archivo:
+        informe = importar(lector(archivo), tamano_lote=lote, al_error=al_error)
+    click.echo(f'{informe.creados} creados, {informe.actualizados} actualizados, {len(informe.errores)} con errores.')
+
+
+@catalog_io_bp.cli.command('exportar')
+@click.argument('ruta')
+@click.option('--formato', type=click.Choice(sorted(ESCRITORES)), help='Por defecto según la extensión.')
+@click.option('--lote', default=500, help='Restaurantes por tanda de lectura.')
+def exportar_command(ruta, formato, lote):
+    """Vuelca el catálogo completo sin cargarlo entero en memoria."""
+    escribir = ESCRITORES[_formato(ruta, formato)]
+    if ruta == '-':
+        escribir(documentos_catalogo(lote), sys.stdout)
+        return
+    with open(ruta, 'w', encoding='utf-8', newline='') as salida:
+        escribir(documentos_catalogo(lote), salida)
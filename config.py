@@ -1,20 +1,54 @@
 # config.py
 import os
 
+
+def _entero(nombre, defecto):
+    return int(os.environ.get(nombre, defecto))
+
+
 class Config:
     # Configuración de MySQL para XAMPP
-    SQLALCHEMY_DATABASE_URI = 'mysql://root:@localhost/final_project'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'mysql://root:@localhost/final_project')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = 'tu_clave_secreta_aqui_cambiala'
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'tu_clave_secreta_aqui_cambiala')
+    # Token de las rutas /api/admin (ver auth.py); sin él esas rutas no existen
+    ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+    # El pool es por proceso: con gunicorn el total de conexiones es
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 280,
-        'pool_pre_ping': True
+        'pool_pre_ping': True,
+        'pool_size': _entero('DB_POOL_SIZE', 5),
+        'max_overflow': _entero('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _entero('DB_POOL_TIMEOUT', 30),
     }
+    # Streams SSE abiertos a la vez por proceso (0 = sin límite); cada uno
+    # ocupa un hilo del worker. gunicorn.conf.py lo fija según el rol.
+    PEDIDOS_SSE_MAXIMO = _entero('PEDIDOS_SSE_MAXIMO', 0)
 
 class DevelopmentConfig(Config):
     DEBUG = True
 
+class ProductionConfig(Config):
+    DEBUG = False
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    # SQLite en memoria usa un StaticPool, que no acepta tamaño de pool
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SECRET_KEY = 'pruebas'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    # Sin hilos de fondo: comparten la única conexión de SQLite en memoria
+    LOG_DB_ENABLED = False
+    METRICS_FLUSH_ENABLED = False
+    PEDIDOS_RELEVO_ENABLED = False
+    # Cada prueba tiene su propia base: sin intervalo, nada queda de la anterior
+    AJUSTES_INTERVALO = 0
+
 config = {
     'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
-}
\ No newline at end of file
+}
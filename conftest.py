@@ -0,0 +1,20 @@
+# conftest.py - Aplicación de pruebas sobre SQLite en memoria
+import pytest
+
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
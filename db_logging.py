@@ -0,0 +1,191 @@
+# db_logging.py - Escritura de LogSistema en segundo plano y por lotes
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request, session
+
+from models import db, LogSistema
+
+NIVELES = {
+    logging.DEBUG: 'debug',
+    logging.INFO: 'info',
+    logging.WARNING: 'warning',
+    logging.ERROR: 'error',
+    logging.CRITICAL: 'critical',
+}
+
+# Qué hacer cuando la cola está llena
+POLITICAS = ('descartar', 'descartar_antiguo', 'bloquear')
+
+_FIN = object()
+
+
+class ManejadorLogBD(logging.Handler):
+    # emit() sólo encola un dict; un hilo aparte junta hasta tamano_lote
+    # registros (o lo que llegue en intervalo segundos) y los inserta con un
+    # único executemany, fuera de la transacción de la petición
+
+    def __init__(self, app, tamano_lote=200, intervalo=2.0, tamano_cola=10000,
+                 politica='descartar', timeout_bloqueo=0.5, level=logging.INFO):
+        super().__init__(level)
+        if politica not in POLITICAS:
+            raise ValueError(f'Política desconocida: {politica}')
+        self.app = app
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.politica = politica
+        self.timeout_bloqueo = timeout_bloqueo
+        self.cola = queue.Queue(maxsize=tamano_cola)
+        self.descartados = 0
+        self.fallidos = 0
+        self.escritos = 0
+        self._hilo = None
+        self._pid = None
+
+    # ---------- Lado de la petición ----------
+
+    def emit(self, record):
+        try:
+            fila = self._fila(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self._asegurar_hilo()
+        self._encolar(fila)
+
+    def _asegurar_hilo(self):
+        # El hilo arranca con el primer registro del proceso que lo emite: con
+        # gunicorn --preload la aplicación se crea en el maestro y los hilos
+        # no sobreviven al fork. emit() ya corre bajo el lock del Handler.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        if self._pid is not None:
+            # Cola heredada del proceso padre: sus registros no son de este worker
+            self.cola = queue.Queue(maxsize=self.cola.maxsize)
+        self._pid = pid
+        self._hilo = threading.Thread(target=self._trabajar, name='log-bd', daemon=True)
+        self._hilo.start()
+
+    def _fila(self, record):
+        fila = {
+            'nivel': NIVELES.get(record.levelno, 'critical' if record.levelno > logging.CRITICAL else 'debug'),
+            'componente': getattr(record, 'componente', None) or record.name[:100],
+            'mensaje': self.format(record),
+            'datos_contexto': self._datos(getattr(record, 'datos', None)),
+            'ip_address': None,
+            'user_agent': None,
+            'usuario_id': getattr(record, 'usuario_id', None),
+            'admin_id': getattr(record, 'admin_id', None),
+            'created_at': datetime.utcfromtimestamp(record.created),
+        }
+        # El hilo escritor no tiene contexto de petición: se copia aquí
+        if has_request_context():
+            fila['ip_address'] = request.remote_addr
+            fila['user_agent'] = request.headers.get('User-Agent')
+            if fila['usuario_id'] is None:
+                fila['usuario_id'] = session.get('user_id')
+        return fila
+
+    @staticmethod
+    def _datos(datos):
+        # Se serializa aquí y no en el insert: un valor que no pasa a JSON
+        # haría fallar el lote entero. Lo desconocido se guarda como str();
+        # si ni así (ciclos, NaN), emit() descarta sólo este registro.
+        # También deja una copia: cambios posteriores al dict no se cuelan.
+        if datos is None:
+            return None
+        return json.loads(json.dumps(datos, default=str, allow_nan=False))
+
+    def _encolar(self, fila):
+        if self.politica == 'bloquear':
+            try:
+                self.cola.put(fila, timeout=self.timeout_bloqueo)
+            except queue.Full:
+                self.descartados += 1
+            return
+        try:
+            self.cola.put_nowait(fila)
+        except queue.Full:
+            if self.politica == 'descartar_antiguo':
+                try:
+                    self.cola.get_nowait()
+                    self.cola.put_nowait(fila)
+                except (queue.Empty, queue.Full):
+                    pass
+            self.descartados += 1
+
+    # ---------- Hilo escritor ----------
+
+    def _trabajar(self):
+        terminar = False
+        while not terminar:
+            lote = []
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamano_lote:
+                espera = limite - time.monotonic()
+                if espera <= 0:
+                    break
+                try:
+                    fila = self.cola.get(timeout=espera)
+                except queue.Empty:
+                    break
+                if fila is _FIN:
+                    terminar = True
+                    break
+                lote.append(fila)
+            if terminar:
+                # Vaciar lo que quede antes de salir
+                while True:
+                    try:
+                        fila = self.cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if fila is not _FIN:
+                        lote.append(fila)
+            for inicio in range(0, len(lote), self.tamano_lote):
+                self._escribir(lote[inicio:inicio + self.tamano_lote])
+
+    def _escribir(self, lote):
+        if not lote:
+            return
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conexion:
+                    conexion.execute(LogSistema.__table__.insert(), lote)
+            self.escritos += len(lote)
+        except Exception:
+            # Perder logs es preferible a tumbar el hilo o la aplicación
+            self.fallidos += len(lote)
+
+    def close(self):
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            self.cola.put(_FIN)
+            self._hilo.join(timeout=max(self.intervalo * 2, 5))
+        super().close()
+
+
+def instalar_log_bd(app, logger=None):
+    config = app.config
+    manejador = ManejadorLogBD(
+        app,
+        tamano_lote=config.get('LOG_DB_BATCH_SIZE', 200),
+        intervalo=config.get('LOG_DB_FLUSH_INTERVAL', 2.0),
+        tamano_cola=config.get('LOG_DB_QUEUE_SIZE', 10000),
+        politica=config.get('LOG_DB_POLICY', 'descartar'),
+        level=config.get('LOG_DB_LEVEL', logging.INFO),
+    )
+    logger = logger or app.logger
+    logger.addHandler(manejador)
+    if logger.level == logging.NOTSET or logger.level > manejador.level:
+        logger.setLevel(manejador.level)
+    # Al apagar el proceso se escriben los registros pendientes
+    atexit.register(manejador.close)
+    app.extensions['log_bd'] = manejador
+    return manejador
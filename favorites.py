@@ -0,0 +1,203 @@
+# favorites.py - Favoritos con caché por usuario y contador por restaurante
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+import click
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy import delete, event, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from cache import CacheLRU
+from models import db, Favorito, Restaurante
+
+favorites_bp = Blueprint('favorites', __name__, cli_group='favoritos')
+
+# usuario_id -> ids de sus restaurantes favoritos, en un array ordenado
+# (4 bytes por id en vez de un int de Python por elemento de un set).
+# Un cambio sólo invalida la caché del proceso que lo hizo; el TTL corto
+# acota cuánto tardan los demás workers en mostrar el corazón correcto.
+# Los cambios nunca se deciden con esta caché, siempre contra la base.
+cache_favoritos = CacheLRU(maxsize=50000, ttl=30)
+
+MAXIMO_IDS = 200
+
+
+@favorites_bp.record_once
+def _configurar(state):
+    cache_favoritos.configurar(
+        maxsize=state.app.config.get('FAVORITOS_CACHE_SIZE', 50000),
+        ttl=state.app.config.get('FAVORITOS_CACHE_TTL', 30),
+    )
+
+
+# ====================================================
+# CONSULTAS
+# ====================================================
+
+def favoritos_de(usuario_id):
+    return cache_favoritos.get_or_set(usuario_id, lambda: array('i', sorted(
+        rid for rid, in db.session.query(Favorito.restaurante_id).filter_by(usuario_id=usuario_id))))
+
+
+def es_favorito(usuario_id, restaurante_id):
+    ids = favoritos_de(usuario_id)
+    i = bisect_left(ids, restaurante_id)
+    return i < len(ids) and ids[i] == restaurante_id
+
+
+# ====================================================
+# ALTAS Y BAJAS
+# ====================================================
+# Insertar y borrar son idempotentes: el índice único (usuario_id,
+# restaurante_id) rechaza el duplicado y un DELETE sin filas no cambia nada.
+# El contador del restaurante sólo se mueve si la fila realmente cambió, en
+# la misma transacción.
+
+def _contar(conexion, restaurante_id, delta):
+    # updated_at se deja igual: un favorito no es un cambio del restaurante
+    # (no debe reindexar la búsqueda ni la rejilla geográfica). Por eso no
+    # entra en los backups incrementales: restaurar_backup lo recalcula con
+    # reconciliar(). Los listados en caché muestran el número nuevo cuando caducan.
+    conexion.execute(
+        update(Restaurante.__table__)
+        .where(Restaurante.id == restaurante_id)
+        .values(numero_favoritos=func.coalesce(Restaurante.numero_favoritos, 0) + delta,
+                updated_at=Restaurante.updated_at)
+    )
+
+
+def marcar(usuario_id, restaurante_id, favorito):
+    # Deja el favorito en el estado pedido; devuelve True si hubo cambio
+    if favorito:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Favorito).values(usuario_id=usuario_id, restaurante_id=restaurante_id,
+                                                           created_at=datetime.utcnow()))
+            delta = 1
+        except IntegrityError:
+            delta = 0
+    else:
+        delta = -db.session.execute(
+            delete(Favorito).where(Favorito.usuario_id == usuario_id, Favorito.restaurante_id == restaurante_id)
+        ).rowcount
+    if delta:
+        _contar(db.session.connection(), restaurante_id, delta)
+        invalidar_favoritos(db.session, usuario_id)
+    db.session.commit()
+    return bool(delta)
+
+
+def invalidar_favoritos(session, usuario_id):
+    session.info.setdefault('favoritos_invalidar', set()).add(usuario_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _cambios_orm(session, flush_context):
+    # Favoritos creados o borrados como objetos (p. ej. en cascada al borrar
+    # un restaurante) también mueven el contador
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Favorito):
+            deltas[obj.restaurante_id] = deltas.get(obj.restaurante_id, 0) + 1
+            invalidar_favoritos(session, obj.usuario_id)
+    for obj in session.deleted:
+        if isinstance(obj, Favorito):
+            deltas[obj.restaurante_id] = deltas.get(obj.restaurante_id, 0) - 1
+            invalidar_favoritos(session, obj.usuario_id)
+    conexion = None
+    for restaurante_id, delta in deltas.items():
+        if delta:
+            conexion = conexion or session.connection()
+            _contar(conexion, restaurante_id, delta)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    for usuario_id in session.info.pop('favoritos_invalidar', ()):
+        cache_favoritos.delete(usuario_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('favoritos_invalidar', None)
+
+
+def reconciliar(tamano_lote=500):
+    # Recalcula numero_favoritos por lotes de ids; devuelve cuántos corrigió
+    corregidos = 0
+    ultimo_id = 0
+    while True:
+        lote = (db.session.query(Restaurante.id, Restaurante.numero_favoritos)
+                .filter(Restaurante.id > ultimo_id)
+                .order_by(Restaurante.id)
+                .limit(tamano_lote)
+                .all())
+        if not lote:
+            break
+        ultimo_id = lote[-1].id
+        reales = dict(db.session.query(Favorito.restaurante_id, func.count(Favorito.id))
+                      .filter(Favorito.restaurante_id.in_([r.id for r in lote]))
+                      .group_by(Favorito.restaurante_id))
+        for rid, guardado in lote:
+            if (guardado or 0) != reales.get(rid, 0):
+                db.session.execute(update(Restaurante.__table__).where(Restaurante.id == rid)
+                                   .values(numero_favoritos=reales.get(rid, 0), updated_at=Restaurante.updated_at))
+                corregidos += 1
+        db.session.commit()
+    return corregidos
+
+
+# ====================================================
+# RUTAS
+# ====================================================
+
+def _responder_cambio(restaurante_id, favorito):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Debes iniciar sesión para guardar favoritos.'}), 401
+    if db.session.get(Restaurante, restaurante_id) is None:
+        return jsonify({'success': False, 'error': 'Restaurante no encontrado.'}), 404
+    if favorito is None:
+        # Invertir según la base, no según la caché: otro worker pudo
+        # cambiarlo y esta copia seguiría vieja hasta caducar
+        favorito = not db.session.query(Favorito.query.filter_by(
+            usuario_id=session['user_id'], restaurante_id=restaurante_id).exists()).scalar()
+    marcar(session['user_id'], restaurante_id, favorito)
+    contador = db.session.query(Restaurante.numero_favoritos).filter_by(id=restaurante_id).scalar()
+    return jsonify({'success': True, 'action': 'added' if favorito else 'removed', 'favorite': favorito,
+                    'count': contador or 0})
+
+
+@favorites_bp.route('/toggle_favorite/<int:restaurante_id>', methods=['POST'])
+def toggle_favorite(restaurante_id):
+    # Con {"favorite": true|false} en el cuerpo deja ese estado (idempotente,
+    # es lo que envía script.js); sin cuerpo invierte el estado guardado
+    deseado = (request.get_json(silent=True) or {}).get('favorite')
+    return _responder_cambio(restaurante_id, deseado if isinstance(deseado, bool) else None)
+
+
+@favorites_bp.route('/api/favorites/<int:restaurante_id>', methods=['PUT', 'DELETE'])
+def favorito(restaurante_id):
+    return _responder_cambio(restaurante_id, request.method == 'PUT')
+
+
+@favorites_bp.route('/api/favorites/state')
+def estado_favoritos():
+    # Estado de los corazones de toda una página en una llamada:
+    # ?ids=1,2,3 -> {"favorites": [2]}. Sin sesión, ninguno.
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()][:MAXIMO_IDS]
+    except ValueError:
+        return jsonify({'success': False, 'error': 'ids no válidos'}), 400
+    if 'user_id' not in session:
+        return jsonify({'success': True, 'favorites': []})
+    return jsonify({'success': True,
+                    'favorites': [rid for rid in ids if es_favorito(session['user_id'], rid)]})
+
+
+@favorites_bp.cli.command('reconciliar')
+@click.option('--lote', default=500, help='Restaurantes por lote.')
+def reconciliar_command(lote):
+    """Recalcula numero_favoritos desde la tabla favoritos."""
+    click.echo(f'{reconciliar(lote)} restaurantes corregidos.')
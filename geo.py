@@ -0,0 +1,222 @@
+# geo.py - Restaurantes cercanos con índice espacial en rejilla
+import math
+import threading
+import time
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request, session, abort
+
+from catalog import resumen_restaurante
+from models import Restaurante, DireccionUsuario
+
+geo_bp = Blueprint('geo', __name__, url_prefix='/api/v1')
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+# Tamaño de cada celda de la rejilla en grados (~5.5 km de latitud)
+TAMANO_CELDA = 0.05
+
+SERVICIOS = ('delivery', 'pickup', 'dine_in')
+
+
+def haversine(lat, lng, lats, lngs):
+    # Distancia en km desde un punto a un lote de puntos (arrays numpy).
+    # numpy se importa al primer cálculo y no al arrancar cada worker
+    import numpy as np
+    lat1 = math.radians(lat)
+    lats = np.radians(lats)
+    dlat = lats - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats) * np.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class IndiceGeografico:
+    def __init__(self, tamano_celda=TAMANO_CELDA):
+        self.tamano_celda = tamano_celda
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            # restaurante_id -> (lat, lng, servicios)
+            self._puntos = {}
+            # (fila, columna) -> set de restaurante_id
+            self._celdas = {}
+            # restaurante_id -> datos para la respuesta
+            self._resumenes = {}
+            self.ultima_actualizacion = None
+            self._ultima_sincronizacion = 0.0
+
+    def _celda(self, lat, lng):
+        return (math.floor(lat / self.tamano_celda), math.floor(lng / self.tamano_celda))
+
+    # ---------- Mantenimiento ----------
+
+    def agregar(self, restaurante):
+        if restaurante.latitud is None or restaurante.longitud is None or restaurante.estado == 'inactivo':
+            self.eliminar(restaurante.id)
+            return
+        lat, lng = float(restaurante.latitud), float(restaurante.longitud)
+        servicios = frozenset(s for s in SERVICIOS if getattr(restaurante, s))
+        resumen = resumen_restaurante(restaurante)
+        with self._lock:
+            self._eliminar_sin_lock(restaurante.id)
+            self._puntos[restaurante.id] = (lat, lng, servicios)
+            self._celdas.setdefault(self._celda(lat, lng), set()).add(restaurante.id)
+            self._resumenes[restaurante.id] = resumen
+
+    def eliminar(self, restaurante_id):
+        with self._lock:
+            self._eliminar_sin_lock(restaurante_id)
+
+    def _eliminar_sin_lock(self, restaurante_id):
+        punto = self._puntos.pop(restaurante_id, None)
+        self._resumenes.pop(restaurante_id, None)
+        if punto is None:
+            return
+        celda = self._celda(punto[0], punto[1])
+        ids = self._celdas.get(celda)
+        if ids is not None:
+            ids.discard(restaurante_id)
+            if not ids:
+                del self._celdas[celda]
+
+    def sincronizar(self, forzar=False):
+        # Igual que el índice de búsqueda: sólo se recargan los restaurantes
+        # con updated_at posterior a la última sincronización
+        intervalo = current_app.config.get('GEO_SYNC_INTERVAL', 5)
+        ahora = time.monotonic()
+        if not forzar and self._ultima_sincronizacion and ahora - self._ultima_sincronizacion < intervalo:
+            return
+        self._ultima_sincronizacion = ahora
+
+        desde = self.ultima_actualizacion
+        inicio = datetime.utcnow()
+        consulta = Restaurante.query
+        if desde is not None:
+            consulta = consulta.filter(Restaurante.updated_at >= desde)
+        restaurantes = consulta.all()
+        self.ultima_actualizacion = inicio
+        for restaurante in restaurantes:
+            self.agregar(restaurante)
+
+    # ---------- Consultas ----------
+
+    def _candidatos(self, lat, lng, radio_km, servicios):
+        # Celdas que cubren la caja que envuelve al círculo de búsqueda
+        dlat = radio_km / KM_POR_GRADO
+        coseno = max(math.cos(math.radians(lat)), 0.01)
+        dlng = min(radio_km / (KM_POR_GRADO * coseno), 180.0)
+        fila_min, col_min = self._celda(lat - dlat, lng - dlng)
+        fila_max, col_max = self._celda(lat + dlat, lng + dlng)
+
+        ids, lats, lngs = [], [], []
+        # Si la caja tiene más celdas que ocupadas hay, recorrer las ocupadas
+        total_celdas = (fila_max - fila_min + 1) * (col_max - col_min + 1)
+        if total_celdas > len(self._celdas):
+            celdas = (c for c in self._celdas
+                      if fila_min <= c[0] <= fila_max and col_min <= c[1] <= col_max)
+        else:
+            celdas = ((f, c) for f in range(fila_min, fila_max + 1)
+                      for c in range(col_min, col_max + 1))
+        for celda in celdas:
+            for restaurante_id in self._celdas.get(celda, ()):
+                p_lat, p_lng, p_servicios = self._puntos[restaurante_id]
+                if servicios and not servicios <= p_servicios:
+                    continue
+                ids.append(restaurante_id)
+                lats.append(p_lat)
+                lngs.append(p_lng)
+        return ids, lats, lngs
+
+    def en_radio(self, lat, lng, radio_km, servicios=(), limite=None):
+        servicios = frozenset(servicios)
+        with self._lock:
+            ids, lats, lngs = self._candidatos(lat, lng, radio_km, servicios)
+            resumenes = [self._resumenes[i] for i in ids]
+        if not ids:
+            return []
+        import numpy as np
+        distancias = haversine(lat, lng, np.array(lats), np.array(lngs))
+        dentro = np.nonzero(distancias <= radio_km)[0]
+        orden = dentro[np.argsort(distancias[dentro], kind='stable')]
+        if limite is not None:
+            orden = orden[:limite]
+        return [(resumenes[i], float(distancias[i])) for i in orden]
+
+    def mas_cercanos(self, lat, lng, k=10, servicios=(), radio_max_km=None):
+        # Se amplía el radio hasta reunir k resultados: los k más cercanos
+        # dentro de un círculo son también los k más cercanos en total
+        if radio_max_km is None:
+            radio_max_km = current_app.config.get('GEO_MAX_RADIUS_KM', 200)
+        radio = self.tamano_celda * KM_POR_GRADO
+        while True:
+            resultados = self.en_radio(lat, lng, radio, servicios, limite=k)
+            if len(resultados) >= k or radio >= radio_max_km:
+                return resultados
+            radio = min(radio * 2, radio_max_km)
+
+    def cubre_entrega(self, restaurante_id, lat, lng, radio_km):
+        # Camino crítico del checkout: un solo cálculo, sin tocar la base
+        punto = self._puntos.get(restaurante_id)
+        if punto is None or 'delivery' not in punto[2]:
+            return False
+        return float(haversine(lat, lng, [punto[0]], [punto[1]])[0]) <= radio_km
+
+
+indice_geo = IndiceGeografico()
+
+
+def _coordenadas_peticion():
+    # Las coordenadas llegan en la URL o salen de una dirección guardada del usuario
+    direccion_id = request.args.get('direccion_id', type=int)
+    if direccion_id is not None:
+        if 'user_id' not in session:
+            abort(401)
+        direccion = DireccionUsuario.query.filter_by(id=direccion_id, usuario_id=session['user_id']).first()
+        if direccion is None or direccion.latitud is None or direccion.longitud is None:
+            abort(404)
+        return float(direccion.latitud), float(direccion.longitud)
+
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        abort(400)
+    return lat, lng
+
+
+@geo_bp.route('/restaurants/nearby')
+def restaurantes_cercanos():
+    lat, lng = _coordenadas_peticion()
+    servicios = [s for s in SERVICIOS if request.args.get(s) in ('1', 'true')]
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    radio = request.args.get('radius_km', type=float)
+    # float() acepta 'nan' e 'inf', que no sirven para calcular las celdas
+    if radio is not None and not (math.isfinite(radio) and radio > 0):
+        abort(400)
+
+    indice_geo.sincronizar()
+    if radio is not None:
+        resultados = indice_geo.en_radio(lat, lng, radio, servicios, limite=k)
+    else:
+        resultados = indice_geo.mas_cercanos(lat, lng, k, servicios)
+
+    return jsonify({
+        'lat': lat,
+        'lng': lng,
+        'results': [dict(resumen, distancia_km=round(distancia, 2)) for resumen, distancia in resultados],
+    })
+
+
+@geo_bp.route('/restaurants/<int:restaurante_id>/delivery-coverage')
+def cobertura_entrega(restaurante_id):
+    lat, lng = _coordenadas_peticion()
+    radio = current_app.config.get('DELIVERY_RADIUS_KM', 5)
+    indice_geo.sincronizar()
+    return jsonify({
+        'restaurant_id': restaurante_id,
+        'radius_km': radio,
+        'covered': indice_geo.cubre_entrega(restaurante_id, lat, lng, radio),
+    })
@@ -0,0 +1,37 @@
+# gunicorn.conf.py - Configuración de gunicorn según GUNICORN_ROL
+#
+# Un stream SSE (tracking.py) tiene tomado un hilo de gthread mientras está
+# abierto, hasta PEDIDOS_SSE_DURACION segundos. Por eso hay dos pools que se
+# despliegan por separado desde la misma imagen, y el proxy reparte:
+#
+#   web (por defecto)  todo lo demás. Pocos hilos por worker; si igual le
+#                      llega un stream, cada worker acepta como máximo
+#                      PEDIDOS_SSE_MAXIMO (2) y los demás hilos siguen
+#                      atendiendo páginas y API.
+#   streams            sólo /api/orders/<id>/events y
+#                      /api/restaurants/<id>/orders/events. Un stream
+#                      inactivo es un hilo dormido en un Event, sin conexión
+#                      a la base, así que este pool usa muchos hilos. El
+#                      límite de clientes mirando pedidos a la vez es
+#                      SSE_WORKERS * (SSE_THREADS - 8); los que sobran
+#                      reciben 503 y script.js reintenta.
+#
+#   GUNICORN_ROL=streams PORT=8082 gunicorn wsgi:app
+import os
+
+rol = os.environ.get('GUNICORN_ROL', 'web')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8081')}"
+worker_class = 'gthread'
+preload_app = True
+forwarded_allow_ips = '*'
+
+if rol == 'streams':
+    workers = int(os.environ.get('SSE_WORKERS', 1))
+    threads = int(os.environ.get('SSE_THREADS', 256))
+    # Unos hilos quedan libres para responder el 503 a los que sobran
+    os.environ.setdefault('PEDIDOS_SSE_MAXIMO', str(max(threads - 8, 1)))
+else:
+    workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+    threads = int(os.environ.get('GUNICORN_THREADS', 12))
+    os.environ.setdefault('PEDIDOS_SSE_MAXIMO', '2')
@@ -0,0 +1,268 @@
+# images.py - Variantes redimensionadas (WebP/AVIF) de las imágenes estáticas
+#
+#   flask imagenes generar            # todo static/images y static/uploads
+#   flask imagenes generar --limpiar  # además borra variantes huérfanas
+#
+# Cada imagen de origen se reduce a los anchos de ANCHOS y se codifica en
+# cada formato de FORMATOS. El nombre del archivo lleva una huella del
+# contenido de origen y de los parámetros, así que una URL nunca cambia de
+# contenido y se puede servir como immutable. Las variantes ya generadas se
+# reutilizan desde el disco; el manifiesto (static/variantes/manifest.json)
+# es lo único que se lee al renderizar.
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import Blueprint, current_app, request, url_for
+from markupsafe import Markup, escape
+
+images_bp = Blueprint('images', __name__, cli_group='imagenes')
+
+ANCHOS = {'miniatura': 160, 'tarjeta': 480, 'portada': 1200}
+# Calidad por formato; el orden es el de preferencia en <picture>
+FORMATOS = {'avif': 50, 'webp': 78}
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.webp')
+DIRECTORIOS_ORIGEN = ('images', 'uploads')
+DIRECTORIO_VARIANTES = 'variantes'
+VERSION = 1  # subirla cambia todas las huellas
+
+# Un año: el máximo que respetan los navegadores
+UN_AÑO = 365 * 24 * 3600
+
+_SIZES = {
+    'miniatura': '160px',
+    'tarjeta': '(max-width: 600px) 100vw, 480px',
+    'portada': '100vw',
+}
+
+
+# ====================================================
+# GENERACIÓN
+# ====================================================
+
+def _base(ruta):
+    # "images/lazaña.jpg" -> "lazana": nombres ASCII para las URLs
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    nombre = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode()
+    return ''.join(c if c.isalnum() else '-' for c in nombre).strip('-').lower() or 'imagen'
+
+
+def huella(contenido):
+    parametros = json.dumps([VERSION, ANCHOS, FORMATOS], sort_keys=True).encode()
+    return hashlib.sha256(parametros + contenido).hexdigest()[:12]
+
+
+def _procesar(origen, destino, relativa):
+    # Corre en un proceso del pool: abre, decodifica y codifica cada variante.
+    # Devuelve la entrada del manifiesto para la imagen.
+    from PIL import Image, ImageOps, features
+
+    with open(origen, 'rb') as archivo:
+        contenido = archivo.read()
+    firma = huella(contenido)
+    base = _base(relativa)
+
+    with Image.open(origen) as original:
+        imagen = ImageOps.exif_transpose(original)
+        imagen.load()
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'transparency' in imagen.info else 'RGB')
+    ancho_original, alto_original = imagen.size
+
+    # Sin agrandar: los anchos mayores que el original se recortan a él
+    anchos = sorted({min(ancho, ancho_original) for ancho in ANCHOS.values()})
+    variantes, generadas = {}, 0
+    for formato, calidad in FORMATOS.items():
+        # Pillow sin libavif sólo genera WebP
+        if not features.check(formato):
+            continue
+        variantes[formato] = []
+        for ancho in anchos:
+            nombre = f'{base}-{ancho}w.{firma}.{formato}'
+            ruta = os.path.join(destino, nombre)
+            if not os.path.exists(ruta):
+                alto = max(1, round(alto_original * ancho / ancho_original))
+                copia = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+                temporal = f'{ruta}.{os.getpid()}.tmp'
+                copia.save(temporal, format=formato.upper(), quality=calidad)
+                os.replace(temporal, ruta)
+                generadas += 1
+            variantes[formato].append([ancho, f'{DIRECTORIO_VARIANTES}/{nombre}'])
+    return relativa, {'huella': firma, 'ancho': ancho_original, 'alto': alto_original,
+                      'variantes': variantes}, generadas
+
+
+def _origenes(static):
+    for directorio in DIRECTORIOS_ORIGEN:
+        for raiz, _, archivos in os.walk(os.path.join(static, directorio)):
+            for archivo in sorted(archivos):
+                if archivo.lower().endswith(EXTENSIONES):
+                    ruta = os.path.join(raiz, archivo)
+                    yield ruta, os.path.relpath(ruta, static).replace(os.sep, '/')
+
+
+def generar_variantes(static, procesos=None, limpiar=False):
+    # Codificar es CPU pura y Pillow no suelta el GIL en todo el trabajo:
+    # un pool de procesos aprovecha todos los núcleos
+    destino = os.path.join(static, DIRECTORIO_VARIANTES)
+    os.makedirs(destino, exist_ok=True)
+    manifiesto, generadas = {}, 0
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        trabajos = [pool.submit(_procesar, ruta, destino, relativa) for ruta, relativa in _origenes(static)]
+        for trabajo in trabajos:
+            relativa, entrada, nuevas = trabajo.result()
+            manifiesto[relativa] = entrada
+            generadas += nuevas
+
+    borradas = 0
+    if limpiar:
+        vigentes = {os.path.basename(archivo) for entrada in manifiesto.values()
+                    for lista in entrada['variantes'].values() for _, archivo in lista}
+        for archivo in os.listdir(destino):
+            if archivo != 'manifest.json' and archivo not in vigentes:
+                os.remove(os.path.join(destino, archivo))
+                borradas += 1
+
+    temporal = os.path.join(destino, 'manifest.json.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporal, os.path.join(destino, 'manifest.json'))
+    return {'imagenes': len(manifiesto), 'generadas': generadas, 'borradas': borradas}
+
+
+@images_bp.cli.command('generar')
+@click.option('--procesos', type=int, help='Por defecto, uno por núcleo.')
+@click.option('--limpiar', is_flag=True, help='Borra las variantes que ya no corresponden a ninguna imagen.')
+def generar_command(procesos, limpiar):
+    """Genera las variantes WebP/AVIF y el manifiesto."""
+    resultado = generar_variantes(current_app.static_folder, procesos, limpiar)
+    click.echo(f"{resultado['imagenes']} imágenes, {resultado['generadas']} variantes nuevas, "
+               f"{resultado['borradas']} borradas.")
+
+
+# ====================================================
+# MANIFIESTO Y PLANTILLAS
+# ====================================================
+
+class Manifiesto:
+    # Se relee sólo si cambió el archivo (p. ej. tras un "flask imagenes generar")
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ruta = None
+        self._mtime = None
+        self._datos = {}
+
+    def datos(self, static):
+        ruta = os.path.join(static, DIRECTORIO_VARIANTES, 'manifest.json')
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            return {}
+        if ruta != self._ruta or mtime != self._mtime:
+            with self._lock:
+                with open(ruta, encoding='utf-8') as archivo:
+                    self._datos = json.load(archivo)
+                self._ruta, self._mtime = ruta, mtime
+        return self._datos
+
+
+manifiesto = Manifiesto()
+
+
+def variantes(ruta):
+    return manifiesto.datos(current_app.static_folder).get(ruta.lstrip('/'))
+
+
+def _srcset(lista):
+    return ', '.join(f"{url_for('static', filename=archivo)} {ancho}w" for ancho, archivo in lista)
+
+
+def imagen(ruta, alt='', tamano='tarjeta', sizes=None, **atributos):
+    # <picture> con srcset por formato. Las rutas sin variantes (URLs
+    # externas, imágenes aún no procesadas) salen como un <img> común.
+    atributos.setdefault('loading', 'lazy')
+    atributos.setdefault('decoding', 'async')
+    entrada = variantes(ruta) if ruta and '://' not in ruta else None
+    if entrada is None:
+        src = ruta if not ruta or '://' in ruta else url_for('static', filename=ruta.lstrip('/'))
+        extra = ''.join(f' {k}="{escape(v)}"' for k, v in atributos.items())
+        return Markup(f'<img src="{escape(src or "")}" alt="{escape(alt)}"{extra}>')
+
+    ancho = min(ANCHOS[tamano], entrada['ancho'])
+    atributos.setdefault('width', ancho)
+    atributos.setdefault('height', round(entrada['alto'] * ancho / entrada['ancho']))
+    sizes = sizes or _SIZES[tamano]
+    fuentes = ''.join(f'<source type="image/{formato}" srcset="{escape(_srcset(lista))}" sizes="{escape(sizes)}">'
+                      for formato, lista in entrada['variantes'].items() if formato != 'webp')
+    webp = entrada['variantes']['webp']
+    # El <img> usa WebP, que entienden todos los navegadores actuales
+    src = next((archivo for w, archivo in webp if w >= ancho), webp[-1][1])
+    extra = ''.join(f' {k}="{escape(v)}"' for k, v in atributos.items())
+    return Markup(f'<picture>{fuentes}<img src="{escape(url_for("static", filename=src))}" '
+                  f'srcset="{escape(_srcset(webp))}" sizes="{escape(sizes)}" alt="{escape(alt)}"{extra}></picture>')
+
+
+@images_bp.app_context_processor
+def _helpers():
+    return {'imagen': imagen}
+
+
+# ====================================================
+# CACHÉ HTTP DE ESTÁTICOS
+# ====================================================
+
+class Versiones:
+    # Huella de cada archivo estático para agregar ?v= a sus URLs; se
+    # recalcula sólo si cambia la fecha de modificación
+    def __init__(self):
+        self._cache = {}
+
+    def de(self, static, filename):
+        ruta = os.path.join(static, filename)
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            return None
+        guardado = self._cache.get(ruta)
+        if guardado is None or guardado[0] != mtime:
+            with open(ruta, 'rb') as archivo:
+                guardado = (mtime, hashlib.sha256(archivo.read()).hexdigest()[:10])
+            self._cache[ruta] = guardado
+        return guardado[1]
+
+
+versiones = Versiones()
+
+
+@images_bp.app_url_defaults
+def _version_estaticos(endpoint, valores):
+    # Las variantes ya llevan la huella en el nombre; al resto (css, js,
+    # imágenes originales) se le agrega ?v=<huella>
+    if endpoint != 'static' or 'v' in valores:
+        return
+    filename = valores.get('filename', '')
+    if filename.startswith(DIRECTORIO_VARIANTES + '/'):
+        return
+    version = versiones.de(current_app.static_folder, filename)
+    if version:
+        valores['v'] = version
+
+
+@images_bp.after_app_request
+def _cache_estaticos(response):
+    if request.endpoint != 'static' or response.status_code not in (200, 304):
+        return response
+    filename = (request.view_args or {}).get('filename', '')
+    variante = filename.startswith(DIRECTORIO_VARIANTES + '/') and not filename.endswith('.json')
+    # Un ?v= viejo (p. ej. en una página publicada antes del deploy) trae el
+    # archivo nuevo: cachearlo como immutable lo dejaría pegado a la URL vieja
+    version = request.args.get('v')
+    if variante or (version and version == versiones.de(current_app.static_folder, filename)):
+        response.cache_control.public = True
+        response.cache_control.max_age = UN_AÑO
+        response.cache_control.immutable = True
+    return response
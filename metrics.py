@@ -0,0 +1,339 @@
+# metrics.py - Latencia por ruta y consultas a la base, agregadas en memoria
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from auth import requiere_admin
+from models import db, MetricaSistema
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Límites superiores de los tramos del histograma, en milisegundos
+TRAMOS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+PERIODOS = ('hora', 'dia')
+
+
+class PresupuestoExcedido(Exception):
+    pass
+
+
+def inicio_periodo(periodo, momento):
+    if periodo == 'hora':
+        return momento.replace(minute=0, second=0, microsecond=0)
+    return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class Estadistica:
+    __slots__ = ('peticiones', 'suma_ms', 'max_ms', 'tramos', 'estados', 'consultas', 'tiempo_bd_ms')
+
+    def __init__(self):
+        self.peticiones = 0
+        self.suma_ms = 0.0
+        self.max_ms = 0.0
+        self.tramos = [0] * len(TRAMOS_MS)
+        self.estados = {}
+        self.consultas = 0
+        self.tiempo_bd_ms = 0.0
+
+    def registrar(self, duracion_ms, estado, consultas, tiempo_bd_ms):
+        self.peticiones += 1
+        self.suma_ms += duracion_ms
+        if duracion_ms > self.max_ms:
+            self.max_ms = duracion_ms
+        self.tramos[bisect.bisect_left(TRAMOS_MS, duracion_ms)] += 1
+        self.estados[estado] = self.estados.get(estado, 0) + 1
+        self.consultas += consultas
+        self.tiempo_bd_ms += tiempo_bd_ms
+
+    def combinar(self, otra):
+        self.peticiones += otra.peticiones
+        self.suma_ms += otra.suma_ms
+        self.max_ms = max(self.max_ms, otra.max_ms)
+        self.tramos = [a + b for a, b in zip(self.tramos, otra.tramos)]
+        for estado, n in otra.estados.items():
+            self.estados[estado] = self.estados.get(estado, 0) + n
+        self.consultas += otra.consultas
+        self.tiempo_bd_ms += otra.tiempo_bd_ms
+
+    def percentil(self, p):
+        # Estimación por tramos: se devuelve el límite del tramo que contiene p
+        if not self.peticiones:
+            return 0.0
+        objetivo = p * self.peticiones
+        acumulado = 0
+        for limite, n in zip(TRAMOS_MS, self.tramos):
+            acumulado += n
+            if acumulado >= objetivo:
+                return self.max_ms if limite == float('inf') else min(limite, self.max_ms)
+        return self.max_ms
+
+
+class _Fragmento:
+    # Cada hilo escribe en su propio fragmento; el lock sólo se disputa con
+    # el volcado periódico, nunca entre peticiones
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.datos = {}
+
+
+class Agregador:
+    def __init__(self):
+        self._local = threading.local()
+        self._fragmentos = []
+        self._lock = threading.Lock()
+
+    def _fragmento(self):
+        fragmento = getattr(self._local, 'fragmento', None)
+        if fragmento is None:
+            fragmento = self._local.fragmento = _Fragmento()
+            with self._lock:
+                self._fragmentos.append(fragmento)
+        return fragmento
+
+    def registrar(self, ruta, duracion_ms, estado, consultas=0, tiempo_bd_ms=0.0, momento=None):
+        momento = momento or datetime.utcnow()
+        claves = [('total', None, ruta)]
+        claves.extend((periodo, inicio_periodo(periodo, momento), ruta) for periodo in PERIODOS)
+        fragmento = self._fragmento()
+        with fragmento.lock:
+            for clave in claves:
+                estadistica = fragmento.datos.get(clave)
+                if estadistica is None:
+                    estadistica = fragmento.datos[clave] = Estadistica()
+                estadistica.registrar(duracion_ms, estado, consultas, tiempo_bd_ms)
+
+    def _recorrer(self, filtro, extraer=False):
+        # Combina los fragmentos de todos los hilos para las claves que pasan
+        # el filtro; con extraer=True además se quitan de los fragmentos
+        resultado = {}
+        with self._lock:
+            fragmentos = list(self._fragmentos)
+        for fragmento in fragmentos:
+            with fragmento.lock:
+                for clave in [c for c in fragmento.datos if filtro(c)]:
+                    estadistica = fragmento.datos.pop(clave) if extraer else fragmento.datos[clave]
+                    total = resultado.get(clave)
+                    if total is None:
+                        total = resultado[clave] = Estadistica()
+                    total.combinar(estadistica)
+        return resultado
+
+    def totales(self):
+        # Acumulado desde que arrancó el proceso, por ruta
+        return {clave[2]: e for clave, e in self._recorrer(lambda c: c[0] == 'total').items()}
+
+    def extraer_cerrados(self, momento=None, todos=False):
+        # Saca los periodos ya terminados (o todos, al apagar)
+        momento = momento or datetime.utcnow()
+        actuales = {periodo: inicio_periodo(periodo, momento) for periodo in PERIODOS}
+        return self._recorrer(lambda c: c[0] != 'total' and (todos or c[1] < actuales[c[0]]), extraer=True)
+
+
+agregador = Agregador()
+
+
+def filas_metricas(cerrados):
+    filas = []
+    for (periodo, inicio, ruta), e in cerrados.items():
+        if not e.peticiones:
+            continue
+        errores = sum(n for estado, n in e.estados.items() if estado >= 500)
+        valores = (
+            ('peticiones', e.peticiones, 'peticiones', json.dumps(e.estados)),
+            ('latencia_media', e.suma_ms / e.peticiones, 'ms', None),
+            ('latencia_p50', e.percentil(0.50), 'ms', None),
+            ('latencia_p95', e.percentil(0.95), 'ms', None),
+            ('latencia_p99', e.percentil(0.99), 'ms', None),
+            ('latencia_max', e.max_ms, 'ms', None),
+            ('errores_5xx', errores, 'peticiones', None),
+            ('consultas_bd_media', e.consultas / e.peticiones, 'consultas', None),
+            ('tiempo_bd_medio', e.tiempo_bd_ms / e.peticiones, 'ms', None),
+        )
+        for nombre, valor, unidad, texto in valores:
+            filas.append({
+                'metrica_nombre': f'{ruta}.{nombre}'[:100],
+                'valor_numerico': round(valor, 4),
+                'valor_texto': texto,
+                'unidad_medida': unidad,
+                'categoria': 'http',
+                'fecha_registro': inicio,
+                'periodo_agregacion': periodo,
+            })
+    return filas
+
+
+def volcar(app, todos=False):
+    # Una fila por métrica, ruta y periodo cerrado, en un solo executemany
+    filas = filas_metricas(agregador.extraer_cerrados(todos=todos))
+    if filas:
+        with app.app_context():
+            with db.engine.begin() as conexion:
+                conexion.execute(MetricaSistema.__table__.insert(), filas)
+    return len(filas)
+
+
+# ====================================================
+# MEDICIÓN
+# ====================================================
+
+@metrics_bp.before_app_request
+def _inicio_peticion():
+    g._metricas_inicio = time.perf_counter()
+    g._metricas_consultas = 0
+    g._metricas_tiempo_bd = 0.0
+
+
+@metrics_bp.after_app_request
+def _fin_peticion(respuesta):
+    inicio = g.pop('_metricas_inicio', None)
+    if inicio is not None:
+        consultas = g.pop('_metricas_consultas', 0)
+        agregador.registrar(
+            request.endpoint or 'sin_ruta',
+            (time.perf_counter() - inicio) * 1000,
+            respuesta.status_code,
+            consultas,
+            g.pop('_metricas_tiempo_bd', 0.0) * 1000,
+        )
+        _revisar_presupuesto(consultas)
+    return respuesta
+
+
+# ====================================================
+# PRESUPUESTO DE CONSULTAS
+# ====================================================
+
+def presupuesto_consultas(maximo):
+    # Marca una vista con el número máximo de consultas que puede hacer;
+    # sin marca se usa QUERY_BUDGET (si está configurado)
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def _revisar_presupuesto(consultas):
+    vista = current_app.view_functions.get(request.endpoint)
+    maximo = getattr(vista, 'presupuesto_consultas', None)
+    if maximo is None:
+        maximo = current_app.config.get('QUERY_BUDGET')
+    if maximo is None or consultas <= maximo:
+        return
+    mensaje = f'{request.endpoint}: {consultas} consultas (presupuesto {maximo})'
+    # En pruebas se corta la petición para que un N+1 haga fallar el test
+    if current_app.config.get('QUERY_BUDGET_STRICT', current_app.testing):
+        raise PresupuestoExcedido(mensaje)
+    current_app.logger.warning(mensaje)
+
+
+@contextmanager
+def contar_consultas(motor=None):
+    # Devuelve la lista de sentencias ejecutadas dentro del bloque
+    sentencias = []
+
+    def anotar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    motor = motor or db.engine
+    event.listen(motor, 'before_cursor_execute', anotar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(motor, 'before_cursor_execute', anotar)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metricas_inicio', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('_metricas_inicio')
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    # Las consultas del hilo de logs o del volcado no cuentan para ninguna petición
+    if has_app_context() and '_metricas_consultas' in g:
+        g._metricas_consultas += 1
+        g._metricas_tiempo_bd += duracion
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    # Como el resto de la administración: el scraper manda el token como Bearer
+    requiere_admin()
+    lineas = [
+        '# TYPE http_request_duration_ms histogram',
+    ]
+    totales = agregador.totales()
+    for ruta in sorted(totales):
+        e = totales[ruta]
+        acumulado = 0
+        for limite, n in zip(TRAMOS_MS, e.tramos):
+            acumulado += n
+            le = '+Inf' if limite == float('inf') else limite
+            lineas.append(f'http_request_duration_ms_bucket{{endpoint="{ruta}",le="{le}"}} {acumulado}')
+        lineas.append(f'http_request_duration_ms_sum{{endpoint="{ruta}"}} {e.suma_ms:.3f}')
+        lineas.append(f'http_request_duration_ms_count{{endpoint="{ruta}"}} {e.peticiones}')
+    lineas.append('# TYPE http_request_duration_ms_quantile gauge')
+    for ruta in sorted(totales):
+        for p in (0.5, 0.95, 0.99):
+            lineas.append(f'http_request_duration_ms_quantile{{endpoint="{ruta}",quantile="{p}"}} '
+                          f'{totales[ruta].percentil(p):.3f}')
+    lineas.append('# TYPE http_requests_total counter')
+    for ruta in sorted(totales):
+        for estado, n in sorted(totales[ruta].estados.items()):
+            lineas.append(f'http_requests_total{{endpoint="{ruta}",status="{estado}"}} {n}')
+    lineas.append('# TYPE db_queries_total counter')
+    for ruta in sorted(totales):
+        lineas.append(f'db_queries_total{{endpoint="{ruta}"}} {totales[ruta].consultas}')
+    lineas.append('# TYPE db_query_time_ms_total counter')
+    for ruta in sorted(totales):
+        lineas.append(f'db_query_time_ms_total{{endpoint="{ruta}"}} {totales[ruta].tiempo_bd_ms:.3f}')
+    return Response('\n'.join(lineas) + '\n', mimetype='text/plain')
+
+
+def instalar_metricas(app):
+    # Hilo que cada METRICS_FLUSH_INTERVAL segundos guarda los periodos
+    # cerrados. Arranca con la primera petición de cada proceso, para que
+    # exista en los workers aunque la app se cree antes del fork.
+    intervalo = app.config.get('METRICS_FLUSH_INTERVAL', 60)
+    parar = threading.Event()
+    arranque = threading.Lock()
+    pid_hilo = [None]
+
+    def trabajar():
+        while not parar.wait(intervalo):
+            try:
+                volcar(app)
+            except Exception:
+                app.logger.exception('No se pudieron guardar las métricas')
+
+    def apagar():
+        parar.set()
+        try:
+            volcar(app, todos=True)
+        except Exception:
+            pass
+
+    @app.before_request
+    def _arrancar_volcado():
+        if pid_hilo[0] == os.getpid():
+            return
+        with arranque:
+            if pid_hilo[0] != os.getpid():
+                pid_hilo[0] = os.getpid()
+                threading.Thread(target=trabajar, name='metricas', daemon=True).start()
+
+    atexit.register(apagar)
@@ -0,0 +1,33 @@
+"""ajustes con microsegundos
+
+Revision ID: d0216e5b9685
+Revises: 9d80c7e250d1
+Create Date: 2026-10-18 20:36:00.478364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0216e5b9685'
+down_revision = '9d80c7e250d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sólo MySQL: DATETIME sin precisión descarta los microsegundos. SQLite
+    # ya los guarda en el texto de la fecha
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column('configuracion_sistema', 'updated_at',
+                        existing_type=mysql.DATETIME(), type_=mysql.DATETIME(fsp=6),
+                        existing_nullable=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column('configuracion_sistema', 'updated_at',
+                        existing_type=mysql.DATETIME(fsp=6), type_=mysql.DATETIME(),
+                        existing_nullable=True)
@@ -1,5 +1,6 @@
 # models.py - COMPLETO CON TODAS LAS TABLAS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -54,6 +55,8 @@ class Restaurante(db.Model):
     tipo_cocina = db.Column(db.String(100))
     rating = db.Column(db.Numeric(2,1), default=0.0)
     numero_reviews = db.Column(db.Integer, default=0)
+    suma_calificaciones = db.Column(db.Integer, default=0)  # suma de reseñas aprobadas, para recalcular rating
+    numero_favoritos = db.Column(db.Integer, default=0)  # mantenido por favorites.marcar
     distancia = db.Column(db.String(20))
     precio_rango = db.Column(db.String(10))
     direccion = db.Column(db.Text)
@@ -172,6 +175,15 @@ class PedidoItem(db.Model):
     notas = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Historial de estados de cada pedido: el id es el id de evento del stream SSE
+class EventoPedido(db.Model):
+    __tablename__ = 'pedido_eventos'
+    id = db.Column(db.Integer, primary_key=True)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('pedidos.id', ondelete='CASCADE'), nullable=False, index=True)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey('restaurantes.id'), nullable=False, index=True)
+    estado = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # Tabla de Reseñas
 class Reseña(db.Model):
     __tablename__ = 'reseñas'
@@ -208,7 +220,7 @@ class CategoriaMenu(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relaciones
-    menu_items = db.relationship('MenuItem', backref='categoria', lazy=True, cascade='all, delete-orphan')
+    menu_items = db.relationship('MenuItem', backref='categoria_menu', lazy=True, cascade='all, delete-orphan')
 
 # Tabla de Items de Menú
 class MenuItem(db.Model):
@@ -321,6 +333,11 @@ class UsoPromocion(db.Model):
     codigo_usado = db.Column(db.String(50))
     descuento_aplicado = db.Column(db.Numeric(10,2))
     fecha_uso = db.Column(db.DateTime, default=datetime.utcnow)
+    # Igual a usuario_id sólo en promociones de tipo_uso 'unico' (NULL en las
+    # demás): la restricción única impide dos usos simultáneos del mismo cliente
+    usuario_unico = db.Column(db.Integer)
+
+    __table_args__ = (db.UniqueConstraint('promocion_id', 'usuario_unico', name='unique_uso_unico'),)
 
 # Tabla de Notificaciones
 class Notificacion(db.Model):
@@ -336,6 +353,18 @@ class Notificacion(db.Model):
     enlace = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Avance de cada difusión masiva (ver notifications.difundir): el último
+# usuario notificado, para poder reanudarla con la misma clave
+class DifusionNotificacion(db.Model):
+    __tablename__ = 'difusiones_notificaciones'
+    id = db.Column(db.Integer, primary_key=True)
+    clave = db.Column(db.String(100), unique=True, nullable=False)
+    titulo = db.Column(db.String(200))
+    ultimo_usuario_id = db.Column(db.Integer, nullable=False, default=0)
+    enviadas = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # Tabla de Tickets de Soporte
 class TicketSoporte(db.Model):
     __tablename__ = 'tickets_soporte'
@@ -379,7 +408,6 @@ class Administrador(db.Model):
     
     # Relaciones
     tickets_asignados = db.relationship('TicketSoporte', backref='admin_asignado', lazy=True)
-    notificaciones = db.relationship('Notificacion', backref='administrador', lazy=True)
 
 # Tabla de Configuración del Sistema
 class ConfiguracionSistema(db.Model):
@@ -392,7 +420,10 @@ class ConfiguracionSistema(db.Model):
     grupo = db.Column(db.String(50))
     editable = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Con microsegundos en MySQL: max(updated_at) es la versión de settings.Ajustes
+    # y dos cambios en el mismo segundo no deben dar la misma
+    updated_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
 # Tabla de Backups del Sistema
 class BackupSistema(db.Model):
@@ -469,4 +500,53 @@ class ContenidoEstatico(db.Model):
     fecha_publicacion = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     estado = db.Column(db.Enum('borrador', 'publicado', 'archivado'), default='borrador')
-    vistas = db.Column(db.Integer, default=0)
\ No newline at end of file
+    vistas = db.Column(db.Integer, default=0)
+    # HTML final generado al publicar (ver pages.py) y su sha256
+    html_publicado = db.Column(db.Text)
+    hash_publicado = db.Column(db.String(64))
+
+# ====================================================
+# AGREGADOS DE VENTAS (materializados, ver analytics.py)
+# ====================================================
+
+# Pedidos e ingresos por restaurante y día (fecha_pedido en UTC)
+class VentaDiaria(db.Model):
+    __tablename__ = 'ventas_diarias'
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey('restaurantes.id'), nullable=False)
+    pedidos = db.Column(db.Integer, nullable=False, default=0)
+    pendientes = db.Column(db.Integer, nullable=False, default=0)
+    preparando = db.Column(db.Integer, nullable=False, default=0)
+    enviados = db.Column(db.Integer, nullable=False, default=0)
+    entregados = db.Column(db.Integer, nullable=False, default=0)
+    cancelados = db.Column(db.Integer, nullable=False, default=0)
+    rechazados = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Numeric(12,2), nullable=False, default=0)  # sin cancelados ni rechazados
+    descuentos = db.Column(db.Numeric(12,2), nullable=False, default=0)
+    items_vendidos = db.Column(db.Integer, nullable=False, default=0)
+    entregas_medidas = db.Column(db.Integer, nullable=False, default=0)  # con fecha_entrega
+    minutos_entrega = db.Column(db.BigInteger, nullable=False, default=0)  # suma
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('fecha', 'restaurante_id', name='unique_venta_diaria'),)
+
+# Unidades e ingresos por plato y día
+class VentaDiariaItem(db.Model):
+    __tablename__ = 'ventas_diarias_items'
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey('restaurantes.id'), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'))
+    nombre_item = db.Column(db.String(255), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Numeric(12,2), nullable=False, default=0)
+
+# Distribución del tiempo de entrega: pedidos por tramo de minutos y día
+class EntregaDiaria(db.Model):
+    __tablename__ = 'entregas_diarias'
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey('restaurantes.id'), nullable=False)
+    tramo = db.Column(db.Integer, nullable=False)  # índice en analytics.TRAMOS_ENTREGA
+    pedidos = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,243 @@
+# notifications.py - Envío masivo de notificaciones y contador de no leídas
+import threading
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from auth import requiere_admin
+from cache import CacheLRU
+from models import db, Usuario, Notificacion, DifusionNotificacion
+
+notifications_bp = Blueprint('notifications', __name__, cli_group='notificaciones')
+
+# usuario_id -> notificaciones sin leer. Cada proceso tiene su copia y sólo
+# ve sus propios incrementos: lo que marque como leído otro worker (o la
+# difusión desde la línea de comandos) se ve al caducar la entrada, así que
+# el TTL es corto
+cache_no_leidas = CacheLRU(maxsize=50000, ttl=30)
+
+
+@notifications_bp.record_once
+def _configurar(state):
+    cache_no_leidas.configurar(
+        maxsize=state.app.config.get('NOTIFICACIONES_CACHE_SIZE', 50000),
+        ttl=state.app.config.get('NOTIFICACIONES_CACHE_TTL', 30),
+    )
+
+
+# ====================================================
+# CONTADOR DE NO LEÍDAS
+# ====================================================
+
+def no_leidas(usuario_id):
+    # Sólo se cuenta en la base la primera vez; después se mantiene con
+    # los incrementos y decrementos de abajo
+    return cache_no_leidas.get_or_set(usuario_id, lambda: (
+        db.session.query(func.count(Notificacion.id))
+        .filter_by(usuario_id=usuario_id, leida=False)
+        .scalar()
+    ))
+
+
+def _ajustar(usuario_id, delta):
+    # Sin lock global: get+set de un entero; una carrera sólo puede dejar el
+    # valor desfasado hasta que caduque la entrada
+    actual = cache_no_leidas.get(usuario_id)
+    if actual is not None:
+        cache_no_leidas.set(usuario_id, max(actual + delta, 0))
+
+
+def marcar_leida(usuario_id, notificacion_id):
+    resultado = db.session.execute(
+        update(Notificacion)
+        .where(Notificacion.id == notificacion_id,
+               Notificacion.usuario_id == usuario_id,
+               Notificacion.leida.is_(False))
+        .values(leida=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if resultado.rowcount:
+        _ajustar(usuario_id, -resultado.rowcount)
+    return bool(resultado.rowcount)
+
+
+def marcar_todas_leidas(usuario_id):
+    resultado = db.session.execute(
+        update(Notificacion)
+        .where(Notificacion.usuario_id == usuario_id, Notificacion.leida.is_(False))
+        .values(leida=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    cache_no_leidas.set(usuario_id, 0)
+    return resultado.rowcount
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_nuevas(session, flush_context):
+    nuevas = session.info.setdefault('notificaciones_nuevas', {})
+    for obj in session.new:
+        if isinstance(obj, Notificacion) and obj.usuario_id is not None and not obj.leida:
+            nuevas[obj.usuario_id] = nuevas.get(obj.usuario_id, 0) + 1
+
+
+@event.listens_for(Session, 'after_commit')
+def _sumar_nuevas(session):
+    for usuario_id, cantidad in session.info.pop('notificaciones_nuevas', {}).items():
+        _ajustar(usuario_id, cantidad)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('notificaciones_nuevas', None)
+
+
+# ====================================================
+# DIFUSIÓN MASIVA
+# ====================================================
+
+def difundir(clave, titulo, mensaje, tipo='promocion', enlace=None, restaurante_id=None,
+             importante=False, tamano_lote=1000, progreso=None):
+    # Recorre los usuarios activos por rangos de id e inserta cada lote con un
+    # executemany. El último id procesado se guarda en difusiones_notificaciones
+    # en la misma transacción que el lote, así que si el proceso se corta la
+    # siguiente llamada con la misma clave sigue donde quedó sin duplicar.
+    # (No en configuracion_sistema: cada lote movería su versión y obligaría
+    # a todos los workers a recargar los ajustes.)
+    registro = DifusionNotificacion.query.filter_by(clave=clave[:100]).first()
+    if registro is None:
+        registro = DifusionNotificacion(clave=clave[:100], titulo=titulo[:200], ultimo_usuario_id=0, enviadas=0)
+        db.session.add(registro)
+        db.session.commit()
+    ultimo_id = registro.ultimo_usuario_id
+    total = 0
+    tabla = Notificacion.__table__
+
+    while True:
+        ids = [fila[0] for fila in db.session.query(Usuario.id)
+               .filter(Usuario.id > ultimo_id, Usuario.estado == 'activo')
+               .order_by(Usuario.id)
+               .limit(tamano_lote)]
+        if not ids:
+            break
+        ahora = datetime.utcnow()
+        db.session.execute(tabla.insert(), [{
+            'usuario_id': usuario_id,
+            'restaurante_id': restaurante_id,
+            'tipo': tipo,
+            'titulo': titulo,
+            'mensaje': mensaje,
+            'leida': False,
+            'importante': importante,
+            'enlace': enlace,
+            'created_at': ahora,
+        } for usuario_id in ids])
+        ultimo_id = ids[-1]
+        registro.ultimo_usuario_id = ultimo_id
+        registro.enviadas += len(ids)
+        db.session.commit()
+
+        # Sólo se tocan los contadores que ya están en caché
+        for usuario_id in ids:
+            _ajustar(usuario_id, 1)
+        total += len(ids)
+        if progreso is not None:
+            progreso(total, ultimo_id)
+    return total
+
+
+def difundir_en_segundo_plano(app, *args, **kwargs):
+    # Fuera del ciclo de la petición: la ruta de difusión responde en cuanto
+    # arranca el hilo
+    def trabajar():
+        with app.app_context():
+            try:
+                enviados = difundir(*args, **kwargs)
+                app.logger.info('Difusión %s terminada: %d notificaciones', args[0], enviados)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Difusión %s interrumpida', args[0])
+            finally:
+                db.session.remove()
+
+    hilo = threading.Thread(target=trabajar, name=f'difusion-{args[0]}', daemon=True)
+    hilo.start()
+    return hilo
+
+
+# ====================================================
+# RUTAS Y COMANDOS
+# ====================================================
+
+@notifications_bp.app_context_processor
+def _contador_cabecera():
+    if 'user_id' not in session:
+        return {}
+    return {'notificaciones_no_leidas': no_leidas(session['user_id'])}
+
+
+@notifications_bp.route('/api/notifications/unread-count')
+def contador():
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    return jsonify({'unread': no_leidas(session['user_id'])})
+
+
+@notifications_bp.route('/api/notifications/<int:notificacion_id>/read', methods=['POST'])
+def leer(notificacion_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    marcar_leida(session['user_id'], notificacion_id)
+    return jsonify({'unread': no_leidas(session['user_id'])})
+
+
+@notifications_bp.route('/api/notifications/read-all', methods=['POST'])
+def leer_todas():
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    marcar_todas_leidas(session['user_id'])
+    return jsonify({'unread': 0})
+
+
+@notifications_bp.route('/api/admin/notifications/broadcast', methods=['POST'])
+def difundir_ruta():
+    # Al lanzar una promoción: {"clave", "titulo", "mensaje", "tipo"?, "enlace"?,
+    # "restaurant_id"?}. Repetirla con la misma clave sólo avisa a los que faltan.
+    requiere_admin()
+    datos = request.get_json(silent=True) or {}
+    textos = {campo: datos.get(campo) for campo in ('clave', 'titulo', 'mensaje', 'tipo', 'enlace')}
+    if not all(isinstance(v, (str, type(None))) for v in textos.values()):
+        return jsonify({'success': False, 'error': 'Los campos deben ser texto'}), 400
+    if not all(textos[c] and textos[c].strip() for c in ('clave', 'titulo', 'mensaje')):
+        return jsonify({'success': False, 'error': 'clave, titulo y mensaje son obligatorios'}), 400
+    tipo = textos['tipo'] or 'promocion'
+    if tipo not in Notificacion.__table__.c.tipo.type.enums:
+        return jsonify({'success': False, 'error': 'Tipo no válido'}), 400
+    restaurante_id = datos.get('restaurant_id')
+    if restaurante_id is not None and (not isinstance(restaurante_id, int) or isinstance(restaurante_id, bool)):
+        return jsonify({'success': False, 'error': 'Restaurante no válido'}), 400
+
+    difundir_en_segundo_plano(current_app._get_current_object(), textos['clave'], textos['titulo'],
+                              textos['mensaje'], tipo=tipo, enlace=textos['enlace'],
+                              restaurante_id=restaurante_id)
+    return jsonify({'success': True, 'clave': textos['clave']}), 202
+
+
+@notifications_bp.cli.command('difundir')
+@click.argument('clave')
+@click.option('--titulo', required=True)
+@click.option('--mensaje', required=True)
+@click.option('--tipo', default='promocion')
+@click.option('--enlace')
+@click.option('--lote', default=1000, help='Usuarios por inserción.')
+def difundir_command(clave, titulo, mensaje, tipo, enlace, lote):
+    """Crea una notificación para cada usuario activo. Reanudable con la misma CLAVE."""
+    def progreso(total, ultimo_id):
+        click.echo(f'{total} notificaciones (hasta usuario {ultimo_id})')
+
+    total = difundir(clave, titulo, mensaje, tipo=tipo, enlace=enlace, tamano_lote=lote, progreso=progreso)
+    click.echo(f'Listo: {total} notificaciones nuevas.')
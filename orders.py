@@ -0,0 +1,248 @@
+# orders.py - Creación de pedidos en una sola transacción
+import hashlib
+import secrets
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Restaurante, MenuItem, Pedido, PedidoItem
+from promotions import indice_promociones, promociones_usadas, registrar_uso, PromocionNoDisponible
+from settings import ajustes
+
+orders_bp = Blueprint('orders', __name__)
+
+METODOS_PAGO = ('efectivo', 'tarjeta', 'transferencia', 'paypal', 'mercado_pago')
+MAX_CANTIDAD = 50
+CAMPOS_TEXTO = ('metodo_pago', 'codigo_promo', 'direccion_entrega', 'instrucciones_entrega',
+                'telefono_contacto', 'nombre_receptor')
+CENTAVOS = Decimal('0.01')
+
+
+# (clave, valor) de ajustes de importe ya avisados como no válidos
+_ajustes_invalidos = set()
+
+
+class PedidoInvalido(Exception):
+    pass
+
+
+class PedidoEnConflicto(Exception):
+    pass
+
+
+def _redondear(valor):
+    return valor.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def _importe_configurado(clave, nombre_config, defecto):
+    # Lo que esté en ConfiguracionSistema manda sobre app.config: se puede
+    # cambiar sin reiniciar y la lectura no consulta la base. Un valor mal
+    # escrito (p. ej. un texto "0,19") no debe tumbar todos los pedidos: se
+    # usa app.config y se avisa una vez por valor y proceso
+    valor = ajustes.get(clave)
+    if valor is not None:
+        try:
+            importe = Decimal(str(valor))
+            if importe.is_finite() and importe >= 0:
+                return importe
+        except ArithmeticError:
+            pass
+        if (clave, str(valor)) not in _ajustes_invalidos:
+            _ajustes_invalidos.add((clave, str(valor)))
+            current_app.logger.warning('Ajuste %s con valor no válido %r: se usa %s', clave, valor, nombre_config)
+    return Decimal(str(current_app.config.get(nombre_config, defecto)))
+
+
+def codigo_para_clave(usuario_id, clave):
+    # El código del pedido se deriva de la clave de idempotencia: como
+    # codigo_pedido es único, un reintento no puede insertar otro pedido
+    resumen = hashlib.sha256(f'{usuario_id}:{clave}'.encode('utf-8')).hexdigest()
+    return 'P' + resumen[:19].upper()
+
+
+def _leer_lineas(items):
+    # Une líneas repetidas del mismo plato y valida cantidades
+    lineas = {}
+    if items is not None and not isinstance(items, list):
+        raise PedidoInvalido('Producto no válido.')
+    for item in items or []:
+        try:
+            menu_item_id = int(item['menu_item_id'])
+            cantidad = int(item.get('cantidad', 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise PedidoInvalido('Producto no válido.')
+        if not 1 <= cantidad <= MAX_CANTIDAD:
+            raise PedidoInvalido('Cantidad no válida.')
+        if not isinstance(item.get('notas'), (str, type(None))):
+            raise PedidoInvalido('Notas no válidas.')
+        linea = lineas.setdefault(menu_item_id, {'cantidad': 0, 'notas': item.get('notas')})
+        linea['cantidad'] += cantidad
+        if linea['cantidad'] > MAX_CANTIDAD:
+            raise PedidoInvalido('Cantidad no válida.')
+    if not lineas:
+        raise PedidoInvalido('Agrega al menos un producto al pedido.')
+    return lineas
+
+
+def crear_pedido(usuario_id, restaurante_id, items, metodo_pago='efectivo', clave=None,
+                 codigo_promo=None, **entrega):
+    # Devuelve (pedido, creado). Si la clave ya se usó devuelve el pedido original.
+    codigo = codigo_para_clave(usuario_id, clave) if clave else 'P' + secrets.token_hex(8).upper()
+    if clave:
+        existente = Pedido.query.filter_by(codigo_pedido=codigo, usuario_id=usuario_id).first()
+        if existente is not None:
+            return existente, False
+
+    if metodo_pago not in METODOS_PAGO:
+        raise PedidoInvalido('Método de pago no válido.')
+    lineas = _leer_lineas(items)
+
+    restaurante = db.session.get(Restaurante, restaurante_id)
+    if restaurante is None or restaurante.estado == 'inactivo':
+        raise PedidoInvalido('Restaurante no disponible.')
+
+    # Todos los precios en una sola consulta
+    platos = {m.id: m for m in MenuItem.query.filter(MenuItem.id.in_(list(lineas)),
+                                                     MenuItem.restaurante_id == restaurante_id)}
+    faltantes = [i for i in lineas if i not in platos or not platos[i].disponible]
+    if faltantes:
+        raise PedidoInvalido('Algunos productos ya no están disponibles.')
+
+    subtotal = Decimal('0')
+    pedido_items = []
+    for menu_item_id, linea in lineas.items():
+        plato = platos[menu_item_id]
+        precio = plato.precio
+        if plato.precio_descuento is not None and plato.precio_descuento < precio:
+            precio = plato.precio_descuento
+        importe = _redondear(precio * linea['cantidad'])
+        subtotal += importe
+        pedido_items.append(PedidoItem(
+            menu_item_id=plato.id,
+            nombre_item=plato.nombre,
+            descripcion_item=plato.descripcion,
+            cantidad=linea['cantidad'],
+            precio_unitario=precio,
+            subtotal=importe,
+            notas=linea['notas'],
+        ))
+
+    tasa = _importe_configurado('pedidos.tasa_impuesto', 'PEDIDOS_TASA_IMPUESTO', '0.19')
+    impuestos = _redondear(subtotal * tasa)
+    costo_envio = Decimal('0')
+    if entrega.get('direccion_entrega'):
+        costo_envio = _redondear(_importe_configurado('pedidos.costo_envio', 'PEDIDOS_COSTO_ENVIO', '0'))
+
+    indice_promociones.refrescar()
+    modalidad = 'envio' if entrega.get('direccion_entrega') else 'recoger'
+    promo, descuento = indice_promociones.mejor(restaurante_id, subtotal, costo_envio, modalidad,
+                                                codigo=codigo_promo,
+                                                usadas=promociones_usadas(usuario_id, restaurante_id))
+    if codigo_promo and promo is None:
+        raise PedidoInvalido('Código promocional no válido.')
+
+    pedido = Pedido(
+        usuario_id=usuario_id,
+        restaurante_id=restaurante_id,
+        codigo_pedido=codigo,
+        subtotal=subtotal,
+        impuestos=impuestos,
+        costo_envio=costo_envio,
+        descuento=descuento,
+        total=subtotal + impuestos + costo_envio - descuento,
+        metodo_pago=metodo_pago,
+        items=pedido_items,
+        **entrega
+    )
+    db.session.add(pedido)
+    try:
+        if promo is not None:
+            db.session.flush()
+            try:
+                with db.session.begin_nested():
+                    registrar_uso(promo, usuario_id, pedido.id, descuento)
+            except PromocionNoDisponible:
+                # Un código escrito por el cliente que ya no vale rechaza el
+                # pedido; una promoción automática (p.ej. agotada y aún en el
+                # índice de otro proceso) sólo deja el pedido sin descuento
+                if promo.codigo is not None:
+                    raise
+                pedido.descuento = Decimal('0')
+                pedido.total = subtotal + impuestos + costo_envio
+        db.session.commit()
+    except PromocionNoDisponible as e:
+        db.session.rollback()
+        raise PedidoInvalido(str(e))
+    except IntegrityError:
+        # Otro reintento con la misma clave ganó la carrera. Si no hay tal
+        # pedido fue otra restricción de la base
+        db.session.rollback()
+        existente = None
+        if clave:
+            existente = Pedido.query.filter_by(codigo_pedido=codigo, usuario_id=usuario_id).one_or_none()
+        if existente is None:
+            raise PedidoEnConflicto('No se pudo guardar el pedido. Inténtalo de nuevo.')
+        return existente, False
+    return pedido, True
+
+
+def serializar_pedido(pedido):
+    return {
+        'id': pedido.id,
+        'codigo_pedido': pedido.codigo_pedido,
+        'restaurante_id': pedido.restaurante_id,
+        'estado': pedido.estado,
+        'subtotal': float(pedido.subtotal),
+        'impuestos': float(pedido.impuestos),
+        'costo_envio': float(pedido.costo_envio),
+        'descuento': float(pedido.descuento),
+        'total': float(pedido.total),
+        'items': [{
+            'menu_item_id': i.menu_item_id,
+            'nombre': i.nombre_item,
+            'cantidad': i.cantidad,
+            'precio_unitario': float(i.precio_unitario),
+            'subtotal': float(i.subtotal),
+        } for i in pedido.items],
+    }
+
+
+@orders_bp.route('/api/orders', methods=['POST'])
+def api_orders():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Debes iniciar sesión para pedir.'}), 401
+
+    datos = request.get_json(silent=True) or {}
+    restaurante_id = datos.get('restaurant_id')
+    if not isinstance(restaurante_id, int) or isinstance(restaurante_id, bool):
+        return jsonify({'success': False, 'error': 'Restaurante no válido.'}), 400
+    # Los campos de texto llegan tal cual del JSON: un número o una lista
+    # no debe llegar a la base ni a la búsqueda de promociones
+    for campo in CAMPOS_TEXTO:
+        if not isinstance(datos.get(campo), (str, type(None))):
+            return jsonify({'success': False, 'error': f'{campo} no válido.'}), 400
+    clave = request.headers.get('Idempotency-Key', '').strip() or None
+    if clave is not None and len(clave) > 255:
+        return jsonify({'success': False, 'error': 'Idempotency-Key demasiado larga.'}), 400
+
+    try:
+        pedido, creado = crear_pedido(
+            session['user_id'],
+            restaurante_id,
+            datos.get('items'),
+            metodo_pago=datos.get('metodo_pago', 'efectivo'),
+            clave=clave,
+            codigo_promo=datos.get('codigo_promo'),
+            direccion_entrega=datos.get('direccion_entrega'),
+            instrucciones_entrega=datos.get('instrucciones_entrega'),
+            telefono_contacto=datos.get('telefono_contacto'),
+            nombre_receptor=datos.get('nombre_receptor'),
+        )
+    except PedidoInvalido as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except PedidoEnConflicto as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+
+    return jsonify({'success': True, 'pedido': serializar_pedido(pedido)}), 201 if creado else 200
@@ -0,0 +1,212 @@
+# pages.py - Páginas de ContenidoEstatico renderizadas al publicar y servidas desde memoria
+import gzip
+import hashlib
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from auth import requiere_admin
+from cache import CacheLRU
+from models import db, ContenidoEstatico
+
+pages_bp = Blueprint('pages', __name__, cli_group='paginas')
+
+# slug -> PaginaServida, o False si no hay página publicada con ese slug
+# (así tampoco los 404 repetidos consultan la base)
+cache_paginas = CacheLRU(maxsize=1000, ttl=24 * 3600)
+
+
+@pages_bp.record_once
+def _configurar(state):
+    cache_paginas.configurar(
+        maxsize=state.app.config.get('PAGINAS_CACHE_SIZE', 1000),
+        ttl=state.app.config.get('PAGINAS_CACHE_TTL', 24 * 3600),
+    )
+
+
+# ====================================================
+# PUBLICACIÓN
+# ====================================================
+
+def renderizar(pagina):
+    # HTML final de la página. Fuera de una petición (CLI) se usa un
+    # contexto de prueba para que url_for funcione.
+    with current_app.test_request_context(f'/paginas/{pagina.slug}'):
+        return render_template('pagina.html', pagina=pagina)
+
+
+def publicar(pagina):
+    # Renderiza y guarda el resultado: servir la página ya no vuelve a
+    # pasar por la plantilla ni a leer contenido
+    html = renderizar(pagina)
+    pagina.html_publicado = html
+    pagina.hash_publicado = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    pagina.estado = 'publicado'
+    pagina.fecha_actualizacion = datetime.utcnow()
+    if pagina.fecha_publicacion is None:
+        pagina.fecha_publicacion = pagina.fecha_actualizacion
+    db.session.commit()
+    return pagina
+
+
+# ====================================================
+# CACHÉ EN MEMORIA
+# ====================================================
+
+def _brotli(cuerpo):
+    # brotli es opcional: si no está instalado se sirven gzip e identidad
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(cuerpo, quality=11)
+
+
+class PaginaServida:
+    # Cuerpo y variantes comprimidas, calculadas una vez por proceso y versión
+    __slots__ = ('variantes', 'etag', 'ultima_modificacion')
+
+    def __init__(self, html, hash_html, ultima_modificacion):
+        cuerpo = html.encode('utf-8')
+        self.variantes = {'identity': cuerpo, 'gzip': gzip.compress(cuerpo, compresslevel=9, mtime=0)}
+        comprimido = _brotli(cuerpo)
+        if comprimido is not None:
+            self.variantes['br'] = comprimido
+        self.etag = hash_html[:32]
+        self.ultima_modificacion = ultima_modificacion
+
+
+def _cargar(slug):
+    pagina = ContenidoEstatico.query.filter_by(slug=slug, estado='publicado').first()
+    if pagina is None:
+        return False
+    html, hash_html = pagina.html_publicado, pagina.hash_publicado
+    if html is None:
+        # Publicada antes de existir el renderizado: se renderiza en memoria
+        # hasta el próximo "flask paginas publicar"
+        html = renderizar(pagina)
+        hash_html = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    return PaginaServida(html, hash_html, pagina.fecha_actualizacion)
+
+
+class VersionPaginas:
+    # Como en promociones y ajustes: cada PAGINAS_REFRESH_SECONDS un solo
+    # hilo compara (max(fecha_actualizacion), count) y, si cambió, vacía la
+    # caché. Entre comprobaciones servir una página no consulta la base.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ultima_comprobacion = 0.0
+
+    def comprobar(self):
+        intervalo = current_app.config.get('PAGINAS_REFRESH_SECONDS', 30)
+        if time.monotonic() - self._ultima_comprobacion < intervalo:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._ultima_comprobacion = time.monotonic()
+            version = tuple(db.session.query(func.max(ContenidoEstatico.fecha_actualizacion),
+                                             func.count(ContenidoEstatico.id)).one())
+            if version != self._version:
+                cache_paginas.clear()
+                self._version = version
+        finally:
+            self._lock.release()
+
+    def invalidar(self):
+        self._ultima_comprobacion = 0.0
+
+
+version_paginas = VersionPaginas()
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, ContenidoEstatico):
+            session.info.setdefault('paginas_invalidar', set()).add(obj.slug)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    slugs = session.info.pop('paginas_invalidar', ())
+    for slug in slugs:
+        cache_paginas.delete(slug)
+    if slugs:
+        version_paginas.invalidar()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('paginas_invalidar', None)
+
+
+# ====================================================
+# RUTAS Y COMANDOS
+# ====================================================
+
+def _codificacion(variantes):
+    aceptadas = request.accept_encodings
+    for codificacion in ('br', 'gzip'):
+        if codificacion in variantes and aceptadas[codificacion]:
+            return codificacion
+    return 'identity'
+
+
+@pages_bp.route('/paginas/<slug>')
+def pagina(slug):
+    version_paginas.comprobar()
+    servida = cache_paginas.get_or_set(slug, lambda: _cargar(slug))
+    if not servida:
+        abort(404)
+
+    codificacion = _codificacion(servida.variantes)
+    respuesta = current_app.response_class(servida.variantes[codificacion], mimetype='text/html')
+    if codificacion != 'identity':
+        respuesta.headers['Content-Encoding'] = codificacion
+    respuesta.vary.add('Accept-Encoding')
+    # Un ETag fuerte distinto por codificación: son bytes distintos
+    respuesta.set_etag(servida.etag if codificacion == 'identity' else f'{servida.etag}-{codificacion}')
+    respuesta.last_modified = servida.ultima_modificacion
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = current_app.config.get('PAGINAS_MAX_AGE', 300)
+    return respuesta.make_conditional(request)
+
+
+@pages_bp.route('/api/admin/pages/<slug>/publish', methods=['POST'])
+def publicar_pagina(slug):
+    requiere_admin()
+    pagina = ContenidoEstatico.query.filter_by(slug=slug).first()
+    if pagina is None:
+        return jsonify({'success': False, 'error': 'Página no encontrada'}), 404
+    publicar(pagina)
+    return jsonify({'success': True, 'slug': slug, 'hash': pagina.hash_publicado})
+
+
+@pages_bp.cli.command('publicar')
+@click.argument('slugs', nargs=-1)
+@click.option('--todas', is_flag=True, help='Vuelve a renderizar todas las páginas publicadas.')
+def publicar_command(slugs, todas):
+    """Renderiza y publica SLUGS (o todas las publicadas, p. ej. tras cambiar la plantilla)."""
+    consulta = ContenidoEstatico.query
+    if todas:
+        consulta = consulta.filter_by(estado='publicado')
+    elif slugs:
+        consulta = consulta.filter(ContenidoEstatico.slug.in_(slugs))
+    else:
+        raise click.UsageError('Indica uno o más SLUGS o --todas.')
+    for pagina in consulta.order_by(ContenidoEstatico.id).all():
+        # Se corre en cada despliegue (ver Dockerfile): si el HTML no cambió no
+        # se escribe, para no obligar a los workers a recargar las páginas
+        html = renderizar(pagina)
+        if pagina.estado == 'publicado' and pagina.html_publicado == html:
+            click.echo(f'{pagina.slug}: sin cambios')
+            continue
+        publicar(pagina)
+        click.echo(f'{pagina.slug}: {pagina.hash_publicado[:12]}')
@@ -0,0 +1,105 @@
+# passwords.py - Hash de contraseñas con concurrencia acotada, con rehash al iniciar sesión
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from models import db, Usuario
+
+METODO_POR_DEFECTO = 'pbkdf2:sha256:600000'
+
+
+class HashSaturado(Exception):
+    pass
+
+
+class Hasheador:
+    # Control de carga, no descarga: el hash se calcula en el hilo de la
+    # petición, que igual tendría que esperar el resultado (Flask es
+    # síncrono). PBKDF2 y scrypt de hashlib sueltan el GIL, así que los demás
+    # hilos del worker siguen atendiendo mientras tanto. Lo que se acota es
+    # cuántos hashes corren a la vez (hilos) y cuántos pueden esperar turno
+    # (pendientes): una ráfaga de logins recibe HashSaturado en vez de
+    # acaparar la CPU de todo el worker.
+
+    def __init__(self, hilos=2, pendientes=16, metodo=METODO_POR_DEFECTO, espera=5.0):
+        self.configurar(hilos, pendientes, metodo, espera)
+
+    def configurar(self, hilos, pendientes, metodo, espera):
+        self.hilos = hilos
+        self.metodo = metodo
+        self.espera = espera
+        self._cupos = threading.BoundedSemaphore(hilos + pendientes)
+        self._en_curso = threading.BoundedSemaphore(hilos)
+        self._señuelo = None
+
+    def _referencia(self):
+        # Hash de referencia, calculado la primera vez que hace falta: da el
+        # prefijo exacto (con iteraciones) del método actual y sirve para
+        # igualar el tiempo con emails desconocidos
+        if self._señuelo is None:
+            self._señuelo = generate_password_hash('señuelo', method=self.metodo)
+        return self._señuelo
+
+    def _ejecutar(self, funcion, *args):
+        # Referencias locales: si se reconfigura a mitad de camino se liberan
+        # los mismos semáforos que se tomaron
+        cupos, en_curso = self._cupos, self._en_curso
+        limite = time.monotonic() + self.espera
+        if not cupos.acquire(timeout=self.espera):
+            raise HashSaturado('Demasiados hashes pendientes')
+        try:
+            if not en_curso.acquire(timeout=max(limite - time.monotonic(), 0)):
+                raise HashSaturado('Demasiados hashes pendientes')
+            try:
+                return funcion(*args)
+            finally:
+                en_curso.release()
+        finally:
+            cupos.release()
+
+    def generar(self, password):
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def verificar(self, password_hash, password):
+        return self._ejecutar(check_password_hash, password_hash, password)
+
+    def verificar_señuelo(self, password):
+        # Mismo costo que una verificación real; el resultado se descarta
+        self.verificar(self._referencia(), password)
+
+    def necesita_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self._referencia().split('$', 1)[0]
+
+
+hasheador = Hasheador()
+
+
+def autenticar(email, password):
+    # Devuelve el usuario o None. Un email inexistente paga el mismo hash que
+    # uno existente, así el tiempo de respuesta no revela qué cuentas existen.
+    usuario = Usuario.query.filter_by(email=email).first() if email else None
+    if usuario is None or not usuario.password_hash:
+        hasheador.verificar_señuelo(password or '')
+        return None
+    if not hasheador.verificar(usuario.password_hash, password or ''):
+        return None
+
+    # Los hashes con parámetros viejos se rehacen con la contraseña en claro,
+    # que sólo está disponible aquí
+    if hasheador.necesita_rehash(usuario.password_hash):
+        usuario.password_hash = hasheador.generar(password)
+        db.session.commit()
+    return usuario
+
+
+def instalar_hash(app):
+    # PASSWORD_HASH_WORKERS: hashes simultáneos por proceso
+    hasheador.configurar(
+        hilos=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        pendientes=app.config.get('PASSWORD_HASH_QUEUE', 16),
+        metodo=app.config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO),
+        espera=app.config.get('PASSWORD_HASH_TIMEOUT', 5.0),
+    )
+    app.extensions['hash'] = hasheador
+    return hasheador
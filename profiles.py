@@ -0,0 +1,95 @@
+# profiles.py - Datos de la página de perfil en un número fijo de consultas
+from datetime import date
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import db, Usuario, Restaurante, Favorito, Reserva, Pedido
+from orders import serializar_pedido
+
+POR_PAGINA = 10
+
+
+def _cocinas(restaurante):
+    return [c.strip() for c in (restaurante.tipo_cocina or '').split(',') if c.strip()]
+
+
+def _favorito(r):
+    return {
+        'id': r.id,
+        'nombre': r.nombre,
+        'rating': r.rating,
+        'cocina': _cocinas(r),
+        'distancia': r.distancia,
+        'precio': r.precio_rango,
+        'imagen_portada': r.imagen_portada,
+    }
+
+
+def _reserva(reserva):
+    return {
+        'id': reserva.id,
+        'restaurant_id': reserva.restaurante_id,
+        'restaurant_name': reserva.restaurante.nombre,
+        'status': reserva.estado,
+        'date': reserva.fecha.strftime('%d/%m/%Y'),
+        'time': reserva.hora.strftime('%H:%M'),
+        'guests': reserva.numero_personas,
+        'special_requests': reserva.notas_especiales,
+        'created_at': reserva.created_at.strftime('%d/%m/%Y %H:%M') if reserva.created_at else '',
+    }
+
+
+def _pedido(pedido):
+    datos = serializar_pedido(pedido)
+    datos['restaurant_name'] = pedido.restaurante.nombre
+    datos['fecha'] = pedido.fecha_pedido.strftime('%d/%m/%Y %H:%M') if pedido.fecha_pedido else ''
+    return datos
+
+
+def _pagina(consulta, pagina, por_pagina):
+    # Se pide una fila de más para saber si hay otra página sin hacer un COUNT
+    filas = consulta.limit(por_pagina + 1).offset((pagina - 1) * por_pagina).all()
+    return filas[:por_pagina], len(filas) > por_pagina
+
+
+def cargar_perfil(usuario_id, pagina_reservas=1, pagina_pedidos=1, por_pagina=POR_PAGINA, hoy=None):
+    # Cinco consultas sin importar cuántos favoritos, reservas o pedidos haya:
+    # usuario, favoritos, reservas (+restaurante por JOIN), pedidos
+    # (+restaurante por JOIN) e items de esos pedidos (selectin, un IN).
+    # Todo sale ya convertido a dicts para que la plantilla no dispare
+    # cargas perezosas.
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario is None:
+        return None
+    hoy = hoy or date.today()
+
+    favoritos = (Restaurante.query
+                 .join(Favorito, Favorito.restaurante_id == Restaurante.id)
+                 .filter(Favorito.usuario_id == usuario_id)
+                 .order_by(Favorito.created_at.desc(), Favorito.id.desc())
+                 .all())
+
+    reservas, mas_reservas = _pagina(
+        Reserva.query
+        .options(joinedload(Reserva.restaurante))
+        .filter(Reserva.usuario_id == usuario_id, Reserva.fecha >= hoy)
+        .order_by(Reserva.fecha, Reserva.hora, Reserva.id),
+        pagina_reservas, por_pagina)
+
+    pedidos, mas_pedidos = _pagina(
+        Pedido.query
+        .options(joinedload(Pedido.restaurante), selectinload(Pedido.items))
+        .filter(Pedido.usuario_id == usuario_id)
+        .order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc()),
+        pagina_pedidos, por_pagina)
+
+    return {
+        'user': usuario,
+        'favorite_restaurantes': [_favorito(r) for r in favoritos],
+        'user_reservas': [_reserva(r) for r in reservas],
+        'user_pedidos': [_pedido(p) for p in pedidos],
+        'pagina_reservas': pagina_reservas,
+        'pagina_pedidos': pagina_pedidos,
+        'mas_reservas': mas_reservas,
+        'mas_pedidos': mas_pedidos,
+    }
@@ -0,0 +1,285 @@
+# promotions.py - Evaluación de promociones en memoria y control de usos
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+import click
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy import event, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Promocion, UsoPromocion
+
+promotions_bp = Blueprint('promotions', __name__, cli_group='promociones')
+
+CENTAVOS = Decimal('0.01')
+
+# Modalidad del pedido -> columna aplicable_* que la habilita
+MODALIDADES = {
+    'envio': 'aplicable_envio',
+    'recoger': 'aplicable_recoger',
+    'local': 'aplicable_local',
+}
+
+
+class PromocionNoDisponible(Exception):
+    pass
+
+
+class PromocionCompilada:
+    # Copia inmutable de las reglas de una Promocion, sin depender de la sesión
+    __slots__ = ('id', 'restaurante_id', 'codigo', 'tipo', 'valor', 'tipo_uso',
+                 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'hora_fin',
+                 'minimo', 'maximo', 'modalidades')
+
+    def __init__(self, p):
+        self.id = p.id
+        self.restaurante_id = p.restaurante_id
+        self.codigo = p.codigo_promo.upper() if p.codigo_promo else None
+        self.tipo = p.tipo_descuento
+        self.valor = Decimal(p.valor_descuento)
+        self.tipo_uso = p.tipo_uso
+        self.fecha_inicio = p.fecha_inicio
+        self.fecha_fin = p.fecha_fin
+        self.hora_inicio = p.hora_inicio
+        self.hora_fin = p.hora_fin
+        self.minimo = Decimal(p.minimo_compra or 0)
+        self.maximo = Decimal(p.maximo_descuento) if p.maximo_descuento is not None else None
+        # Sin ninguna aplicable_* marcada la promoción vale para todas
+        marcadas = frozenset(m for m, columna in MODALIDADES.items() if getattr(p, columna))
+        self.modalidades = marcadas or frozenset(MODALIDADES)
+
+    def vigente(self, ahora):
+        if not self.fecha_inicio <= ahora.date() <= self.fecha_fin:
+            return False
+        if self.hora_inicio is None or self.hora_fin is None:
+            return True
+        hora = ahora.time()
+        if self.hora_inicio <= self.hora_fin:
+            return self.hora_inicio <= hora <= self.hora_fin
+        # Franja que cruza la medianoche (p.ej. 22:00 - 02:00)
+        return hora >= self.hora_inicio or hora <= self.hora_fin
+
+    def descuento(self, subtotal, costo_envio):
+        if self.tipo == 'porcentaje':
+            monto = subtotal * self.valor / 100
+        elif self.tipo == 'fijo':
+            monto = self.valor
+        else:
+            monto = costo_envio
+        if self.maximo is not None:
+            monto = min(monto, self.maximo)
+        monto = min(monto, subtotal + costo_envio)
+        return max(monto, Decimal('0')).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+class IndicePromociones:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # restaurante_id (None = todas) -> [PromocionCompilada]
+        self._por_restaurante = {}
+        self._version = None
+        self._ultima_comprobacion = 0.0
+        self.sucio = True
+
+    def _cargar(self):
+        hoy = datetime.now().date()
+        activas = Promocion.query.filter(Promocion.estado == 'activo', Promocion.fecha_fin >= hoy).all()
+        por_restaurante = {}
+        for p in activas:
+            por_restaurante.setdefault(p.restaurante_id, []).append(PromocionCompilada(p))
+        return por_restaurante
+
+    def refrescar(self, forzar=False):
+        # Cada PROMO_REFRESH_SECONDS se compara una versión barata (máximo
+        # updated_at y número de filas); sólo si cambió se recompila todo
+        intervalo = current_app.config.get('PROMO_REFRESH_SECONDS', 30)
+        ahora = time.monotonic()
+        if not (forzar or self.sucio) and ahora - self._ultima_comprobacion < intervalo:
+            return
+        self._ultima_comprobacion = ahora
+        version = db.session.query(func.max(Promocion.updated_at), func.count(Promocion.id)).one()
+        version = (version[0], version[1], datetime.now().date())
+        if not self.sucio and version == self._version:
+            return
+        por_restaurante = self._cargar()
+        with self._lock:
+            self._por_restaurante = por_restaurante
+            self._version = version
+            self.sucio = False
+
+    def candidatas(self, restaurante_id):
+        with self._lock:
+            return self._por_restaurante.get(restaurante_id, []) + self._por_restaurante.get(None, [])
+
+    def mejor(self, restaurante_id, subtotal, costo_envio=Decimal('0'), modalidad='envio',
+              codigo=None, ahora=None, usadas=frozenset()):
+        # Devuelve (PromocionCompilada, monto) con el mayor descuento aplicable.
+        # usadas: ids de promociones 'unico' que el cliente ya usó; las
+        # automáticas se saltan, una con código escrito se deja para que
+        # registrar_uso diga por qué no vale.
+        ahora = ahora or datetime.now()
+        codigo = codigo.strip().upper() if codigo else None
+        mejor, mejor_monto = None, Decimal('0')
+        for promo in self.candidatas(restaurante_id):
+            # Las promociones con código sólo se aplican si el cliente lo escribe
+            if promo.codigo is not None and promo.codigo != codigo:
+                continue
+            if promo.codigo is None and promo.id in usadas:
+                continue
+            if modalidad not in promo.modalidades or subtotal < promo.minimo or not promo.vigente(ahora):
+                continue
+            monto = promo.descuento(subtotal, costo_envio)
+            if monto > mejor_monto:
+                mejor, mejor_monto = promo, monto
+        return mejor, mejor_monto
+
+
+indice_promociones = IndicePromociones()
+
+
+def promociones_usadas(usuario_id, restaurante_id):
+    # Ids de las promociones 'unico' candidatas que el cliente ya usó. Sin
+    # candidatas de ese tipo no se consulta la base.
+    unicas = [p.id for p in indice_promociones.candidatas(restaurante_id) if p.tipo_uso == 'unico']
+    if usuario_id is None or not unicas:
+        return frozenset()
+    filas = db.session.query(UsoPromocion.promocion_id).filter(
+        UsoPromocion.usuario_unico == usuario_id, UsoPromocion.promocion_id.in_(unicas))
+    return frozenset(promocion_id for promocion_id, in filas)
+
+
+def registrar_uso(promo, usuario_id, pedido_id, descuento):
+    # Se ejecuta dentro de la transacción del pedido. El UPDATE condicional
+    # incrementa usos_actuales en la propia base, así dos pedidos simultáneos
+    # nunca superan limite_usos; en las 'unico' la restricción unique_uso_unico
+    # impide que el mismo cliente la use dos veces aunque pidan a la vez.
+    # Si lanza PromocionNoDisponible el llamador debe deshacer la transacción
+    # (o el savepoint) para devolver el uso contado.
+    resultado = db.session.execute(
+        update(Promocion)
+        .where(Promocion.id == promo.id,
+               Promocion.estado == 'activo',
+               db.or_(Promocion.limite_usos == 0,
+                      Promocion.limite_usos.is_(None),
+                      Promocion.usos_actuales < Promocion.limite_usos))
+        # Contar un uso no cambia las reglas: se conserva updated_at para no
+        # forzar que todos los procesos recompilen el índice
+        .values(usos_actuales=Promocion.usos_actuales + 1, updated_at=Promocion.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        raise PromocionNoDisponible('La promoción se agotó.')
+
+    # Si este fue el último uso la promoción pasa a agotada (esto sí cambia
+    # updated_at y los demás procesos la retiran en el siguiente refresco)
+    agotada = db.session.execute(
+        update(Promocion)
+        .where(Promocion.id == promo.id,
+               Promocion.limite_usos > 0,
+               Promocion.usos_actuales >= Promocion.limite_usos)
+        .values(estado='agotado')
+        .execution_options(synchronize_session=False)
+    )
+    if agotada.rowcount:
+        indice_promociones.sucio = True
+
+    unico = usuario_id if promo.tipo_uso == 'unico' else None
+    try:
+        with db.session.begin_nested():
+            db.session.add(UsoPromocion(
+                promocion_id=promo.id,
+                usuario_id=usuario_id,
+                usuario_unico=unico,
+                pedido_id=pedido_id,
+                codigo_usado=promo.codigo,
+                descuento_aplicado=descuento,
+            ))
+    except IntegrityError:
+        raise PromocionNoDisponible('Ya usaste esta promoción.')
+
+
+def reconciliar_usos(tamano_lote=500):
+    # Recalcula usos_actuales desde uso_promociones por lotes de ids (p. ej.
+    # tras restaurar un backup: el contador no mueve updated_at y no viaja en
+    # los incrementales). Devuelve cuántas promociones corrigió.
+    corregidas = 0
+    ultimo_id = 0
+    while True:
+        lote = (db.session.query(Promocion.id, Promocion.usos_actuales)
+                .filter(Promocion.id > ultimo_id)
+                .order_by(Promocion.id)
+                .limit(tamano_lote)
+                .all())
+        if not lote:
+            break
+        ultimo_id = lote[-1].id
+        reales = dict(db.session.query(UsoPromocion.promocion_id, func.count(UsoPromocion.id))
+                      .filter(UsoPromocion.promocion_id.in_([p.id for p in lote]))
+                      .group_by(UsoPromocion.promocion_id))
+        for promocion_id, guardado in lote:
+            if (guardado or 0) != reales.get(promocion_id, 0):
+                db.session.execute(update(Promocion).where(Promocion.id == promocion_id)
+                                   .values(usos_actuales=reales.get(promocion_id, 0),
+                                           updated_at=Promocion.updated_at)
+                                   .execution_options(synchronize_session=False))
+                corregidas += 1
+        db.session.commit()
+    if corregidas:
+        indice_promociones.sucio = True
+    return corregidas
+
+
+@promotions_bp.route('/api/promotions/evaluate', methods=['POST'])
+def evaluar():
+    datos = request.get_json(silent=True) or {}
+    try:
+        restaurante_id = int(datos['restaurant_id'])
+        subtotal = Decimal(str(datos['subtotal']))
+        costo_envio = Decimal(str(datos.get('costo_envio', 0)))
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        return jsonify({'success': False, 'error': 'Datos no válidos.'}), 400
+    modalidad = datos.get('modalidad', 'envio')
+    if not isinstance(modalidad, str) or modalidad not in MODALIDADES:
+        return jsonify({'success': False, 'error': 'Modalidad no válida.'}), 400
+    if not isinstance(datos.get('codigo'), (str, type(None))):
+        return jsonify({'success': False, 'error': 'Código no válido.'}), 400
+
+    indice_promociones.refrescar()
+    promo, monto = indice_promociones.mejor(restaurante_id, subtotal, costo_envio, modalidad,
+                                            codigo=datos.get('codigo'))
+    return jsonify({
+        'success': True,
+        'promocion_id': promo.id if promo else None,
+        'codigo': promo.codigo if promo else None,
+        'descuento': float(monto),
+    })
+
+
+# Un cambio en Promocion hecho desde este proceso se ve de inmediato
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Promocion):
+            session.info['promociones_cambiadas'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    if session.info.pop('promociones_cambiadas', False):
+        indice_promociones.sucio = True
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('promociones_cambiadas', None)
+
+
+@promotions_bp.cli.command('reconciliar')
+@click.option('--lote', default=500, help='Promociones por lote.')
+def reconciliar_command(lote):
+    """Recalcula usos_actuales desde uso_promociones."""
+    click.echo(f'{reconciliar_usos(lote)} promociones corregidas.')
@@ -0,0 +1,164 @@
+# ratings.py - Mantenimiento incremental de Restaurante.rating y numero_reviews
+import click
+from flask import Blueprint
+from sqlalchemy import case, event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from catalog import invalidar_restaurante
+from models import db, Restaurante, Reseña
+
+ratings_bp = Blueprint('ratings', __name__, cli_group='ratings')
+
+
+# Sin active_history, asignar un atributo expirado (lo normal tras un commit)
+# no carga el valor anterior y no se podría restar su aporte
+def _conservar_anterior(target, value, oldvalue, initiator):
+    return value
+
+
+for _atributo in (Reseña.estado, Reseña.calificacion, Reseña.restaurante_id):
+    event.listen(_atributo, 'set', _conservar_anterior, active_history=True, retval=True)
+
+
+def _valores(estado_obj, atributo):
+    # (valor antes del flush, valor después del flush)
+    historia = estado_obj.attrs[atributo].history
+    if historia.deleted:
+        antes = historia.deleted[0]
+    elif historia.unchanged:
+        antes = historia.unchanged[0]
+    else:
+        antes = None
+    despues = historia.added[0] if historia.added else antes
+    return antes, despues
+
+
+def _aporte(restaurante_id, estado, calificacion):
+    # Una reseña sólo cuenta para el rating mientras está aprobada
+    if estado == 'aprobada' and calificacion is not None and restaurante_id is not None:
+        return restaurante_id, calificacion
+    return None
+
+
+def _deltas(session):
+    deltas = {}
+
+    def sumar(aporte, signo):
+        if aporte is None:
+            return
+        restaurante_id, calificacion = aporte
+        suma, cantidad = deltas.get(restaurante_id, (0, 0))
+        deltas[restaurante_id] = (suma + signo * calificacion, cantidad + signo)
+
+    for obj in session.new:
+        if isinstance(obj, Reseña):
+            sumar(_aporte(obj.restaurante_id, obj.estado, obj.calificacion), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Reseña):
+            estado_obj = inspect(obj)
+            sumar(_aporte(_valores(estado_obj, 'restaurante_id')[0],
+                          _valores(estado_obj, 'estado')[0],
+                          _valores(estado_obj, 'calificacion')[0]), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Reseña) and obj not in session.deleted:
+            estado_obj = inspect(obj)
+            restaurante = _valores(estado_obj, 'restaurante_id')
+            estado = _valores(estado_obj, 'estado')
+            calificacion = _valores(estado_obj, 'calificacion')
+            sumar(_aporte(restaurante[0], estado[0], calificacion[0]), -1)
+            sumar(_aporte(restaurante[1], estado[1], calificacion[1]), 1)
+
+    return {rid: d for rid, d in deltas.items() if d != (0, 0)}
+
+
+def _nuevo_rating(suma, cantidad):
+    return case((cantidad > 0, func.round(suma * 1.0 / cantidad, 1)), else_=0)
+
+
+@event.listens_for(Session, 'after_flush')
+def _actualizar_ratings(session, flush_context):
+    # Transiciones pendiente->aprobada, aprobada->rechazada, cambios de
+    # calificacion o borrados se traducen en un delta (suma, cantidad) por
+    # restaurante que se aplica con un UPDATE atómico, sin recorrer reseñas
+    deltas = _deltas(session)
+    if not deltas:
+        return
+    conexion = session.connection()
+    for restaurante_id, (d_suma, d_cantidad) in deltas.items():
+        suma = func.coalesce(Restaurante.suma_calificaciones, 0) + d_suma
+        cantidad = func.coalesce(Restaurante.numero_reviews, 0) + d_cantidad
+        conexion.execute(
+            update(Restaurante.__table__)
+            .where(Restaurante.id == restaurante_id)
+            .values(suma_calificaciones=suma, numero_reviews=cantidad, rating=_nuevo_rating(suma, cantidad))
+        )
+        invalidar_restaurante(session, restaurante_id)
+    session.info.setdefault('ratings_expirar', set()).update(deltas)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expirar(session, flush_context):
+    # Los Restaurante ya cargados en la sesión deben releer los contadores
+    for restaurante_id in session.info.pop('ratings_expirar', ()):
+        restaurante = session.identity_map.get(Restaurante.__mapper__.identity_key_from_primary_key((restaurante_id,)))
+        if restaurante is not None:
+            session.expire(restaurante, ['rating', 'numero_reviews', 'suma_calificaciones'])
+
+
+def reconciliar(tamano_lote=500, corregir=True):
+    # Recalcula todos los restaurantes por lotes de ids con un GROUP BY por
+    # lote y devuelve las diferencias encontradas
+    diferencias = []
+    ultimo_id = 0
+    while True:
+        lote = (db.session.query(Restaurante.id, Restaurante.suma_calificaciones, Restaurante.numero_reviews)
+                .filter(Restaurante.id > ultimo_id)
+                .order_by(Restaurante.id)
+                .limit(tamano_lote)
+                .all())
+        if not lote:
+            break
+        ultimo_id = lote[-1].id
+
+        reales = dict(
+            (rid, (int(suma or 0), cantidad))
+            for rid, suma, cantidad in db.session.query(
+                Reseña.restaurante_id, func.sum(Reseña.calificacion), func.count(Reseña.id))
+            .filter(Reseña.estado == 'aprobada', Reseña.restaurante_id.in_([r.id for r in lote]))
+            .group_by(Reseña.restaurante_id)
+        )
+
+        cambios = []
+        for rid, suma, cantidad in lote:
+            real_suma, real_cantidad = reales.get(rid, (0, 0))
+            if (suma or 0, cantidad or 0) != (real_suma, real_cantidad):
+                diferencias.append({
+                    'restaurante_id': rid,
+                    'guardado': (suma or 0, cantidad or 0),
+                    'real': (real_suma, real_cantidad),
+                })
+                cambios.append({
+                    'id': rid,
+                    'suma_calificaciones': real_suma,
+                    'numero_reviews': real_cantidad,
+                    'rating': round(real_suma / real_cantidad, 1) if real_cantidad else 0,
+                })
+
+        if corregir and cambios:
+            # Actualización masiva por clave primaria (executemany)
+            db.session.execute(update(Restaurante), cambios)
+            for cambio in cambios:
+                invalidar_restaurante(db.session, cambio['id'])
+            db.session.commit()
+    return diferencias
+
+
+@ratings_bp.cli.command('reconciliar')
+@click.option('--lote', default=500, help='Restaurantes por consulta.')
+@click.option('--solo-informe', is_flag=True, help='Informar diferencias sin corregirlas.')
+def reconciliar_command(lote, solo_informe):
+    """Recalcula rating y numero_reviews desde las reseñas aprobadas."""
+    diferencias = reconciliar(lote, corregir=not solo_informe)
+    for d in diferencias:
+        click.echo(f"Restaurante {d['restaurante_id']}: guardado {d['guardado']} -> real {d['real']}")
+    click.echo(f'{len(diferencias)} restaurantes con diferencias.')
@@ -0,0 +1,274 @@
+# reservations.py - Disponibilidad de mesas y reservas sin doble asignación
+import secrets
+from datetime import date, datetime, time as dtime
+
+from flask import Blueprint, current_app, jsonify, request, session, abort
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from cache import CacheLRU
+from models import db, Restaurante, Reserva, HorarioRestaurante
+
+reservations_bp = Blueprint('reservations', __name__)
+
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+# Personas que caben a la vez en cada zona si la configuración no dice otra cosa
+CAPACIDAD_POR_DEFECTO = {'interior': 40, 'terraza': 20, 'vip': 8, 'privada': 12}
+ZONA_POR_DEFECTO = 'interior'
+ESTADOS_ACTIVOS = ('pendiente', 'confirmada')
+
+# Resolución de la línea de tiempo de ocupación, en minutos
+GRANULARIDAD = 15
+
+# (restaurante_id, fecha) -> Disponibilidad ya calculada
+cache_disponibilidad = CacheLRU(maxsize=2048, ttl=60)
+
+
+class ReservaNoDisponible(Exception):
+    pass
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def _config(clave, defecto):
+    return current_app.config.get(clave, defecto)
+
+
+class Disponibilidad:
+    # Línea de tiempo de un restaurante en un día: para cada zona, cuántas
+    # personas hay sentadas en cada tramo de GRANULARIDAD minutos
+
+    def __init__(self, apertura, cierre, capacidades, duracion, intervalo):
+        self.apertura = apertura
+        self.cierre = cierre
+        self.capacidades = capacidades
+        self.duracion = duracion
+        self.intervalo = intervalo
+        tramos = max((cierre - apertura + GRANULARIDAD - 1) // GRANULARIDAD, 0)
+        self.ocupacion = {zona: [0] * tramos for zona in capacidades}
+
+    @classmethod
+    def cargar(cls, restaurante_id, fecha, bloquear=False):
+        # Con bloquear=True el bloqueo es lo primero que se lee: con REPEATABLE
+        # READ una lectura normal anterior fijaría la foto de la transacción
+        # y no veríamos la reserva que confirmó quien tenía el bloqueo
+        horario = (HorarioRestaurante.query
+                   .filter_by(restaurante_id=restaurante_id, dia_semana=DIAS_SEMANA[fecha.weekday()]))
+        if bloquear:
+            # Bloqueo de fila de ese día de la semana: dos reservas del mismo
+            # restaurante y día se ordenan, las de otros restaurantes no esperan
+            horario = horario.with_for_update()
+        horario = horario.first()
+
+        if horario is not None:
+            if not horario.abierto:
+                return None
+            apertura, cierre = horario.hora_apertura, horario.hora_cierre
+        else:
+            # Sin horario para ese día se bloquea la fila del restaurante
+            restaurante = db.session.query(Restaurante).filter_by(id=restaurante_id)
+            if bloquear:
+                restaurante = restaurante.with_for_update()
+            restaurante = restaurante.first()
+            if restaurante is None or not (restaurante.horario_apertura and restaurante.horario_cierre):
+                return None
+            apertura, cierre = restaurante.horario_apertura, restaurante.horario_cierre
+
+        inicio, fin = _minutos(apertura), _minutos(cierre)
+        if fin <= inicio:
+            # Cierra después de medianoche
+            fin += 24 * 60
+
+        disponibilidad = cls(
+            inicio, fin,
+            dict(_config('RESERVAS_CAPACIDAD', CAPACIDAD_POR_DEFECTO)),
+            _config('RESERVAS_DURACION_MINUTOS', 90),
+            _config('RESERVAS_INTERVALO_MINUTOS', 30),
+        )
+        reservas = (db.session.query(Reserva.hora, Reserva.duracion_estimada,
+                                     Reserva.numero_personas, Reserva.zona_mesa)
+                    .filter(Reserva.restaurante_id == restaurante_id,
+                            Reserva.fecha == fecha,
+                            Reserva.estado.in_(ESTADOS_ACTIVOS)))
+        if bloquear:
+            # Lectura con bloqueo: siempre ve la última versión confirmada,
+            # sin depender de la foto de la transacción
+            reservas = reservas.with_for_update()
+        for hora, duracion, personas, zona in reservas:
+            disponibilidad.ocupar(zona or ZONA_POR_DEFECTO, disponibilidad.minuto(hora), duracion, personas)
+        return disponibilidad
+
+    def minuto(self, hora):
+        # Minutos desde la medianoche del día de la reserva. Si cierra después
+        # de medianoche, las horas antes de la apertura son de la madrugada
+        # siguiente (la reserva de las 00:30 queda con la fecha del servicio)
+        minutos = _minutos(hora)
+        if minutos < self.apertura and self.cierre > 24 * 60:
+            minutos += 24 * 60
+        return minutos
+
+    def _tramos(self, inicio, duracion):
+        desde = (inicio - self.apertura) // GRANULARIDAD
+        hasta = (inicio + (duracion or self.duracion) - self.apertura + GRANULARIDAD - 1) // GRANULARIDAD
+        return max(desde, 0), hasta
+
+    def ocupar(self, zona, inicio, duracion, personas):
+        linea = self.ocupacion.get(zona)
+        if linea is None:
+            return
+        desde, hasta = self._tramos(inicio, duracion)
+        for i in range(desde, min(hasta, len(linea))):
+            linea[i] += personas
+
+    def cabe(self, zona, inicio, personas, duracion=None):
+        linea = self.ocupacion.get(zona)
+        if linea is None or inicio < self.apertura or inicio + (duracion or self.duracion) > self.cierre:
+            return False
+        desde, hasta = self._tramos(inicio, duracion)
+        pico = max(linea[desde:hasta], default=0)
+        return pico + personas <= self.capacidades[zona]
+
+    def huecos_libres(self, personas, zona=None):
+        zonas = [zona] if zona else list(self.capacidades)
+        huecos = []
+        for inicio in range(self.apertura, self.cierre - self.duracion + 1, self.intervalo):
+            libres = [z for z in zonas if self.cabe(z, inicio, personas)]
+            if libres:
+                huecos.append({'hora': '%02d:%02d' % divmod(inicio % (24 * 60), 60), 'zonas': libres})
+        return huecos
+
+
+def disponibilidad_del_dia(restaurante_id, fecha):
+    return cache_disponibilidad.get_or_set(
+        (restaurante_id, fecha), lambda: Disponibilidad.cargar(restaurante_id, fecha))
+
+
+def _nuevo_codigo():
+    return 'R' + secrets.token_hex(5).upper()
+
+
+def reservar(usuario_id, restaurante_id, fecha, hora, personas, zona=None, **datos):
+    # La comprobación se repite contra la base con la fila del horario
+    # bloqueada; la caché sólo sirve para mostrar huecos
+    try:
+        disponibilidad = Disponibilidad.cargar(restaurante_id, fecha, bloquear=True)
+        if disponibilidad is None:
+            raise ReservaNoDisponible('El restaurante no abre ese día.')
+
+        inicio = disponibilidad.minuto(hora)
+        if (inicio - disponibilidad.apertura) % disponibilidad.intervalo:
+            raise ReservaNoDisponible('Hora no válida.')
+        candidatas = [zona] if zona else list(disponibilidad.capacidades)
+        zona_libre = next((z for z in candidatas if disponibilidad.cabe(z, inicio, personas)), None)
+        if zona_libre is None:
+            raise ReservaNoDisponible('No quedan mesas libres para esa hora.')
+
+        reserva = Reserva(
+            usuario_id=usuario_id,
+            restaurante_id=restaurante_id,
+            fecha=fecha,
+            hora=hora,
+            numero_personas=personas,
+            zona_mesa=zona_libre,
+            duracion_estimada=disponibilidad.duracion,
+            codigo_reserva=_nuevo_codigo(),
+            **datos
+        )
+        db.session.add(reserva)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return reserva
+
+
+# ====================================================
+# RUTAS
+# ====================================================
+
+def _leer_fecha(texto):
+    try:
+        return date.fromisoformat(texto)
+    except (TypeError, ValueError):
+        return None
+
+
+@reservations_bp.route('/api/v1/restaurants/<int:restaurante_id>/availability')
+def disponibilidad(restaurante_id):
+    fecha = _leer_fecha(request.args.get('date'))
+    personas = request.args.get('guests', 2, type=int)
+    zona = request.args.get('zona')
+    if fecha is None or personas < 1:
+        abort(400)
+
+    dia = disponibilidad_del_dia(restaurante_id, fecha)
+    huecos = dia.huecos_libres(personas, zona) if dia is not None and fecha >= date.today() else []
+    return jsonify({'restaurant_id': restaurante_id, 'date': fecha.isoformat(),
+                    'guests': personas, 'slots': huecos})
+
+
+@reservations_bp.route('/reserve', methods=['POST'])
+def reserve():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Debes iniciar sesión para reservar.'}), 401
+
+    restaurante_id = request.form.get('restaurant_id', type=int)
+    fecha = _leer_fecha(request.form.get('date'))
+    personas = request.form.get('guests', type=int)
+    try:
+        hora = dtime.fromisoformat(request.form.get('time', ''))
+    except ValueError:
+        hora = None
+    if not restaurante_id or fecha is None or hora is None or not personas or personas < 1:
+        return jsonify({'success': False, 'error': 'Datos de reserva incompletos.'}), 400
+    if datetime.combine(fecha, hora) < datetime.now():
+        return jsonify({'success': False, 'error': 'La fecha ya pasó.'}), 400
+
+    try:
+        reserva = reservar(
+            session['user_id'], restaurante_id, fecha, hora, personas,
+            zona=request.form.get('zona') or None,
+            notas_especiales=request.form.get('special_requests'),
+            nombre_reserva=session.get('user_name'),
+        )
+    except ReservaNoDisponible as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+
+    return jsonify({'success': True,
+                    'message': f'Reserva confirmada. Código: {reserva.codigo_reserva}',
+                    'codigo_reserva': reserva.codigo_reserva})
+
+
+# ====================================================
+# INVALIDACIÓN
+# ====================================================
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    pendientes = session.info.setdefault('disponibilidad_invalidar', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Reserva):
+            # Si se movió de día también hay que liberar la fecha anterior
+            for fecha in [obj.fecha, *inspect(obj).attrs.fecha.history.deleted]:
+                pendientes.add((obj.restaurante_id, fecha))
+        elif isinstance(obj, HorarioRestaurante):
+            pendientes.add(obj.restaurante_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    pendientes = session.info.pop('disponibilidad_invalidar', ())
+    if any(not isinstance(clave, tuple) for clave in pendientes):
+        # Cambió un horario: es más simple descartar todo que buscar sus días
+        cache_disponibilidad.clear()
+        return
+    for clave in pendientes:
+        cache_disponibilidad.delete(clave)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('disponibilidad_invalidar', None)
@@ -0,0 +1,253 @@
+# search.py - Búsqueda de restaurantes con índice invertido en memoria
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func
+
+from models import db, Restaurante, MenuItem
+
+search_bp = Blueprint('search', __name__)
+
+# Peso de cada campo al puntuar un resultado
+PESOS_CAMPOS = {
+    'nombre': 3.0,
+    'tipo_cocina': 2.0,
+    'menu': 1.5,
+    'descripcion': 1.0,
+}
+
+# Las coincidencias por prefijo valen menos que las exactas
+FACTOR_PREFIJO = 0.6
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    # Quita acentos y pasa a minúsculas ("Lasaña" -> "lasana")
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.lower()
+
+
+def tokenizar(texto):
+    return _TOKEN_RE.findall(normalizar(texto))
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            # token -> {restaurante_id: peso}
+            self._postings = {}
+            # Lista ordenada de tokens para búsquedas por prefijo con bisect
+            self._tokens = []
+            # restaurante_id -> {token: peso}, necesario para reindexar o borrar
+            self._documentos = {}
+            # restaurante_id -> datos mínimos para devolver en los resultados
+            self._resumenes = {}
+            # restaurante_id -> platos indexados, para notar los que se borran o mueven
+            self._platos = {}
+            # (count, sum) de ids de restaurantes y de platos en la última sincronización
+            self._versiones = None
+            self.ultima_actualizacion = None
+            self._ultima_sincronizacion = 0.0
+
+    # ---------- Mantenimiento del índice ----------
+
+    def indexar(self, restaurante, nombres_menu=()):
+        pesos = {}
+        campos = (
+            ('nombre', restaurante.nombre),
+            ('tipo_cocina', restaurante.tipo_cocina),
+            ('descripcion', restaurante.descripcion),
+            ('menu', ' '.join(nombres_menu)),
+        )
+        for campo, texto in campos:
+            for token in tokenizar(texto):
+                pesos[token] = pesos.get(token, 0.0) + PESOS_CAMPOS[campo]
+
+        resumen = {
+            'id': restaurante.id,
+            'nombre': restaurante.nombre,
+            'slug': restaurante.slug,
+            'tipo_cocina': restaurante.tipo_cocina,
+            'rating': float(restaurante.rating or 0),
+            'precio_rango': restaurante.precio_rango,
+        }
+        with self._lock:
+            self._eliminar_sin_lock(restaurante.id)
+            for token, peso in pesos.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    insort(self._tokens, token)
+                posting[restaurante.id] = peso
+            self._documentos[restaurante.id] = pesos
+            self._resumenes[restaurante.id] = resumen
+            self._platos[restaurante.id] = len(nombres_menu)
+
+    def eliminar(self, restaurante_id):
+        with self._lock:
+            self._eliminar_sin_lock(restaurante_id)
+
+    def _eliminar_sin_lock(self, restaurante_id):
+        pesos = self._documentos.pop(restaurante_id, None)
+        self._resumenes.pop(restaurante_id, None)
+        self._platos.pop(restaurante_id, None)
+        if not pesos:
+            return
+        for token in pesos:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(restaurante_id, None)
+            if not posting:
+                del self._postings[token]
+                pos = bisect_left(self._tokens, token)
+                if pos < len(self._tokens) and self._tokens[pos] == token:
+                    del self._tokens[pos]
+
+    def sincronizar(self, forzar=False):
+        # Reindexa sólo los restaurantes (o sus platos) modificados desde la
+        # última sincronización. Se limita a una consulta cada
+        # SEARCH_SYNC_INTERVAL segundos para no golpear la base en cada tecla.
+        intervalo = current_app.config.get('SEARCH_SYNC_INTERVAL', 5)
+        ahora = time.monotonic()
+        if not forzar and self._ultima_sincronizacion and ahora - self._ultima_sincronizacion < intervalo:
+            return
+        self._ultima_sincronizacion = ahora
+
+        desde = self.ultima_actualizacion
+        inicio = datetime.utcnow()
+        # Un borrado no deja updated_at: se nota en (count, sum) de los ids.
+        # Se lee antes que los cambios, así lo borrado después se ve la próxima vez
+        versiones = (
+            tuple(db.session.query(func.count(Restaurante.id), func.coalesce(func.sum(Restaurante.id), 0)).one()),
+            tuple(db.session.query(func.count(MenuItem.id),
+                                   func.coalesce(func.sum(MenuItem.restaurante_id), 0)).one()),
+        )
+
+        consulta = Restaurante.query
+        if desde is not None:
+            ids_menu = db.session.query(MenuItem.restaurante_id).filter(MenuItem.updated_at >= desde)
+            consulta = consulta.filter(db.or_(
+                Restaurante.updated_at >= desde,
+                Restaurante.id.in_(ids_menu),
+            ))
+        restaurantes = consulta.all()
+        if desde is not None and self._versiones is not None:
+            restaurantes += self._borrados(versiones, {r.id for r in restaurantes})
+        # updated_at lo pone la aplicación con datetime.utcnow, así que lo
+        # modificado durante esta sincronización quedará >= inicio
+        self.ultima_actualizacion = inicio
+        self._versiones = versiones
+        if not restaurantes:
+            return
+
+        # Una sola consulta para los nombres de plato de todos los modificados
+        ids = [r.id for r in restaurantes]
+        platos = {}
+        filas = db.session.query(MenuItem.restaurante_id, MenuItem.nombre).filter(MenuItem.restaurante_id.in_(ids))
+        for restaurante_id, nombre in filas:
+            platos.setdefault(restaurante_id, []).append(nombre)
+
+        for restaurante in restaurantes:
+            if restaurante.estado == 'inactivo':
+                self.eliminar(restaurante.id)
+            else:
+                self.indexar(restaurante, platos.get(restaurante.id, ()))
+
+    def _borrados(self, versiones, ya_leidos):
+        # Quita los restaurantes borrados y devuelve los que perdieron platos
+        # (borrados o movidos a otro restaurante) para reindexarlos
+        if versiones[0] != self._versiones[0]:
+            existentes = {rid for rid, in db.session.query(Restaurante.id)}
+            for restaurante_id in set(self._documentos) - existentes:
+                self.eliminar(restaurante_id)
+        if versiones[1] == self._versiones[1]:
+            return []
+        actuales = dict(db.session.query(MenuItem.restaurante_id, func.count(MenuItem.id))
+                        .group_by(MenuItem.restaurante_id))
+        cambiados = [rid for rid, n in list(self._platos.items())
+                     if n != actuales.get(rid, 0) and rid not in ya_leidos]
+        if not cambiados:
+            return []
+        return Restaurante.query.filter(Restaurante.id.in_(cambiados)).all()
+
+    # ---------- Consultas ----------
+
+    def _expandir(self, termino):
+        # Tokens del índice que empiezan por el término buscado
+        pos = bisect_left(self._tokens, termino)
+        while pos < len(self._tokens) and self._tokens[pos].startswith(termino):
+            yield self._tokens[pos]
+            pos += 1
+
+    def buscar(self, texto, pagina=1, por_pagina=20):
+        terminos = tokenizar(texto)
+        if not terminos:
+            return 0, []
+
+        with self._lock:
+            puntuaciones = None
+            for termino in terminos:
+                parcial = {}
+                for token in self._expandir(termino):
+                    factor = 1.0 if token == termino else FACTOR_PREFIJO
+                    for restaurante_id, peso in self._postings[token].items():
+                        valor = peso * factor
+                        if valor > parcial.get(restaurante_id, 0.0):
+                            parcial[restaurante_id] = valor
+                # Todos los términos deben coincidir (AND)
+                if puntuaciones is None:
+                    puntuaciones = parcial
+                else:
+                    puntuaciones = {
+                        rid: puntuaciones[rid] + valor
+                        for rid, valor in parcial.items() if rid in puntuaciones
+                    }
+                if not puntuaciones:
+                    return 0, []
+
+            ordenados = sorted(
+                puntuaciones.items(),
+                key=lambda par: (-par[1], -self._resumenes[par[0]]['rating'], par[0]),
+            )
+            inicio = (pagina - 1) * por_pagina
+            resultados = [
+                dict(self._resumenes[rid], score=round(score, 3))
+                for rid, score in ordenados[inicio:inicio + por_pagina]
+            ]
+        return len(ordenados), resultados
+
+
+indice = IndiceBusqueda()
+
+
+@search_bp.route('/api/search')
+def api_search():
+    texto = request.args.get('q', '').strip()
+    pagina = max(request.args.get('page', 1, type=int), 1)
+    por_pagina = request.args.get('per_page', 20, type=int)
+    por_pagina = min(max(por_pagina, 1), current_app.config.get('SEARCH_MAX_PER_PAGE', 50))
+
+    indice.sincronizar()
+    total, resultados = indice.buscar(texto, pagina, por_pagina)
+
+    return jsonify({
+        'query': texto,
+        'total': total,
+        'page': pagina,
+        'per_page': por_pagina,
+        'results': resultados,
+    })
@@ -0,0 +1,222 @@
+# settings.py - ConfiguracionSistema en memoria, con tipos y versión
+import json
+import threading
+import time
+from types import MappingProxyType
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from auth import requiere_admin
+from models import db, ConfiguracionSistema
+
+settings_bp = Blueprint('settings', __name__, cli_group='ajustes')
+
+VERDADEROS = ('1', 'true', 'si', 'sí', 'yes', 'on')
+FALSOS = ('0', 'false', 'no', 'off', '')
+
+
+class ValorInvalido(ValueError):
+    pass
+
+
+def decodificar(valor, tipo):
+    if valor is None:
+        return None
+    if tipo == 'numero':
+        try:
+            return int(valor)
+        except ValueError:
+            try:
+                return float(valor)
+            except ValueError:
+                raise ValorInvalido(f'{valor!r} no es un número')
+    if tipo == 'booleano':
+        texto = valor.strip().lower()
+        if texto in VERDADEROS:
+            return True
+        if texto in FALSOS:
+            return False
+        raise ValorInvalido(f'{valor!r} no es un booleano')
+    if tipo == 'json':
+        try:
+            return json.loads(valor)
+        except ValueError:
+            raise ValorInvalido(f'{valor!r} no es JSON válido')
+    return valor
+
+
+def codificar(valor, tipo):
+    if valor is None:
+        return None
+    if tipo == 'booleano':
+        if isinstance(valor, str):
+            valor = decodificar(valor, tipo)
+        return 'true' if valor else 'false'
+    if tipo == 'json':
+        return json.dumps(valor, ensure_ascii=False)
+    return str(valor)
+
+
+class Ajustes:
+    # Todas las claves ya decodificadas. Las lecturas sólo miran el dict en
+    # memoria; como mucho una vez por intervalo y proceso un hilo compara la
+    # versión (max(updated_at), count) y recarga la tabla si cambió
+    # (updated_at guarda microsegundos, también en MySQL). Un
+    # cambio hecho en otro worker se ve, como tarde, al pasar el intervalo.
+    # Los valores json se comparten entre hilos: no modificarlos.
+
+    def __init__(self, intervalo=5):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._version = None
+        self._comprobado = 0.0
+        self._valores = {}
+        self._grupos = {}
+
+    def configurar(self, intervalo):
+        self.intervalo = intervalo
+
+    def get(self, clave, defecto=None):
+        self._al_dia()
+        return self._valores.get(clave, defecto)
+
+    def todos(self):
+        self._al_dia()
+        return MappingProxyType(self._valores)
+
+    def grupo(self, nombre):
+        self._al_dia()
+        return self._grupos.get(nombre, MappingProxyType({}))
+
+    def invalidar(self):
+        # La siguiente lectura de este proceso recarga: no se depende de la
+        # versión, que puede no moverse si los relojes de los workers difieren
+        self._version = None
+        self._comprobado = 0.0
+
+    def _al_dia(self):
+        if time.monotonic() - self._comprobado < self.intervalo:
+            return
+        # Un solo hilo comprueba; los demás siguen con lo que hay
+        if not self._lock.acquire(blocking=self._version is None):
+            return
+        try:
+            if time.monotonic() - self._comprobado >= self.intervalo:
+                self._refrescar()
+        finally:
+            self._lock.release()
+
+    def _refrescar(self):
+        version = tuple(db.session.query(func.max(ConfiguracionSistema.updated_at),
+                                         func.count(ConfiguracionSistema.id)).one())
+        if version != self._version:
+            valores, grupos = {}, {}
+            for clave, valor, tipo, grupo in db.session.query(
+                    ConfiguracionSistema.clave, ConfiguracionSistema.valor,
+                    ConfiguracionSistema.tipo, ConfiguracionSistema.grupo):
+                try:
+                    valores[clave] = decodificar(valor, tipo)
+                except ValorInvalido as e:
+                    current_app.logger.warning('Ajuste %s ignorado: %s', clave, e)
+                    continue
+                if grupo:
+                    grupos.setdefault(grupo, {})[clave] = valores[clave]
+            # Se reemplazan enteros: un lector nunca ve una carga a medias
+            self._valores = valores
+            self._grupos = {g: MappingProxyType(v) for g, v in grupos.items()}
+            self._version = version
+        self._comprobado = time.monotonic()
+
+
+ajustes = Ajustes()
+
+
+@settings_bp.record_once
+def _configurar(state):
+    ajustes.configurar(state.app.config.get('AJUSTES_INTERVALO', 5))
+
+
+@settings_bp.app_template_global('ajuste')
+def ajuste(clave, defecto=None):
+    return ajustes.get(clave, defecto)
+
+
+def guardar(clave, valor, tipo=None, grupo=None, descripcion=None):
+    # Crea o actualiza un ajuste a partir del valor ya tipado
+    registro = ConfiguracionSistema.query.filter_by(clave=clave).first()
+    if registro is None:
+        registro = ConfiguracionSistema(clave=clave, tipo=tipo or 'texto', grupo=grupo, descripcion=descripcion)
+        db.session.add(registro)
+    else:
+        registro.tipo = tipo or registro.tipo
+        registro.grupo = grupo or registro.grupo
+    registro.valor = codificar(valor, registro.tipo)
+    db.session.commit()
+    return registro
+
+
+# Las escrituras de este proceso se ven en la siguiente lectura, sin
+# esperar al intervalo
+@event.listens_for(Session, 'after_flush')
+def _marcar_cambios(session, flush_context):
+    if any(isinstance(obj, ConfiguracionSistema) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['ajustes_cambiados'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar(session):
+    if session.info.pop('ajustes_cambiados', False):
+        ajustes.invalidar()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('ajustes_cambiados', None)
+
+
+# ====================================================
+# RUTAS Y COMANDOS
+# ====================================================
+
+@settings_bp.route('/api/admin/settings')
+def listar_ajustes():
+    requiere_admin()
+    grupo = request.args.get('grupo')
+    return jsonify({'success': True, 'settings': dict(ajustes.grupo(grupo) if grupo else ajustes.todos())})
+
+
+@settings_bp.route('/api/admin/settings/<clave>', methods=['PUT'])
+def cambiar_ajuste(clave):
+    requiere_admin()
+    registro = ConfiguracionSistema.query.filter_by(clave=clave).first()
+    if registro is None:
+        return jsonify({'success': False, 'error': 'Ajuste no encontrado'}), 404
+    if not registro.editable:
+        return jsonify({'success': False, 'error': 'Ajuste no editable'}), 403
+    valor = (request.get_json(silent=True) or {}).get('valor')
+    try:
+        # Se valida con el mismo decodificador que usa la lectura
+        decodificar(codificar(valor, registro.tipo), registro.tipo)
+    except ValorInvalido as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    guardar(clave, valor)
+    return jsonify({'success': True, 'clave': clave, 'valor': ajustes.get(clave)})
+
+
+@settings_bp.cli.command('poner')
+@click.argument('clave')
+@click.argument('valor')
+@click.option('--tipo', type=click.Choice(['texto', 'numero', 'booleano', 'json']))
+@click.option('--grupo')
+def poner_command(clave, valor, tipo, grupo):
+    """Guarda VALOR (en texto) en la clave; los workers lo ven en AJUSTES_INTERVALO segundos."""
+    registro = ConfiguracionSistema.query.filter_by(clave=clave).first()
+    tipo_final = tipo or (registro.tipo if registro else 'texto')
+    try:
+        guardar(clave, decodificar(valor, tipo_final), tipo=tipo_final, grupo=grupo)
+    except ValorInvalido as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{clave} = {ajustes.get(clave)!r}')
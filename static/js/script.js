@@ -1,42 +1,22 @@
 
-const restaurantesData = [
-  { 
-    id: 1, 
-    nombre: "Milano Italiano", 
-    rating: 4.8, 
-    cocina: ["italiana"], 
-    descripcion: "Auténtica cocina italiana.",
-    menu: [
-      {"nombre": "Pizza Margherita", "precio": 12, "categoria": "Pizzas"},
-      {"nombre": "Pasta Carbonara", "precio": 14, "categoria": "Pastas"},
-      {"nombre": "Tiramisú", "precio": 8, "categoria": "Postres"}
-    ]
-  },
-  { 
-    id: 2, 
-    nombre: "Sakura Sushi", 
-    rating: 4.9, 
-    cocina: ["japonesa"], 
-    descripcion: "Sushi fresco y auténtico.",
-    menu: [
-      {"nombre": "Nigiri Mixto", "precio": 18, "categoria": "Nigiri"},
-      {"nombre": "Miso Soup", "precio": 6, "categoria": "Sopas"},
-      {"nombre": "Tempura de Camarón", "precio": 15, "categoria": "Entradas"}
-    ]
-  },
-  { 
-    id: 3, 
-    nombre: "Green Garden", 
-    rating: 4.7, 
-    cocina: ["vegetariana"], 
-    descripcion: "Comida vegetariana y vegana.",
-    menu: [
-      {"nombre": "Bowl de Quinoa", "precio": 10, "categoria": "Platos Principales"},
-      {"nombre": "Ensalada Mediterránea", "precio": 9, "categoria": "Ensaladas"},
-      {"nombre": "Smoothie de Frutas", "precio": 7, "categoria": "Bebidas"}
-    ]
+// Detalle de restaurantes ya descargados en esta página
+const restaurantCache = new Map();
+
+function fetchRestaurant(id) {
+  if (restaurantCache.has(id)) {
+    return Promise.resolve(restaurantCache.get(id));
   }
-];
+  // El servidor responde con ETag: si nada cambió, el navegador recibe un 304
+  return fetch(`/api/v1/restaurants/${id}`)
+    .then(response => {
+      if (!response.ok) throw new Error('Restaurante no encontrado');
+      return response.json();
+    })
+    .then(data => {
+      restaurantCache.set(id, data.restaurant);
+      return data.restaurant;
+    });
+}
 
 // ========================
 // INICIALIZACIÓN
@@ -60,23 +40,25 @@ document.addEventListener('DOMContentLoaded', function () {
 // ========================
 // BÚSQUEDA
 // ========================
+const SEARCH_DEBOUNCE_MS = 250;
+let searchTimer = null;
+let searchController = null;
+
 function initSearch() {
   const searchInput = document.getElementById('searchInput');
   const searchBtn = document.querySelector('.search-btn');
   
   if (searchInput) {
-    console.log('Input de búsqueda encontrado');
-    
-    // Buscar mientras se escribe
-    searchInput.addEventListener('input', function(e) {
-      console.log('Input event:', e.target.value);
-      filterRestaurants();
+    // Buscar mientras se escribe, esperando a que el usuario haga una pausa
+    searchInput.addEventListener('input', function() {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(filterRestaurants, SEARCH_DEBOUNCE_MS);
     });
     
     // Buscar al presionar Enter
     searchInput.addEventListener('keypress', function(event) {
       if (event.key === 'Enter') {
-        console.log('Enter presionado');
+        clearTimeout(searchTimer);
         filterRestaurants();
       }
     });
@@ -84,26 +66,27 @@ function initSearch() {
   
   if (searchBtn) {
     searchBtn.addEventListener('click', function() {
-      console.log('Botón de búsqueda clickeado');
+      clearTimeout(searchTimer);
       filterRestaurants();
     });
   }
 }
 
+function getCardId(card) {
+  const idMatch = (card.getAttribute('onclick') || '').match(/\d+/);
+  return idMatch ? parseInt(idMatch[0]) : null;
+}
+
 function filterRestaurants() {
   const searchInput = document.getElementById('searchInput');
-  if (!searchInput) {
-    console.log('Input de búsqueda no encontrado');
-    return;
-  }
-  
-  const searchTerm = searchInput.value.toLowerCase().trim();
-  console.log('Buscando:', searchTerm);
+  if (!searchInput) return;
   
+  const searchTerm = searchInput.value.trim();
   const restaurantCards = document.querySelectorAll('.restaurant-card');
   
   // Si no hay texto, mostrar todos
   if (!searchTerm) {
+    if (searchController) searchController.abort();
     restaurantCards.forEach(card => {
       card.style.display = 'block';
     });
@@ -111,32 +94,35 @@ function filterRestaurants() {
     return;
   }
   
-  let hasResults = false;
+  // Cancelar la búsqueda anterior si todavía no ha respondido
+  if (searchController) searchController.abort();
+  searchController = new AbortController();
   
-  restaurantCards.forEach(card => {
-    const restaurantId = parseInt(card.getAttribute('onclick').match(/\d+/)[0]);
-    const restaurant = restaurantesData.find(r => r.id === restaurantId);
+  fetch(`/api/search?q=${encodeURIComponent(searchTerm)}&per_page=50`, {
+    signal: searchController.signal
+  })
+  .then(response => response.json())
+  .then(data => {
+    const matchingIds = new Set(data.results.map(r => r.id));
+    let hasResults = false;
     
-    if (restaurant) {
-      const name = restaurant.nombre.toLowerCase();
-      const cuisine = restaurant.cocina.join(' ').toLowerCase();
-      const description = restaurant.descripcion.toLowerCase();
-      
-      const matches = 
-        name.includes(searchTerm) || 
-        cuisine.includes(searchTerm) || 
-        description.includes(searchTerm);
-      
+    restaurantCards.forEach(card => {
+      const matches = matchingIds.has(getCardId(card));
       card.style.display = matches ? 'block' : 'none';
       if (matches) hasResults = true;
+    });
+    
+    if (!hasResults) {
+      showNoResultsMessage();
+    } else {
+      removeNoResultsMessage();
+    }
+  })
+  .catch(error => {
+    if (error.name !== 'AbortError') {
+      console.error('Error en la búsqueda:', error);
     }
   });
-  
-  if (!hasResults && searchTerm) {
-    showNoResultsMessage();
-  } else {
-    removeNoResultsMessage();
-  }
 }
 
 function showNoResultsMessage() {
@@ -294,29 +280,21 @@ window.onclick = function(event) {
 // DETALLE DE RESTAURANTE
 // ========================
 function openRestaurantDetail(id) {
+  fetchRestaurant(id)
+    .then(renderRestaurantDetail)
+    .catch(() => alert('Restaurante no encontrado'));
+}
+
+function renderRestaurantDetail(restaurante) {
   const modal = document.getElementById('restaurantModal');
   const content = document.getElementById('restaurantDetailContent');
-  
-  const restaurante = restaurantesData.find(r => r.id === id);
-  
-  if (!restaurante) {
-    alert('Restaurante no encontrado');
-    return;
-  }
-
-  // Agrupar menú por categorías
-  const menuByCategory = {};
-  restaurante.menu.forEach(item => {
-    if (!menuByCategory[item.categoria]) {
-      menuByCategory[item.categoria] = [];
-    }
-    menuByCategory[item.categoria].push(item);
-  });
+  const cocina = restaurante.tipo_cocina ? [restaurante.tipo_cocina] : [];
 
+  // El menú ya llega agrupado por categorías
   let menuHtml = '';
-  for (const [categoria, items] of Object.entries(menuByCategory)) {
-    menuHtml += `<h3 style="margin: 1.5rem 0 1rem; color: var(--primary);">${categoria}</h3>`;
-    items.forEach(item => {
+  for (const categoria of restaurante.menu) {
+    menuHtml += `<h3 style="margin: 1.5rem 0 1rem; color: var(--primary);">${categoria.nombre}</h3>`;
+    categoria.items.forEach(item => {
       menuHtml += `
         <div style="display: flex; justify-content: space-between; padding: 0.5rem 0; border-bottom: 1px solid var(--border);">
           <span>${item.nombre}</span>
@@ -339,7 +317,7 @@ function openRestaurantDetail(id) {
       <div>
         <h2 style="margin-bottom: 0.5rem;">${restaurante.nombre}</h2>
         <div style="display: flex; gap: 0.8rem; margin: 0.5rem 0;">
-          ${restaurante.cocina.map(c => `<span style="background-color: rgba(243, 122, 0, 0.1); color: var(--primary); padding: 0.2rem 0.6rem; border-radius: 20px; font-size: 0.8rem; font-weight: 500;">${c.charAt(0).toUpperCase() + c.slice(1)}</span>`).join('')}
+          ${cocina.map(c => `<span style="background-color: rgba(243, 122, 0, 0.1); color: var(--primary); padding: 0.2rem 0.6rem; border-radius: 20px; font-size: 0.8rem; font-weight: 500;">${c.charAt(0).toUpperCase() + c.slice(1)}</span>`).join('')}
         </div>
         <p style="margin: 1rem 0; line-height: 1.6; color: #666;">${restaurante.descripcion}</p>
         <div style="display: flex; gap: 1rem; margin: 1rem 0; flex-wrap: wrap;">
@@ -348,9 +326,9 @@ function openRestaurantDetail(id) {
           <span style="background-color: #f3e5f5; color: #7b1fa2; padding: 0.2rem 0.5rem; border-radius: 50%; font-size: 0.8rem;">🍽️ En el local</span>
         </div>
         <div style="margin: 1.5rem 0;">
-          <p><strong>📍 Dirección:</strong> Av. Principal 123</p>
-          <p><strong>📞 Teléfono:</strong> +56 9 1234 5678</p>
-          <p><strong>🕒 Horario:</strong> 12:00 - 23:00</p>
+          <p><strong>📍 Dirección:</strong> ${restaurante.direccion || 'Sin dirección'}</p>
+          <p><strong>📞 Teléfono:</strong> ${restaurante.telefono || 'Sin teléfono'}</p>
+          <p><strong>🕒 Horario:</strong> ${restaurante.horario_apertura && restaurante.horario_cierre ? `${restaurante.horario_apertura} - ${restaurante.horario_cierre}` : 'Consultar'}</p>
         </div>
         <div style="display: flex; gap: 1rem; flex-wrap: wrap;">
           <button class="btn btn-primary" style="flex: 1;" onclick="openReservationModal(${restaurante.id}, '${restaurante.nombre}')">Reservar mesa</button>
@@ -381,12 +359,14 @@ function toggleFavorite(id, event) {
     event.stopPropagation();
   }
   
-  // Enviar solicitud al servidor
+  // Enviar el estado deseado (no "invertir"): repetir el clic o que otro
+  // worker tenga otra copia del estado no lo deja al revés
   fetch(`/toggle_favorite/${id}`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
-    }
+    },
+    body: JSON.stringify({ favorite: !isHeartActive(id) })
   })
   .then(response => response.json())
   .then(data => {
@@ -395,8 +375,8 @@ function toggleFavorite(id, event) {
       return;
     }
     
-    // Actualizar visualmente
-    updateHeartIcons();
+    // Actualizar visualmente con el estado que devolvió el servidor
+    setHeartState(id, data.favorite);
     
     if (data.action === 'added') {
       showMessage('Restaurante agregado a favoritos', 'success');
@@ -410,50 +390,55 @@ function toggleFavorite(id, event) {
   });
 }
 
-function updateHeartIcons() {
-  // Actualizar corazones en las tarjetas
-  const hearts = document.querySelectorAll('.restaurant-card .heart');
-  hearts.forEach(heart => {
+// Corazones visibles: [id, elemento] de las tarjetas y del modal
+function visibleHearts() {
+  const hearts = [];
+  document.querySelectorAll('.restaurant-card .heart').forEach(heart => {
     const card = heart.closest('.restaurant-card');
-    if (card) {
-      const idMatch = card.getAttribute('onclick').match(/\d+/);
-      if (idMatch) {
-        const id = parseInt(idMatch[0]);
-        // Aquí normalmente verificaríamos contra el servidor
-        // Por ahora simulamos con localStorage
-        try {
-          const favorites = JSON.parse(localStorage.getItem('favorites')) || [];
-          if (favorites.includes(id)) {
-            heart.classList.add('active');
-          } else {
-            heart.classList.remove('active');
-          }
-        } catch (e) {
-          heart.classList.remove('active');
-        }
-      }
+    const idMatch = card && (card.getAttribute('onclick') || '').match(/\d+/);
+    if (idMatch) {
+      hearts.push([parseInt(idMatch[0]), heart]);
     }
   });
   
-  // Actualizar corazón en el modal
   const detailHeart = document.querySelector('#restaurantModal .heart');
-  if (detailHeart) {
-    const content = document.getElementById('restaurantDetailContent');
+  const content = document.getElementById('restaurantDetailContent');
+  if (detailHeart && content) {
     const idMatch = content.innerHTML.match(/toggleFavorite\((\d+)/);
     if (idMatch) {
-      const id = parseInt(idMatch[1]);
-      try {
-        const favorites = JSON.parse(localStorage.getItem('favorites')) || [];
-        if (favorites.includes(id)) {
-          detailHeart.classList.add('active');
-        } else {
-          detailHeart.classList.remove('active');
-        }
-      } catch (e) {
-        detailHeart.classList.remove('active');
-      }
+      hearts.push([parseInt(idMatch[1]), detailHeart]);
     }
   }
+  return hearts;
+}
+
+function isHeartActive(id) {
+  return visibleHearts().some(([heartId, heart]) => heartId === id && heart.classList.contains('active'));
+}
+
+function setHeartState(id, active) {
+  visibleHearts().forEach(([heartId, heart]) => {
+    if (heartId === id) {
+      heart.classList.toggle('active', active);
+    }
+  });
+}
+
+function updateHeartIcons() {
+  // Una sola consulta al servidor para todos los corazones de la página
+  const hearts = visibleHearts();
+  if (hearts.length === 0) {
+    return;
+  }
+  const ids = [...new Set(hearts.map(([id]) => id))];
+  
+  fetch(`/api/favorites/state?ids=${ids.join(',')}`)
+  .then(response => response.json())
+  .then(data => {
+    const favorites = new Set(data.favorites || []);
+    hearts.forEach(([id, heart]) => heart.classList.toggle('active', favorites.has(id)));
+  })
+  .catch(error => console.error('Error:', error));
 }
 
 // ========================
@@ -512,6 +497,32 @@ function openReservationModal(restaurantId, restaurantName) {
     e.preventDefault();
     submitReservation(form);
   });
+  
+  // Mostrar sólo las horas con mesas libres
+  form.date.addEventListener('change', () => loadAvailability(form, restaurantId));
+  form.guests.addEventListener('change', () => loadAvailability(form, restaurantId));
+}
+
+function loadAvailability(form, restaurantId) {
+  const date = form.date.value;
+  const guests = form.guests.value;
+  if (!date || !guests) return;
+  
+  fetch(`/api/v1/restaurants/${restaurantId}/availability?date=${date}&guests=${guests}`)
+    .then(response => response.json())
+    .then(data => {
+      const select = form.time;
+      select.innerHTML = data.slots.length
+        ? '<option value="">Selecciona una hora</option>'
+        : '<option value="">No hay mesas disponibles</option>';
+      data.slots.forEach(slot => {
+        const option = document.createElement('option');
+        option.value = slot.hora;
+        option.textContent = slot.hora;
+        select.appendChild(option);
+      });
+    })
+    .catch(error => console.error('Error al cargar disponibilidad:', error));
 }
 
 function submitReservation(form) {
@@ -549,28 +560,24 @@ function submitReservation(form) {
 // PEDIDOS ONLINE
 // ========================
 function openOrderModal(restaurantId, restaurantName) {
-  const restaurante = restaurantesData.find(r => r.id === restaurantId);
-  if (!restaurante) return;
+  fetchRestaurant(restaurantId)
+    .then(restaurante => renderOrderModal(restaurante, restaurantName))
+    .catch(() => showMessage('No se pudo cargar el menú', 'error'));
+}
+
+function renderOrderModal(restaurante, restaurantName) {
+  const restaurantId = restaurante.id;
 
   // Crear modal de pedido
   const modal = document.createElement('div');
   modal.id = 'orderModal';
   modal.className = 'modal';
   modal.style.display = 'flex';
-  
-  // Agrupar menú por categorías
-  const menuByCategory = {};
-  restaurante.menu.forEach(item => {
-    if (!menuByCategory[item.categoria]) {
-      menuByCategory[item.categoria] = [];
-    }
-    menuByCategory[item.categoria].push(item);
-  });
 
   let menuHtml = '';
-  for (const [categoria, items] of Object.entries(menuByCategory)) {
-    menuHtml += `<h3 style="margin: 1.5rem 0 1rem; color: var(--primary);">${categoria}</h3>`;
-    items.forEach(item => {
+  for (const categoria of restaurante.menu) {
+    menuHtml += `<h3 style="margin: 1.5rem 0 1rem; color: var(--primary);">${categoria.nombre}</h3>`;
+    categoria.items.forEach(item => {
       menuHtml += `
         <div style="display: flex; justify-content: space-between; align-items: center; padding: 0.5rem 0; border-bottom: 1px solid var(--border);">
           <div>
@@ -578,9 +585,9 @@ function openOrderModal(restaurantId, restaurantName) {
             <div style="font-size: 0.9rem; color: #666;">$${item.precio}</div>
           </div>
           <div style="display: flex; align-items: center; gap: 0.5rem;">
-            <button class="btn btn-outline" style="padding: 0.2rem 0.5rem;" onclick="updateQuantity(${item.precio}, -1, ${item.precio})">-</button>
-            <span id="qty-${item.precio}" style="min-width: 20px; text-align: center;">0</span>
-            <button class="btn btn-outline" style="padding: 0.2rem 0.5rem;" onclick="updateQuantity(${item.precio}, 1, ${item.precio})">+</button>
+            <button class="btn btn-outline" style="padding: 0.2rem 0.5rem;" onclick="updateQuantity(${item.id}, -1)">-</button>
+            <span id="qty-${item.id}" data-price="${item.precio}" style="min-width: 20px; text-align: center;">0</span>
+            <button class="btn btn-outline" style="padding: 0.2rem 0.5rem;" onclick="updateQuantity(${item.id}, 1)">+</button>
           </div>
         </div>
       `;
@@ -611,9 +618,21 @@ function openOrderModal(restaurantId, restaurantName) {
   
   document.body.appendChild(modal);
   document.body.style.overflow = 'hidden';
+  
+  // Una clave por pedido: si se reintenta el envío el servidor devuelve el mismo pedido
+  orderIdempotencyKey = newIdempotencyKey();
 }
 
-function updateQuantity(itemId, change, price) {
+let orderIdempotencyKey = null;
+
+function newIdempotencyKey() {
+  if (window.crypto && crypto.randomUUID) {
+    return crypto.randomUUID();
+  }
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+function updateQuantity(itemId, change) {
   const qtyElement = document.getElementById(`qty-${itemId}`);
   if (!qtyElement) return;
   
@@ -629,7 +648,7 @@ function updateOrderTotal() {
   const qtyElements = document.querySelectorAll('[id^="qty-"]');
   
   qtyElements.forEach(element => {
-    const price = parseFloat(element.id.split('-')[1]);
+    const price = parseFloat(element.dataset.price);
     const qty = parseInt(element.textContent) || 0;
     total += price * qty;
   });
@@ -645,11 +664,9 @@ function placeOrder(restaurantId) {
   qtyElements.forEach(element => {
     const qty = parseInt(element.textContent) || 0;
     if (qty > 0) {
-      const price = parseFloat(element.id.split('-')[1]);
       items.push({
-        id: price, // Usamos precio como ID temporal
-        quantity: qty,
-        price: price
+        menu_item_id: parseInt(element.id.split('-')[1]),
+        cantidad: qty
       });
     }
   });
@@ -659,11 +676,66 @@ function placeOrder(restaurantId) {
     return;
   }
   
-  const total = items.reduce((sum, item) => sum + (item.quantity * item.price), 0);
-  
-  // En producción, esto enviaría los datos al servidor
-  showMessage(`Pedido confirmado! Total: $${total.toFixed(2)}`, 'success');
-  closeModal('orderModal');
+  // Los precios y el total los calcula el servidor
+  fetch('/api/orders', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Idempotency-Key': orderIdempotencyKey
+    },
+    body: JSON.stringify({ restaurant_id: restaurantId, items: items })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.success) {
+      showMessage(`Pedido confirmado! Total: $${data.pedido.total.toFixed(2)}`, 'success');
+      closeModal('orderModal');
+      watchOrder(data.pedido.id);
+    } else {
+      showMessage('Error: ' + data.error, 'error');
+    }
+  })
+  .catch(error => {
+    console.error('Error:', error);
+    showMessage('Error al enviar el pedido, inténtalo de nuevo', 'error');
+  });
+}
+
+const ORDER_RETRY_MS = 15000;
+
+const ORDER_STATUS_TEXT = {
+  preparando: 'Tu pedido se está preparando',
+  enviado: 'Tu pedido va en camino',
+  entregado: 'Pedido entregado',
+  cancelado: 'Pedido cancelado',
+  rechazado: 'El restaurante rechazó el pedido'
+};
+
+function watchOrder(orderId, lastEventId = null) {
+  // El servidor avisa cada cambio de estado; si se corta la conexión el
+  // navegador reconecta solo con Last-Event-ID y recibe sólo lo que faltó.
+  // Si el servidor la rechaza (503 con demasiados streams abiertos) el
+  // navegador no reintenta: se vuelve a abrir más tarde desde el último id.
+  if (!window.EventSource) return;
+  const query = lastEventId ? `?last_event_id=${lastEventId}` : '';
+  const source = new EventSource(`/api/orders/${orderId}/events${query}`);
+  let finished = false;
+  source.addEventListener('estado', event => {
+    lastEventId = event.lastEventId || lastEventId;
+    const data = JSON.parse(event.data);
+    if (ORDER_STATUS_TEXT[data.estado]) {
+      showMessage(ORDER_STATUS_TEXT[data.estado], data.estado === 'entregado' ? 'success' : 'info');
+    }
+    if (['entregado', 'cancelado', 'rechazado'].includes(data.estado)) {
+      finished = true;
+      source.close();
+    }
+  });
+  source.addEventListener('error', () => {
+    if (!finished && source.readyState === EventSource.CLOSED) {
+      setTimeout(() => watchOrder(orderId, lastEventId), ORDER_RETRY_MS);
+    }
+  });
 }
 
 // ========================
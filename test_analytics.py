@@ -0,0 +1,56 @@
+# test_analytics.py
+from datetime import date, datetime, timedelta
+
+from analytics import refrescar, resumen
+from metrics import contar_consultas
+from models import db, Pedido, PedidoItem, VentaDiaria
+from synthetic import Generador
+
+HASTA = date(2026, 1, 15)
+
+
+def esperado(desde, hasta):
+    # Lo mismo calculado fila a fila sobre las tablas crudas
+    pedidos = Pedido.query.filter(Pedido.fecha_pedido >= datetime.combine(desde, datetime.min.time()),
+                                  Pedido.fecha_pedido < datetime.combine(hasta + timedelta(days=1),
+                                                                         datetime.min.time())).all()
+    con_venta = [p for p in pedidos if p.estado not in ('cancelado', 'rechazado')]
+    return len(pedidos), round(sum(float(p.total) for p in con_venta), 2), len(pedidos) - len(con_venta)
+
+
+def test_agregados_y_refresco_incremental(app, client):
+    Generador(5, hasta=HASTA).generar(usuarios=30, restaurantes=4, platos=5, reservas=0, pedidos=300)
+    assert refrescar(tamano_bloque=37)['dias'] > 0
+    desde = HASTA - timedelta(days=400)
+
+    with contar_consultas() as sentencias:
+        datos = resumen(desde, HASTA)
+    assert len(sentencias) == 3
+    pedidos, ingresos, sin_venta = esperado(desde, HASTA)
+    assert (datos['pedidos'], datos['ingresos']) == (pedidos, ingresos)
+    assert datos['estados']['cancelado'] + datos['estados']['rechazado'] == sin_venta
+    assert datos['items_vendidos'] == sum(i.cantidad for i in PedidoItem.query.join(Pedido)
+                                          .filter(Pedido.estado.notin_(('cancelado', 'rechazado'))))
+    assert datos['entrega_minutos']['p50'] == 40 and datos['top_items'][0]['cantidad'] > 0
+
+    # Sólo el día del pedido modificado se recalcula
+    pedido = Pedido.query.filter_by(estado='entregado').first()
+    dia = pedido.fecha_pedido.date()
+    pedido.estado = 'cancelado'
+    db.session.commit()
+    intactos = {v.id for v in VentaDiaria.query.filter(VentaDiaria.fecha != dia)}
+    assert refrescar()['dias'] == 1
+    assert {v.id for v in VentaDiaria.query.filter(VentaDiaria.fecha != dia)} == intactos
+    datos = resumen(desde, HASTA)
+    assert datos['estados']['cancelado'] + datos['estados']['rechazado'] == sin_venta + 1
+    assert datos['ingresos'] == esperado(desde, HASTA)[1]
+    assert refrescar()['dias'] == 0
+
+
+def test_api_requiere_token(app, client):
+    assert client.get('/api/admin/analytics/sales').status_code == 404
+    app.config['ADMIN_API_TOKEN'] = 'secreto'
+    assert client.get('/api/admin/analytics/sales').status_code == 401
+    respuesta = client.get('/api/admin/analytics/sales?from=2026-01-01&to=2026-01-15',
+                           headers={'Authorization': 'Bearer secreto'})
+    assert respuesta.status_code == 200 and respuesta.get_json()['pedidos'] == 0
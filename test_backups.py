@@ -0,0 +1,98 @@
+# test_backups.py
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from backups import crear_backup, restaurar_backup, verificar_backup, leer_bloques, Regulador, ErrorBackup
+from favorites import marcar
+from models import db, BackupSistema, Usuario, Restaurante, MenuItem, Promocion
+from promotions import indice_promociones, registrar_uso
+from synthetic import Generador
+
+
+def contenido():
+    return ([(u.id, u.email, u.estado) for u in Usuario.query.order_by(Usuario.id)],
+            [(r.id, r.nombre, float(r.rating or 0)) for r in Restaurante.query.order_by(Restaurante.id)],
+            [(m.id, float(m.precio), m.disponible) for m in MenuItem.query.order_by(MenuItem.id)])
+
+
+def test_completo_incremental_y_restauracion(app, tmp_path):
+    Generador(3, tamano_lote=40).generar(usuarios=20, restaurantes=4, platos=5, reservas=10, pedidos=60)
+    completo = crear_backup(str(tmp_path), tamano_bloque=25, carga=1)
+    assert completo.estado == 'completado' and completo.tipo_backup == 'completo'
+    assert completo.tamaño_bytes > 0 and completo.duracion_segundos is not None
+
+    plato = db.session.get(MenuItem, 3)
+    plato.precio = 1234
+    db.session.add(Restaurante(nombre='Nuevo'))
+    db.session.commit()
+    incremental = crear_backup(str(tmp_path), incremental=True, carga=1)
+    assert incremental.tipo_backup == 'incremental'
+    with open(incremental.ruta_archivo, 'rb') as archivo:
+        filas = {c['tabla']: len(f) for c, f in leer_bloques(archivo) if f}
+    assert filas['menu_items'] == 1 and filas['restaurantes'] == 1 and 'pedidos' not in filas
+    esperado = contenido()
+    rutas = completo.ruta_archivo, incremental.ruta_archivo
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    assert restaurar_backup(rutas[0])['tablas']['pedidos'] == 60
+    restaurar_backup(rutas[1])
+    assert contenido() == esperado
+
+
+def test_contadores_sin_updated_at_se_recalculan(app, tmp_path):
+    Generador(3).generar(usuarios=2, restaurantes=1, platos=1, reservas=0, pedidos=0)
+    usuario_id, restaurante_id = Usuario.query.first().id, Restaurante.query.first().id
+    promocion = Promocion(nombre='Promo', tipo_descuento='porcentaje', valor_descuento=10, limite_usos=5,
+                          fecha_inicio=date.today() - timedelta(days=1), fecha_fin=date.today() + timedelta(days=1))
+    db.session.add(promocion)
+    db.session.commit()
+    promocion_id = promocion.id
+    completo = crear_backup(str(tmp_path), carga=1)
+
+    # Los contadores se mueven sin tocar updated_at: el incremental sólo
+    # trae las filas de favoritos y uso_promociones
+    marcar(usuario_id, restaurante_id, True)
+    indice_promociones.refrescar(forzar=True)
+    compilada = next(p for p in indice_promociones.candidatas(restaurante_id) if p.id == promocion_id)
+    registrar_uso(compilada, usuario_id, None, Decimal('1'))
+    db.session.commit()
+    incremental = crear_backup(str(tmp_path), incremental=True, carga=1)
+    rutas = completo.ruta_archivo, incremental.ruta_archivo
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    for ruta in rutas:
+        restaurar_backup(ruta)
+    assert db.session.get(Restaurante, restaurante_id).numero_favoritos == 1
+    assert db.session.get(Promocion, promocion_id).usos_actuales == 1
+
+
+def test_checksum_invalido_no_toca_la_base(app, tmp_path):
+    Generador(3).generar(usuarios=5, restaurantes=1, platos=2, reservas=0, pedidos=0)
+    registro = crear_backup(str(tmp_path), carga=1)
+    with open(registro.ruta_archivo, 'r+b') as archivo:
+        archivo.seek(registro.tamaño_bytes // 2)
+        byte = archivo.read(1)
+        archivo.seek(registro.tamaño_bytes // 2)
+        archivo.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(ErrorBackup):
+        verificar_backup(registro.ruta_archivo)
+    with pytest.raises(ErrorBackup):
+        restaurar_backup(registro.ruta_archivo)
+    assert Usuario.query.count() == 5
+    assert BackupSistema.query.filter_by(estado='completado').count() == 1
+
+
+def test_regulador():
+    pausas = []
+    regulador = Regulador(carga=0.25, dormir=pausas.append)
+    regulador.pausa(0.1)
+    assert pausas == [pytest.approx(0.3)]
+    Regulador(carga=1, dormir=pausas.append).pausa(0.1)
+    assert len(pausas) == 1
@@ -0,0 +1,81 @@
+# test_banners.py
+from datetime import date, datetime, timedelta
+
+from banners import compilar_regla, indice_banners, ReglaInvalida, cache_perfiles
+from metrics import contar_consultas
+from models import db, BannerPromocional, Usuario
+
+import pytest
+
+
+def banner(titulo, **campos):
+    return BannerPromocional(titulo=titulo, imagen_url=f'images/{titulo}.png', **campos)
+
+
+def perfil(**campos):
+    datos = {'sesion': 'registrado', 'ciudad': None, 'genero': None, 'edad': None, 'nuevo': False}
+    datos.update(campos)
+    return datos
+
+
+def test_reglas_segmentos_y_vigencia(app):
+    hoy = date.today()
+    db.session.add_all([
+        banner('todos', orden_visualizacion=2),
+        banner('jovenes', orden_visualizacion=1, target_audience={'edad': {'min': 18, 'max': 29}}),
+        banner('santiago', target_audience={'ciudad': ['Santiago'], 'sesion': 'registrado'}),
+        banner('manana', fecha_inicio=hoy + timedelta(days=1)),
+        banner('ayer', fecha_fin=hoy - timedelta(days=1)),
+        banner('lateral', posicion='sidebar'),
+        banner('roto', target_audience={'color': 'azul'}),
+    ])
+    db.session.commit()
+    indice_banners.refrescar(forzar=True)
+
+    def titulos(p, posicion='top'):
+        return [b['titulo'] for b in indice_banners.seleccionar(p, 'principal', posicion)]
+
+    assert titulos(perfil(edad=20, ciudad='santiago')) == ['santiago', 'jovenes', 'todos']
+    assert titulos(perfil(edad=40)) == ['todos']
+    assert titulos(perfil(sesion='anonimo')) == ['todos']
+    assert titulos(perfil(), 'sidebar') == ['lateral']
+
+    # Edades dentro del mismo tramo comparten segmento (y resultado en caché)
+    estado = indice_banners._estado
+    assert estado.segmento(perfil(edad=19)) == estado.segmento(perfil(edad=29))
+    assert estado.segmento(perfil(edad=29)) != estado.segmento(perfil(edad=30))
+    with contar_consultas() as sentencias:
+        for edad in range(18, 30):
+            titulos(perfil(edad=edad, ciudad='santiago'))
+    assert sentencias == []
+
+    # Al llegar fecha_inicio de 'manana' se recompila sin que cambie ninguna fila
+    assert indice_banners._valido_hasta == hoy + timedelta(days=1)
+    indice_banners.refrescar(hoy=hoy + timedelta(days=1))
+    assert 'manana' in titulos(perfil())
+
+    with pytest.raises(ReglaInvalida):
+        compilar_regla({'edad': {'min': '18'}})
+
+
+def test_cambios_invalidan_y_plantilla(app, client):
+    cache_perfiles.clear()
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x", ciudad="Valparaíso",
+                      fecha_registro=datetime.utcnow())
+    db.session.add_all([usuario, banner('nuevos', target_audience={'nuevo': True}, link_destino='/registro')])
+    db.session.commit()
+
+    assert client.get('/api/banners').get_json()['banners'] == []
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    assert [b['titulo'] for b in client.get('/api/banners').get_json()['banners']] == ['nuevos']
+    assert b'images/nuevos.png' in client.get('/').data
+
+    # Un cambio de banner se ve en la siguiente lectura de este proceso
+    b = BannerPromocional.query.one()
+    b.target_audience = {'ciudad': 'valparaíso', 'nuevo': False}
+    db.session.commit()
+    assert client.get('/api/banners').get_json()['banners'] == []
+    usuario.fecha_registro = datetime.utcnow() - timedelta(days=90)
+    db.session.commit()
+    assert [b['titulo'] for b in client.get('/api/banners').get_json()['banners']] == ['nuevos']
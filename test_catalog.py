@@ -0,0 +1,98 @@
+# test_catalog.py
+from catalog import cache_catalogo, cache_menus
+from metrics import contar_consultas
+from models import db, Restaurante, CategoriaMenu, MenuItem
+
+
+def crear_restaurante():
+    r = Restaurante(nombre="Milano Italiano", tipo_cocina="italiana", rating=4.8)
+    db.session.add(r)
+    db.session.flush()
+    pizzas = CategoriaMenu(restaurante_id=r.id, nombre="Pizzas", orden=1)
+    db.session.add(pizzas)
+    db.session.flush()
+    db.session.add(MenuItem(restaurante_id=r.id, categoria_id=pizzas.id, nombre="Margherita", precio=12))
+    db.session.commit()
+    return r
+
+
+def test_detalle_con_menu(app, client):
+    cache_catalogo.clear()
+    r = crear_restaurante()
+
+    respuesta = client.get(f'/api/v1/restaurants/{r.id}')
+    assert respuesta.status_code == 200
+    menu = respuesta.get_json()['restaurant']['menu']
+    assert menu[0]['nombre'] == "Pizzas"
+    assert menu[0]['items'][0]['precio'] == 12.0
+
+    assert client.get('/api/v1/restaurants/999').status_code == 404
+
+
+def test_etag_y_304(app, client):
+    cache_catalogo.clear()
+    crear_restaurante()
+
+    primera = client.get('/api/v1/restaurants')
+    etag = primera.headers['ETag']
+    assert not etag.startswith('W/')
+
+    segunda = client.get('/api/v1/restaurants', headers={'If-None-Match': etag})
+    assert segunda.status_code == 304
+    assert segunda.data == b''
+
+
+def test_invalidacion_al_cambiar_item(app, client):
+    cache_catalogo.clear()
+    r = crear_restaurante()
+
+    etag = client.get(f'/api/v1/restaurants/{r.id}').headers['ETag']
+
+    item = MenuItem.query.first()
+    item.precio = 13
+    db.session.commit()
+
+    respuesta = client.get(f'/api/v1/restaurants/{r.id}', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['restaurant']['menu'][0]['items'][0]['precio'] == 13.0
+
+
+def test_snapshot_del_menu_sin_consultas(app, client):
+    cache_catalogo.clear()
+    cache_menus.clear()
+    r = crear_restaurante()
+    pizzas = CategoriaMenu.query.first()
+    db.session.add(MenuItem(restaurante_id=r.id, categoria_id=pizzas.id, nombre="Vegana", precio=11,
+                            vegano=True, vegetariano=True))
+    db.session.add(MenuItem(restaurante_id=r.id, categoria_id=pizzas.id, nombre="Agotada", precio=9,
+                            disponible=False))
+    db.session.commit()
+
+    datos = client.get(f'/api/v1/restaurants/{r.id}/menu').get_json()
+    assert [i['nombre'] for i in datos['menu'][0]['items']] == ["Margherita", "Vegana"]
+    assert datos['dietas'] == {'vegetariano': 1, 'vegano': 1, 'sin_gluten': 0, 'picante': 0}
+    with contar_consultas() as sentencias:
+        assert client.get(f'/api/v1/restaurants/{r.id}/menu').status_code == 200
+    assert sentencias == []
+
+    # Un cambio del restaurante no toca el snapshot; uno de un plato sí
+    r.rating = 4.1
+    db.session.commit()
+    assert r.id in cache_menus._datos
+    item = MenuItem.query.filter_by(nombre="Vegana").one()
+    item.picante = True
+    db.session.commit()
+    assert r.id not in cache_menus._datos
+    assert client.get(f'/api/v1/restaurants/{r.id}/menu').get_json()['dietas']['picante'] == 1
+
+    # Mover un plato a otro restaurante invalida ambos menús
+    otro = Restaurante(nombre="Otro")
+    db.session.add(otro)
+    db.session.commit()
+    for rid in (r.id, otro.id):
+        client.get(f'/api/v1/restaurants/{rid}/menu')
+    item.restaurante_id, item.categoria_id = otro.id, None
+    db.session.commit()
+    assert r.id not in cache_menus._datos and otro.id not in cache_menus._datos
+    assert client.get(f'/api/v1/restaurants/{otro.id}/menu').get_json()['menu'][0]['nombre'] == 'Otros'
+    assert client.get('/api/v1/restaurants/999/menu').status_code == 404
@@ -0,0 +1,117 @@
+# test_catalog_io.py
+import io
+import json
+
+from catalog_io import importar, leer_csv, leer_ndjson, documentos_catalogo, escribir_csv, escribir_ndjson
+from models import db, Restaurante, HorarioRestaurante, CategoriaMenu, MenuItem
+
+
+def ndjson(*documentos):
+    return io.StringIO(''.join(json.dumps(d) + '\n' for d in documentos))
+
+
+def restaurante(slug, **extra):
+    return dict({
+        'slug': slug, 'nombre': slug.title(), 'ciudad': 'Santiago', 'latitud': -33.45, 'longitud': -70.66,
+        'delivery': True,
+        'horarios': [{'dia_semana': 'lunes', 'hora_apertura': '12:00', 'hora_cierre': '23:00'}],
+        'categorias': [{'nombre': 'Fondos', 'orden': 1}],
+        'platos': [{'nombre': 'Lomo', 'precio': '9990', 'categoria': 'Fondos'},
+                   {'nombre': 'Postre', 'precio': 2500, 'categoria': 'Dulces', 'vegano': 'si'}],
+    }, **extra)
+
+
+def test_importa_y_actualiza_por_slug(app):
+    informe = importar(leer_ndjson(ndjson(restaurante('la-esquina'), restaurante('el-rincon'))))
+    assert (informe.creados, informe.actualizados, informe.errores) == (2, 0, [])
+    esquina = Restaurante.query.filter_by(slug='la-esquina').one()
+    assert CategoriaMenu.query.filter_by(restaurante_id=esquina.id).count() == 2
+    postre = MenuItem.query.filter_by(restaurante_id=esquina.id, nombre='Postre').one()
+    assert postre.vegano and postre.categoria_menu.nombre == 'Dulces' and postre.disponible
+
+    # Reimportar actualiza en su lugar; el plato que ya no viene queda no disponible
+    lomo_id = MenuItem.query.filter_by(nombre='Lomo', restaurante_id=esquina.id).one().id
+    cambio = restaurante('la-esquina', nombre='La Esquina 2',
+                         platos=[{'nombre': 'Lomo', 'precio': 11990, 'categoria': 'Fondos'}])
+    del cambio['horarios']
+    informe = importar(leer_ndjson(ndjson(cambio)))
+    assert (informe.creados, informe.actualizados) == (0, 1)
+    db.session.expire_all()
+    assert Restaurante.query.count() == 2 and esquina.nombre == 'La Esquina 2'
+    lomo = db.session.get(MenuItem, lomo_id)
+    assert float(lomo.precio) == 11990
+    assert not MenuItem.query.filter_by(restaurante_id=esquina.id, nombre='Postre').one().disponible
+    assert HorarioRestaurante.query.filter_by(restaurante_id=esquina.id).count() == 1
+
+
+def test_errores_por_fila_no_detienen_el_lote(app):
+    entrada = io.StringIO(
+        json.dumps(restaurante('bueno')) + '\n'
+        + '{roto\n'
+        + json.dumps(restaurante('Slug Malo')) + '\n'
+        + json.dumps(restaurante('sin-precio', platos=[{'nombre': 'X'}])) + '\n'
+        + json.dumps(restaurante('otro-bueno', estado='cerrado')) + '\n'
+        + json.dumps(restaurante('ultimo')) + '\n')
+    informe = importar(leer_ndjson(entrada), tamano_lote=2)
+    assert informe.creados == 2
+    assert [e['linea'] for e in informe.errores] == [2, 3, 4, 5]
+    assert 'estado' in informe.errores[-1]['error']
+
+    # Un error de la base (aquí forzado con un trigger) sólo descarta su documento
+    db.session.execute(db.text('CREATE TRIGGER choca BEFORE INSERT ON restaurantes '
+                               "WHEN NEW.slug = 'choca' BEGIN SELECT RAISE(ABORT, 'rechazado'); END"))
+    informe = importar(leer_ndjson(ndjson(restaurante('antes'), restaurante('choca'), restaurante('despues'))))
+    assert informe.creados == 2 and [e['slug'] for e in informe.errores] == ['choca']
+    assert Restaurante.query.filter_by(slug='choca').count() == 0
+
+
+def test_exportar_e_importar_csv_ida_y_vuelta(app):
+    importar(leer_ndjson(ndjson(*[restaurante(f'local-{n}') for n in range(7)])))
+    exportados = list(documentos_catalogo(tamano_lote=3))
+    assert len(exportados) == 7 and exportados[0]['platos'][1]['vegano'] is True
+
+    salida = io.StringIO()
+    escribir_csv(exportados, salida)
+    informe = importar(leer_csv(io.StringIO(salida.getvalue())))
+    assert (informe.creados, informe.actualizados, informe.errores) == (0, 7, [])
+    assert list(documentos_catalogo()) == exportados
+
+    lineas = io.StringIO()
+    escribir_ndjson(exportados, lineas)
+    assert len(lineas.getvalue().splitlines()) == 7
+
+
+def test_datos_mal_formados_y_celdas_vacias(app):
+    platos_malos = [{'nombre': 'X', 'precio': 1, 'orden': []}]
+    entrada = ndjson(restaurante('horarios-raros', horarios=5), restaurante('plato-suelto', platos=[5]),
+                     restaurante('orden-lista', platos=platos_malos), dict(restaurante('x'), slug=7),
+                     restaurante('orden-infinito', platos=[{'nombre': 'X', 'precio': 1, 'orden': 1e400}]),
+                     restaurante('valido'))
+    informe = importar(leer_ndjson(entrada))
+    assert informe.creados == 1
+    assert [e['linea'] for e in informe.errores] == [1, 2, 3, 4, 5]
+    assert 'horarios' in informe.errores[0]['error'] and 'orden' in informe.errores[2]['error']
+
+    # En CSV una celda vacía no pisa lo que ya hay
+    valido = Restaurante.query.filter_by(slug='valido').one()
+    valido.estado, valido.telefono = 'activo', '+56 2 1234'
+    db.session.commit()
+    csv_entrada = io.StringIO('registro,slug,nombre,estado,telefono,ciudad\n'
+                              'restaurante,valido,Válido,,,Valparaíso\n')
+    informe = importar(leer_csv(csv_entrada))
+    assert (informe.actualizados, informe.errores) == (1, [])
+    db.session.expire_all()
+    assert (valido.estado, valido.telefono, valido.ciudad) == ('activo', '+56 2 1234', 'Valparaíso')
+
+
+def test_valores_no_finitos_son_errores_de_su_fila(app):
+    entrada = ndjson(restaurante('precio-nan', platos=[{'nombre': 'X', 'precio': float('nan')}]),
+                     restaurante('latitud-inf', latitud=float('inf')),
+                     restaurante('sigue'))
+    informe = importar(leer_ndjson(entrada))
+    assert informe.creados == 1 and [e['linea'] for e in informe.errores] == [1, 2]
+    assert 'precio' in informe.errores[0]['error'] and 'latitud' in informe.errores[1]['error']
+
+    csv_entrada = io.StringIO('registro,slug,nombre,longitud\nrestaurante,otro,Otro,nan\n')
+    informe = importar(leer_csv(csv_entrada))
+    assert informe.creados == 0 and 'longitud' in informe.errores[0]['error']
@@ -0,0 +1,65 @@
+# test_db_logging.py
+import logging
+from datetime import date
+
+from db_logging import ManejadorLogBD
+from models import LogSistema
+
+
+def crear_logger(manejador):
+    logger = logging.getLogger('pruebas.log_bd')
+    logger.handlers[:] = [manejador]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_escritura_por_lotes_y_vaciado_al_cerrar(app):
+    manejador = ManejadorLogBD(app, tamano_lote=3, intervalo=60)
+    logger = crear_logger(manejador)
+
+    for i in range(7):
+        logger.info('mensaje %d', i, extra={'componente': 'api', 'datos': {'i': i}})
+    logger.debug('filtrado por nivel')
+    manejador.close()
+
+    filas = LogSistema.query.order_by(LogSistema.id).all()
+    assert [f.mensaje for f in filas] == [f'mensaje {i}' for i in range(7)]
+    assert filas[0].componente == 'api'
+    assert filas[0].nivel == 'info'
+    assert filas[6].datos_contexto == {'i': 6}
+    assert manejador.escritos == 7
+
+
+def test_cola_llena_descarta(app):
+    manejador = ManejadorLogBD(app, tamano_cola=2, intervalo=60)
+    # Se detiene el hilo para que la cola no se vacíe durante la prueba
+    manejador.close()
+    for i in range(5):
+        manejador._encolar({'mensaje': str(i)})
+    assert manejador.descartados == 3
+
+    antiguo = ManejadorLogBD(app, tamano_cola=2, intervalo=60, politica='descartar_antiguo')
+    antiguo.close()
+    for i in range(5):
+        antiguo._encolar({'mensaje': str(i)})
+    assert [antiguo.cola.get_nowait()['mensaje'] for _ in range(2)] == ['3', '4']
+
+
+def test_datos_no_serializables_no_tumban_el_lote(app):
+    manejador = ManejadorLogBD(app, tamano_lote=10, intervalo=60)
+    manejador.handleError = lambda record: None
+    logger = crear_logger(manejador)
+    ciclo = {}
+    ciclo['yo'] = ciclo
+
+    logger.info('antes', extra={'datos': {'fecha': date(2024, 5, 1), 'ids': {3}}})
+    logger.info('ciclo', extra={'datos': ciclo})
+    logger.info('despues', extra={'datos': {'n': float('nan')}})
+    logger.info('ultimo')
+    manejador.close()
+
+    filas = LogSistema.query.order_by(LogSistema.id).all()
+    assert [f.mensaje for f in filas] == ['antes', 'ultimo']
+    assert filas[0].datos_contexto == {'fecha': '2024-05-01', 'ids': '{3}'}
+    assert (manejador.escritos, manejador.fallidos) == (2, 0)
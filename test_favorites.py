@@ -0,0 +1,70 @@
+# test_favorites.py
+from favorites import cache_favoritos, reconciliar
+from metrics import contar_consultas
+from models import db, Favorito, Restaurante, Usuario
+
+
+def preparar(client):
+    cache_favoritos.clear()
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurantes = [Restaurante(nombre=f"R{i}") for i in range(3)]
+    db.session.add_all([usuario, *restaurantes])
+    db.session.commit()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    return usuario, restaurantes
+
+
+def test_marcar_es_idempotente_y_mueve_el_contador(app, client):
+    usuario, (r, _, _) = preparar(client)
+
+    for _ in range(2):
+        datos = client.put(f'/api/favorites/{r.id}').get_json()
+        assert datos['favorite'] is True and datos['count'] == 1
+    assert Favorito.query.count() == 1
+
+    datos = client.post(f'/toggle_favorite/{r.id}').get_json()
+    assert datos['action'] == 'removed' and datos['count'] == 0
+    datos = client.post(f'/toggle_favorite/{r.id}', json={'favorite': False}).get_json()
+    assert datos['favorite'] is False and datos['count'] == 0
+
+    assert client.post('/toggle_favorite/999').status_code == 404
+    with client.session_transaction() as sesion:
+        sesion.clear()
+    assert client.post(f'/toggle_favorite/{r.id}').status_code == 401
+
+    # Un contador desviado se corrige
+    db.session.add(Favorito(usuario_id=usuario.id, restaurante_id=r.id))
+    db.session.commit()
+    assert db.session.get(Restaurante, r.id).numero_favoritos == 1
+    db.session.execute(db.update(Restaurante).values(numero_favoritos=7))
+    db.session.commit()
+    assert reconciliar() == 3
+    db.session.expire_all()
+    assert [x.numero_favoritos for x in Restaurante.query.order_by(Restaurante.id)] == [1, 0, 0]
+
+
+def test_estado_en_lote_desde_cache(app, client):
+    usuario, restaurantes = preparar(client)
+    ids = ','.join(str(r.id) for r in restaurantes)
+    client.put(f'/api/favorites/{restaurantes[1].id}')
+
+    assert client.get(f'/api/favorites/state?ids={ids}').get_json()['favorites'] == [restaurantes[1].id]
+    with contar_consultas() as sentencias:
+        client.get(f'/api/favorites/state?ids={ids}')
+    assert sentencias == []
+
+    # Al cambiar, la caché del usuario se invalida tras el commit
+    client.delete(f'/api/favorites/{restaurantes[1].id}')
+    assert usuario.id not in cache_favoritos._datos
+    assert client.get(f'/api/favorites/state?ids={ids}').get_json()['favorites'] == []
+    assert client.get('/api/favorites/state?ids=a').status_code == 400
+
+    # Otro worker lo marcó (aquí sin pasar por la invalidación de este
+    # proceso): el toggle sin cuerpo decide con la base, no con la caché vieja
+    client.get(f'/api/favorites/state?ids={ids}')
+    db.session.execute(db.insert(Favorito).values(usuario_id=usuario.id, restaurante_id=restaurantes[0].id))
+    db.session.commit()
+    assert client.get(f'/api/favorites/state?ids={ids}').get_json()['favorites'] == []
+    assert client.post(f'/toggle_favorite/{restaurantes[0].id}').get_json()['action'] == 'removed'
+    assert Favorito.query.count() == 0
@@ -0,0 +1,56 @@
+# test_geo.py
+import numpy as np
+
+from geo import haversine, indice_geo
+from models import db, Restaurante
+
+
+def crear_restaurantes():
+    # Santiago centro, Providencia (~4 km) y Valparaíso (~100 km)
+    centro = Restaurante(nombre="Centro", latitud=-33.4372, longitud=-70.6506, delivery=True)
+    providencia = Restaurante(nombre="Providencia", latitud=-33.4263, longitud=-70.6100, pickup=True)
+    valparaiso = Restaurante(nombre="Valparaíso", latitud=-33.0472, longitud=-71.6127, delivery=True)
+    sin_ubicacion = Restaurante(nombre="Sin ubicación")
+    db.session.add_all([centro, providencia, valparaiso, sin_ubicacion])
+    db.session.commit()
+    indice_geo.reiniciar()
+    return centro, providencia, valparaiso
+
+
+def test_haversine_vectorizado():
+    distancias = haversine(-33.4372, -70.6506, np.array([-33.4372, -33.0472]), np.array([-70.6506, -71.6127]))
+    assert distancias[0] == 0
+    assert 95 < distancias[1] < 105
+
+
+def test_mas_cercanos_y_radio(app, client):
+    centro, providencia, valparaiso = crear_restaurantes()
+
+    data = client.get('/api/v1/restaurants/nearby?lat=-33.44&lng=-70.65&k=2').get_json()
+    assert [r['id'] for r in data['results']] == [centro.id, providencia.id]
+
+    data = client.get('/api/v1/restaurants/nearby?lat=-33.44&lng=-70.65&k=10').get_json()
+    assert [r['id'] for r in data['results']] == [centro.id, providencia.id, valparaiso.id]
+
+    data = client.get('/api/v1/restaurants/nearby?lat=-33.44&lng=-70.65&radius_km=10').get_json()
+    assert len(data['results']) == 2
+
+    data = client.get('/api/v1/restaurants/nearby?lat=-33.44&lng=-70.65&k=1&pickup=1').get_json()
+    assert [r['id'] for r in data['results']] == [providencia.id]
+
+    assert client.get('/api/v1/restaurants/nearby?lat=abc&lng=1').status_code == 400
+    for radio in ('inf', 'nan', '-1', '0'):
+        assert client.get(f'/api/v1/restaurants/nearby?lat=-33.4&lng=-70.6&radius_km={radio}').status_code == 400
+
+
+def test_cobertura_entrega(app, client):
+    centro, providencia, valparaiso = crear_restaurantes()
+    app.config['DELIVERY_RADIUS_KM'] = 5
+
+    cerca = client.get(f'/api/v1/restaurants/{centro.id}/delivery-coverage?lat=-33.44&lng=-70.65')
+    assert cerca.get_json()['covered'] is True
+    lejos = client.get(f'/api/v1/restaurants/{valparaiso.id}/delivery-coverage?lat=-33.44&lng=-70.65')
+    assert lejos.get_json()['covered'] is False
+    # Providencia no hace delivery
+    sin_delivery = client.get(f'/api/v1/restaurants/{providencia.id}/delivery-coverage?lat=-33.43&lng=-70.61')
+    assert sin_delivery.get_json()['covered'] is False
@@ -0,0 +1,51 @@
+# test_images.py
+import os
+import shutil
+
+from flask import url_for
+
+from images import generar_variantes, imagen, UN_AÑO
+
+ORIGEN = os.path.join(os.path.dirname(__file__), 'static', 'images', 'italiano.png')
+
+
+def estaticos(app, tmp_path):
+    os.makedirs(tmp_path / 'images')
+    shutil.copy(ORIGEN, tmp_path / 'images' / 'italiano.png')
+    app.static_folder = str(tmp_path)
+    return str(tmp_path)
+
+
+def test_variantes_con_huella_y_cache_en_disco(app, tmp_path):
+    static = estaticos(app, tmp_path)
+    primera = generar_variantes(static, procesos=1)
+    assert primera['imagenes'] == 1 and primera['generadas'] > 0
+    # Lo ya generado se reutiliza
+    assert generar_variantes(static, procesos=1)['generadas'] == 0
+
+    with app.test_request_context():
+        html = imagen('images/italiano.png', 'Milano', tamano='miniatura')
+        assert '<picture>' in html and 'type="image/webp"' not in html
+        assert '160w' in html and 'width="160"' in html and 'alt="Milano"' in html
+        # Sin variantes: un <img> común
+        assert imagen('images/no-existe.jpg', 'x').startswith('<img src="/static/images/no-existe.jpg"')
+
+
+def test_cabeceras_immutable(app, client, tmp_path):
+    static = estaticos(app, tmp_path)
+    generar_variantes(static, procesos=1)
+    with app.test_request_context():
+        html = str(imagen('images/italiano.png'))
+    variante = html.split('src="')[1].split('"')[0]
+    respuesta = client.get(variante)
+    assert respuesta.status_code == 200
+    assert respuesta.cache_control.immutable and respuesta.cache_control.max_age == UN_AÑO
+
+    # Los originales llevan ?v=<huella> y también son immutable; sin ?v no
+    with app.test_request_context():
+        url = url_for('static', filename='images/italiano.png')
+    assert '?v=' in url
+    assert client.get(url).cache_control.immutable
+    assert not client.get('/static/images/italiano.png').cache_control.immutable
+    # Un ?v= que ya no corresponde al archivo (anterior a un deploy) tampoco
+    assert not client.get('/static/images/italiano.png?v=0123456789').cache_control.immutable
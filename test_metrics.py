@@ -0,0 +1,52 @@
+# test_metrics.py
+from datetime import datetime, timedelta
+
+from metrics import Agregador, agregador, filas_metricas, volcar
+from models import db, Restaurante, MetricaSistema
+
+
+def test_histograma_y_percentiles():
+    ag = Agregador()
+    for ms in [3] * 90 + [40] * 9 + [700]:
+        ag.registrar('index', ms, 200)
+    e = ag.totales()['index']
+    assert e.peticiones == 100
+    assert e.percentil(0.5) == 5
+    assert e.percentil(0.95) == 50
+    assert e.percentil(0.99) == 50
+    assert e.percentil(1.0) == 700
+
+
+def test_consultas_por_ruta_y_endpoint(app, client):
+    db.session.add(Restaurante(nombre="Milano"))
+    db.session.commit()
+
+    client.get('/api/v1/restaurants')
+    client.get('/no-existe')
+    assert client.get('/metrics').status_code == 404
+    app.config['ADMIN_API_TOKEN'] = 'secreto'
+    assert client.get('/metrics').status_code == 401
+    texto = client.get('/metrics', headers={'Authorization': 'Bearer secreto'}).get_data(as_text=True)
+
+    assert 'http_requests_total{endpoint="catalog.lista_restaurantes",status="200"}' in texto
+    assert 'http_requests_total{endpoint="sin_ruta",status="404"}' in texto
+    consultas = [l for l in texto.splitlines() if l.startswith('db_queries_total{endpoint="catalog.lista_restaurantes"}')]
+    assert consultas and int(consultas[0].split()[-1]) >= 1
+
+
+def test_volcado_de_periodos_cerrados(app):
+    agregador.extraer_cerrados(todos=True)
+    hace_dos_horas = datetime.utcnow() - timedelta(hours=2)
+    agregador.registrar('login', 12.0, 200, consultas=2, momento=hace_dos_horas)
+    agregador.registrar('login', 30.0, 500, consultas=4, momento=hace_dos_horas)
+    agregador.registrar('login', 8.0, 200)
+
+    volcar(app)
+    horas = MetricaSistema.query.filter_by(periodo_agregacion='hora').all()
+    por_nombre = {m.metrica_nombre: float(m.valor_numerico) for m in horas}
+    assert por_nombre['login.peticiones'] == 2
+    assert por_nombre['login.errores_5xx'] == 1
+    assert por_nombre['login.consultas_bd_media'] == 3
+
+    # La hora en curso sigue en memoria hasta que termine
+    assert len(filas_metricas(agregador.extraer_cerrados(todos=True))) > 0
@@ -0,0 +1,79 @@
+# test_notifications.py
+import threading
+
+from models import db, Usuario, Notificacion, DifusionNotificacion, ConfiguracionSistema
+from notifications import cache_no_leidas, difundir, no_leidas, marcar_leida
+
+
+def crear_usuarios(n, estado='activo'):
+    inicio = Usuario.query.count()
+    usuarios = [Usuario(nombre=f"U{i}", apellido="Test", email=f"u{i}@test.com",
+                        password_hash="x", estado=estado) for i in range(inicio, inicio + n)]
+    db.session.add_all(usuarios)
+    db.session.commit()
+    return usuarios
+
+
+def test_difusion_por_lotes_y_reanudable(app):
+    activos = crear_usuarios(5)
+    crear_usuarios(2, estado='suspendido')
+
+    assert difundir('bienvenida', 'Hola', 'Mensaje', tamano_lote=2) == 5
+    assert Notificacion.query.count() == 5
+    assert {n.usuario_id for n in Notificacion.query} == {u.id for u in activos}
+
+    # Misma clave: sólo se notifica a los usuarios nuevos
+    nuevo = crear_usuarios(1)[0]
+    assert difundir('bienvenida', 'Hola', 'Mensaje', tamano_lote=2) == 1
+    assert Notificacion.query.filter_by(usuario_id=nuevo.id).count() == 1
+    assert Notificacion.query.count() == 6
+
+    # El avance queda en su propia tabla, no en los ajustes del sistema
+    registro = DifusionNotificacion.query.filter_by(clave='bienvenida').one()
+    assert (registro.ultimo_usuario_id, registro.enviadas) == (nuevo.id, 6)
+    assert ConfiguracionSistema.query.count() == 0
+
+
+def test_contador_sin_recontar(app):
+    cache_no_leidas.clear()
+    usuario = crear_usuarios(1)[0]
+    assert no_leidas(usuario.id) == 0
+
+    nueva = Notificacion(usuario_id=usuario.id, tipo='pedido_enviado', titulo='Pedido', mensaje='En camino')
+    db.session.add(nueva)
+    db.session.commit()
+    difundir('promo', 'Promo', '2x1')
+    assert cache_no_leidas.get(usuario.id) == 2
+
+    assert marcar_leida(usuario.id, nueva.id)
+    assert not marcar_leida(usuario.id, nueva.id)
+    assert cache_no_leidas.get(usuario.id) == 1
+
+
+def test_rutas(app, client):
+    cache_no_leidas.clear()
+    usuario = crear_usuarios(1)[0]
+    difundir('aviso', 'Aviso', 'Texto')
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+
+    assert client.get('/api/notifications/unread-count').get_json() == {'unread': 1}
+    assert client.post('/api/notifications/read-all').get_json() == {'unread': 0}
+    assert Notificacion.query.filter_by(leida=False).count() == 0
+
+
+def test_difusion_desde_la_api(app, client):
+    crear_usuarios(3)
+    app.config['ADMIN_API_TOKEN'] = 'secreto'
+    cabeceras = {'Authorization': 'Bearer secreto'}
+    datos = {'clave': 'promo-verano', 'titulo': 'Verano', 'mensaje': '2x1'}
+
+    assert client.post('/api/admin/notifications/broadcast', json=datos).status_code == 401
+    assert client.post('/api/admin/notifications/broadcast', json=dict(datos, titulo=5),
+                       headers=cabeceras).status_code == 400
+    respuesta = client.post('/api/admin/notifications/broadcast', json=datos, headers=cabeceras)
+    assert respuesta.status_code == 202
+    for hilo in threading.enumerate():
+        if hilo.name == 'difusion-promo-verano':
+            hilo.join(5)
+    assert Notificacion.query.filter_by(tipo='promocion', titulo='Verano').count() == 3
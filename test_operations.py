@@ -1,5 +1,5 @@
 # test_operations.py
-from app import app
+from wsgi import app
 from models import db, Usuario, Restaurante
 
 def test_basic_operations():
@@ -0,0 +1,92 @@
+# test_orders.py
+from models import db, Usuario, Restaurante, MenuItem, Pedido, PedidoItem
+from settings import guardar
+
+
+def preparar(client):
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurante = Restaurante(nombre="Milano")
+    otro = Restaurante(nombre="Sakura")
+    db.session.add_all([usuario, restaurante, otro])
+    db.session.flush()
+    pizza = MenuItem(restaurante_id=restaurante.id, nombre="Pizza", precio=10)
+    pasta = MenuItem(restaurante_id=restaurante.id, nombre="Pasta", precio=14, precio_descuento=12)
+    agotado = MenuItem(restaurante_id=restaurante.id, nombre="Tiramisú", precio=8, disponible=False)
+    sushi = MenuItem(restaurante_id=otro.id, nombre="Sushi", precio=18)
+    db.session.add_all([pizza, pasta, agotado, sushi])
+    db.session.commit()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    return restaurante, pizza, pasta, agotado, sushi
+
+
+def test_totales_calculados_en_servidor(app, client):
+    restaurante, pizza, pasta, agotado, sushi = preparar(client)
+    app.config['PEDIDOS_TASA_IMPUESTO'] = '0.10'
+
+    respuesta = client.post('/api/orders', json={
+        'restaurant_id': restaurante.id,
+        'items': [{'menu_item_id': pizza.id, 'cantidad': 2}, {'menu_item_id': pasta.id, 'cantidad': 1}],
+    })
+    assert respuesta.status_code == 201
+    pedido = respuesta.get_json()['pedido']
+    assert pedido['subtotal'] == 32.0
+    assert pedido['impuestos'] == 3.2
+    assert pedido['total'] == 35.2
+    assert PedidoItem.query.count() == 2
+
+    # Un ajuste mal escrito no tumba los pedidos: se usa app.config
+    registro = guardar('pedidos.tasa_impuesto', '0,19', tipo='texto')
+    respuesta = client.post('/api/orders', json={'restaurant_id': restaurante.id,
+                                                 'items': [{'menu_item_id': pizza.id}]})
+    assert respuesta.status_code == 201 and respuesta.get_json()['pedido']['impuestos'] == 1.0
+    db.session.delete(registro)
+    db.session.commit()
+
+
+def test_productos_no_disponibles_o_ajenos(app, client):
+    restaurante, pizza, pasta, agotado, sushi = preparar(client)
+
+    for item in (agotado, sushi):
+        respuesta = client.post('/api/orders', json={
+            'restaurant_id': restaurante.id,
+            'items': [{'menu_item_id': pizza.id}, {'menu_item_id': item.id}],
+        })
+        assert respuesta.status_code == 400
+    assert Pedido.query.count() == 0
+    assert PedidoItem.query.count() == 0
+
+    # Tipos que no corresponden son un 400, no un error del servidor
+    for datos in ({'restaurant_id': True}, {'codigo_promo': 123}, {'metodo_pago': ['efectivo']},
+                  {'items': 5}, {'items': [{'menu_item_id': pizza.id, 'notas': {'sin': 'queso'}}]}):
+        cuerpo = dict({'restaurant_id': restaurante.id, 'items': [{'menu_item_id': pizza.id}]}, **datos)
+        assert client.post('/api/orders', json=cuerpo).status_code == 400
+    assert client.post('/api/promotions/evaluate', json={'restaurant_id': restaurante.id, 'subtotal': 10,
+                                                         'codigo': 123}).status_code == 400
+    assert Pedido.query.count() == 0
+
+
+def test_reintento_con_misma_clave(app, client):
+    restaurante, pizza, pasta, agotado, sushi = preparar(client)
+    cuerpo = {'restaurant_id': restaurante.id, 'items': [{'menu_item_id': pizza.id}]}
+    cabeceras = {'Idempotency-Key': 'abc-123'}
+
+    primera = client.post('/api/orders', json=cuerpo, headers=cabeceras)
+    segunda = client.post('/api/orders', json=cuerpo, headers=cabeceras)
+    assert primera.status_code == 201
+    assert segunda.status_code == 200
+    assert primera.get_json()['pedido']['id'] == segunda.get_json()['pedido']['id']
+    assert Pedido.query.count() == 1
+
+    otra = client.post('/api/orders', json=cuerpo, headers={'Idempotency-Key': 'xyz'})
+    assert otra.status_code == 201
+    assert Pedido.query.count() == 2
+
+    # Otra restricción de la base no es una carrera de reintentos: 409, no 500
+    db.session.execute(db.text('CREATE TRIGGER choca BEFORE INSERT ON pedido_items '
+                               "BEGIN SELECT RAISE(ABORT, 'rechazado'); END"))
+    db.session.commit()
+    respuesta = client.post('/api/orders', json=cuerpo, headers={'Idempotency-Key': 'nueva'})
+    assert respuesta.status_code == 409
+    assert client.post('/api/orders', json=cuerpo).status_code == 409
+    assert Pedido.query.count() == 2
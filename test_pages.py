@@ -0,0 +1,73 @@
+# test_pages.py
+import gzip
+
+from metrics import contar_consultas
+from models import db, ContenidoEstatico
+from pages import cache_paginas, publicar
+
+
+def crear(slug='faq', **campos):
+    datos = dict(slug=slug, titulo="Preguntas frecuentes", contenido="<p>¿Cómo pido?</p>", tipo_contenido='faq',
+                 meta_titulo="Ayuda", meta_descripcion="Respuestas sobre pedidos y reservas")
+    datos.update(campos)
+    pagina = ContenidoEstatico(**datos)
+    db.session.add(pagina)
+    db.session.commit()
+    return pagina
+
+
+def test_publicada_desde_memoria_comprimida(app, client):
+    cache_paginas.clear()
+    app.config['PAGINAS_REFRESH_SECONDS'] = 3600
+    pagina = publicar(crear())
+    assert '<meta name="description" content="Respuestas sobre pedidos y reservas">' in pagina.html_publicado
+    assert '<title>Ayuda | Sabores Unidos</title>' in pagina.html_publicado
+    html = pagina.html_publicado.encode('utf-8')
+
+    primera = client.get('/paginas/faq', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert primera.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in primera.headers['Vary']
+    assert gzip.decompress(primera.data) == html
+    etag = primera.headers['ETag']
+    assert etag.endswith('-gzip"') and primera.last_modified is not None
+
+    with contar_consultas() as sentencias:
+        sin_cambios = client.get('/paginas/faq', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        desde = client.get('/paginas/faq', headers={'If-Modified-Since': primera.headers['Last-Modified']})
+        normal = client.get('/paginas/faq')
+    assert sentencias == []
+    assert sin_cambios.status_code == 304 and sin_cambios.data == b''
+    assert desde.status_code == 304
+    assert normal.data == html and 'Content-Encoding' not in normal.headers
+
+
+def test_borradores_y_republicar(app, client):
+    cache_paginas.clear()
+    app.config['PAGINAS_REFRESH_SECONDS'] = 3600
+    pagina = crear('terminos', tipo_contenido='terminos', contenido="<p>Versión 1</p>")
+    assert client.get('/paginas/terminos').status_code == 404
+    with contar_consultas() as sentencias:
+        assert client.get('/paginas/terminos').status_code == 404
+    assert sentencias == []
+
+    publicar(pagina)
+    etag = client.get('/paginas/terminos').headers['ETag']
+    # Editar sin publicar no cambia lo que se sirve
+    pagina.contenido = "<p>Versión 2</p>"
+    db.session.commit()
+    assert b'Versi\xc3\xb3n 1' in client.get('/paginas/terminos').data
+
+    publicar(pagina)
+    respuesta = client.get('/paginas/terminos', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200 and b'Versi\xc3\xb3n 2' in respuesta.data
+
+
+def test_publicar_todas_sin_cambios_no_escribe(app):
+    pagina = crear('ayuda', tipo_contenido='pagina', contenido="<p>Ayuda</p>")
+    publicar(pagina)
+    fecha = pagina.fecha_actualizacion
+
+    salida = app.test_cli_runner().invoke(args=['paginas', 'publicar', '--todas']).output
+    assert 'ayuda: sin cambios' in salida
+    db.session.expire_all()
+    assert pagina.fecha_actualizacion == fecha
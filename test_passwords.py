@@ -0,0 +1,63 @@
+# test_passwords.py
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from models import db, Usuario
+from passwords import hasheador, autenticar, HashSaturado, METODO_POR_DEFECTO
+
+
+@pytest.fixture
+def hash_barato():
+    hasheador.configurar(hilos=2, pendientes=4, metodo='pbkdf2:sha256:2000', espera=1.0)
+    yield hasheador
+    hasheador.configurar(hilos=2, pendientes=16, metodo=METODO_POR_DEFECTO, espera=5.0)
+
+
+def crear_usuario(password_hash):
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash=password_hash)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def test_rehash_al_iniciar_sesion(app, hash_barato):
+    usuario = crear_usuario(generate_password_hash('secreta', method='pbkdf2:sha256:1000'))
+    viejo = usuario.password_hash
+
+    assert autenticar('ana@test.com', 'otra') is None
+    assert usuario.password_hash == viejo
+
+    assert autenticar('ana@test.com', 'secreta') is usuario
+    assert usuario.password_hash.startswith('pbkdf2:sha256:2000$')
+    assert autenticar('ana@test.com', 'secreta') is usuario
+
+
+def test_email_desconocido_paga_un_hash(app, hash_barato, monkeypatch):
+    llamadas = []
+    original = hash_barato.verificar
+    monkeypatch.setattr(hash_barato, 'verificar', lambda h, p: llamadas.append(h) or original(h, p))
+
+    assert autenticar('nadie@test.com', 'secreta') is None
+    assert len(llamadas) == 1 and llamadas[0].startswith('pbkdf2:sha256:2000$')
+
+
+def test_hashes_simultaneos_acotados(hash_barato):
+    hash_barato.configurar(hilos=1, pendientes=0, metodo='pbkdf2:sha256:2000', espera=0.05)
+    ocupado, liberar = threading.Event(), threading.Event()
+
+    def ocupar():
+        ocupado.set()
+        liberar.wait()
+
+    hilo = threading.Thread(target=hash_barato._ejecutar, args=(ocupar,))
+    hilo.start()
+    ocupado.wait()
+    try:
+        with pytest.raises(HashSaturado):
+            hash_barato.generar('secreta')
+    finally:
+        liberar.set()
+        hilo.join()
+    assert hash_barato.verificar(hash_barato.generar('secreta'), 'secreta')
@@ -0,0 +1,67 @@
+# test_profiles.py
+from datetime import date, time, timedelta
+
+import pytest
+from metrics import contar_consultas, presupuesto_consultas, PresupuestoExcedido
+from models import db, Usuario, Restaurante, Favorito, Reserva, Pedido, PedidoItem
+from profiles import cargar_perfil
+
+
+def poblar(n):
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    db.session.add(usuario)
+    db.session.flush()
+    for i in range(n):
+        r = Restaurante(nombre=f"R{i}", tipo_cocina="italiana, pizza")
+        db.session.add(r)
+        db.session.flush()
+        db.session.add(Favorito(usuario_id=usuario.id, restaurante_id=r.id))
+        db.session.add(Reserva(usuario_id=usuario.id, restaurante_id=r.id, fecha=date.today() + timedelta(days=i),
+                               hora=time(20, 0), numero_personas=2))
+        pedido = Pedido(usuario_id=usuario.id, restaurante_id=r.id, codigo_pedido=f"P{i}",
+                        subtotal=10, total=10, metodo_pago='efectivo')
+        pedido.items = [PedidoItem(nombre_item=f"Plato {j}", cantidad=1, precio_unitario=5, subtotal=5)
+                        for j in range(2)]
+        db.session.add(pedido)
+    db.session.commit()
+    usuario_id = usuario.id
+    db.session.expunge_all()
+    return usuario_id
+
+
+def consultas_para(n):
+    usuario_id = poblar(n)
+    with contar_consultas() as sentencias:
+        datos = cargar_perfil(usuario_id, por_pagina=5)
+    return datos, len(sentencias)
+
+
+def test_consultas_constantes(app):
+    _, pocas = consultas_para(1)
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    datos, muchas = consultas_para(12)
+
+    assert pocas == muchas == 5
+    assert len(datos['favorite_restaurantes']) == 12
+    assert len(datos['user_reservas']) == 5 and datos['mas_reservas']
+    assert [len(p['items']) for p in datos['user_pedidos']] == [2] * 5
+    assert datos['favorite_restaurantes'][0]['cocina'] == ['italiana', 'pizza']
+
+
+def test_presupuesto_por_peticion(app, client):
+    @presupuesto_consultas(3)
+    def con_n_mas_uno():
+        return str(sum(len(f.restaurante.nombre) for f in Favorito.query.all()))
+
+    app.add_url_rule('/n-mas-uno', 'n_mas_uno', con_n_mas_uno)
+    usuario_id = poblar(8)
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario_id
+
+    respuesta = client.get('/profile')
+    assert respuesta.status_code == 200
+    assert 'R7' in respuesta.get_data(as_text=True)
+    with pytest.raises(PresupuestoExcedido):
+        client.get('/n-mas-uno')
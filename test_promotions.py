@@ -0,0 +1,128 @@
+# test_promotions.py
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import update
+
+from models import db, Usuario, Restaurante, MenuItem, Promocion, UsoPromocion
+from promotions import PromocionNoDisponible, indice_promociones, registrar_uso
+
+
+def promo(**campos):
+    datos = dict(nombre="Promo", tipo_descuento='porcentaje', valor_descuento=10,
+                 fecha_inicio=date.today() - timedelta(days=1), fecha_fin=date.today() + timedelta(days=1))
+    datos.update(campos)
+    return Promocion(**datos)
+
+
+def preparar():
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurante = Restaurante(nombre="Milano")
+    db.session.add_all([usuario, restaurante])
+    db.session.commit()
+    return usuario, restaurante
+
+
+def test_mejor_descuento(app):
+    usuario, restaurante = preparar()
+    db.session.add_all([
+        promo(nombre="10%", restaurante_id=restaurante.id),
+        promo(nombre="Fijo", tipo_descuento='fijo', valor_descuento=5, minimo_compra=40),
+        promo(nombre="Tope", valor_descuento=50, maximo_descuento=3, restaurante_id=restaurante.id),
+        promo(nombre="Código", valor_descuento=30, codigo_promo="VERANO"),
+        promo(nombre="Sólo local", valor_descuento=40, aplicable_local=True),
+        promo(nombre="Noche", valor_descuento=25, hora_inicio=time(22, 0), hora_fin=time(2, 0)),
+    ])
+    db.session.commit()
+    indice_promociones.refrescar(forzar=True)
+    mediodia = datetime.combine(date.today(), time(13, 0))
+    noche = datetime.combine(date.today(), time(23, 30))
+
+    elegida, monto = indice_promociones.mejor(restaurante.id, Decimal('30'), ahora=mediodia)
+    assert monto == Decimal('3.00')
+    elegida, monto = indice_promociones.mejor(restaurante.id, Decimal('50'), ahora=mediodia)
+    assert monto == Decimal('5.00')
+    elegida, monto = indice_promociones.mejor(restaurante.id, Decimal('50'), codigo='verano', ahora=mediodia)
+    assert monto == Decimal('15.00')
+    elegida, monto = indice_promociones.mejor(restaurante.id, Decimal('50'), modalidad='local', ahora=mediodia)
+    assert monto == Decimal('20.00')
+    elegida, monto = indice_promociones.mejor(restaurante.id, Decimal('50'), ahora=noche)
+    assert monto == Decimal('12.50')
+
+
+def test_limite_de_usos(app):
+    usuario, restaurante = preparar()
+    p = promo(limite_usos=2)
+    db.session.add(p)
+    db.session.commit()
+    indice_promociones.refrescar(forzar=True)
+    compilada = indice_promociones.candidatas(restaurante.id)[0]
+
+    registrar_uso(compilada, usuario.id, None, Decimal('1'))
+    registrar_uso(compilada, None, None, Decimal('1'))
+    db.session.commit()
+    with pytest.raises(PromocionNoDisponible):
+        registrar_uso(compilada, None, None, Decimal('1'))
+    db.session.rollback()
+
+    db.session.refresh(p)
+    assert p.usos_actuales == 2
+    assert p.estado == 'agotado'
+    assert UsoPromocion.query.count() == 2
+
+
+def test_pedido_con_codigo(app, client):
+    usuario, restaurante = preparar()
+    plato = MenuItem(restaurante_id=restaurante.id, nombre="Pizza", precio=20)
+    db.session.add_all([plato, promo(codigo_promo="UNA", valor_descuento=50, tipo_uso='unico')])
+    db.session.commit()
+    indice_promociones.sucio = True
+    app.config['PEDIDOS_TASA_IMPUESTO'] = '0'
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+
+    cuerpo = {'restaurant_id': restaurante.id, 'items': [{'menu_item_id': plato.id}], 'codigo_promo': 'una'}
+    pedido = client.post('/api/orders', json=cuerpo).get_json()['pedido']
+    assert pedido['descuento'] == 10.0
+    assert pedido['total'] == 10.0
+
+    # tipo_uso único: el segundo pedido se rechaza entero
+    assert client.post('/api/orders', json=cuerpo).status_code == 400
+    assert UsoPromocion.query.count() == 1
+
+
+def test_promocion_automatica_no_bloquea_pedidos(app, client):
+    usuario, restaurante = preparar()
+    plato = MenuItem(restaurante_id=restaurante.id, nombre="Pizza", precio=20)
+    unica = promo(nombre="Bienvenida", valor_descuento=50, tipo_uso='unico', restaurante_id=restaurante.id)
+    db.session.add_all([plato, unica])
+    db.session.commit()
+    indice_promociones.sucio = True
+    app.config['PEDIDOS_TASA_IMPUESTO'] = '0'
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    cuerpo = {'restaurant_id': restaurante.id, 'items': [{'menu_item_id': plato.id}]}
+
+    assert client.post('/api/orders', json=cuerpo).get_json()['pedido']['descuento'] == 10.0
+    # Ya usada: el segundo pedido se acepta sin ese descuento
+    segundo = client.post('/api/orders', json=cuerpo)
+    assert segundo.status_code == 201 and segundo.get_json()['pedido']['total'] == 20.0
+
+    # Agotada en la base pero aún en el índice de este proceso
+    agotable = promo(nombre="Flash", valor_descuento=25, limite_usos=1, usos_actuales=1,
+                     restaurante_id=restaurante.id)
+    db.session.add(agotable)
+    db.session.commit()
+    indice_promociones.refrescar(forzar=True)
+    db.session.execute(update(Promocion).where(Promocion.id == agotable.id).values(estado='agotado'))
+    db.session.commit()
+    tercero = client.post('/api/orders', json=cuerpo)
+    assert tercero.status_code == 201 and tercero.get_json()['pedido']['descuento'] == 0.0
+    assert UsoPromocion.query.filter_by(usuario_unico=usuario.id).count() == 1
+
+    # La restricción única cubre dos usos simultáneos que pasaran el filtro
+    compilada = next(p for p in indice_promociones.candidatas(restaurante.id) if p.id == unica.id)
+    with pytest.raises(PromocionNoDisponible):
+        registrar_uso(compilada, usuario.id, None, Decimal('1'))
+    db.session.rollback()
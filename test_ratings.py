@@ -0,0 +1,60 @@
+# test_ratings.py
+from models import db, Usuario, Restaurante, Reseña
+from ratings import reconciliar
+
+
+def preparar():
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurante = Restaurante(nombre="Milano")
+    db.session.add_all([usuario, restaurante])
+    db.session.commit()
+    return usuario, restaurante
+
+
+def resena(usuario, restaurante, calificacion, estado='pendiente'):
+    r = Reseña(usuario_id=usuario.id, restaurante_id=restaurante.id, calificacion=calificacion, estado=estado)
+    db.session.add(r)
+    db.session.commit()
+    return r
+
+
+def test_transiciones_de_estado(app):
+    usuario, restaurante = preparar()
+
+    pendiente = resena(usuario, restaurante, 5)
+    assert restaurante.numero_reviews == 0
+
+    pendiente.estado = 'aprobada'
+    db.session.commit()
+    assert (restaurante.numero_reviews, float(restaurante.rating)) == (1, 5.0)
+
+    otra = resena(usuario, restaurante, 2, estado='aprobada')
+    assert (restaurante.numero_reviews, float(restaurante.rating)) == (2, 3.5)
+
+    otra.calificacion = 4
+    db.session.commit()
+    assert float(restaurante.rating) == 4.5
+
+    pendiente.estado = 'rechazada'
+    db.session.commit()
+    assert (restaurante.numero_reviews, float(restaurante.rating)) == (1, 4.0)
+
+    db.session.delete(otra)
+    db.session.commit()
+    assert (restaurante.numero_reviews, float(restaurante.rating)) == (0, 0.0)
+
+
+def test_reconciliacion(app):
+    usuario, restaurante = preparar()
+    resena(usuario, restaurante, 4, estado='aprobada')
+    resena(usuario, restaurante, 3, estado='aprobada')
+    assert reconciliar(tamano_lote=1) == []
+
+    # Simular una deriva escrita por fuera de la aplicación
+    restaurante.numero_reviews = 7
+    db.session.commit()
+    diferencias = reconciliar(tamano_lote=1)
+    assert diferencias == [{'restaurante_id': restaurante.id, 'guardado': (7, 7), 'real': (7, 2)}]
+
+    db.session.refresh(restaurante)
+    assert (restaurante.numero_reviews, float(restaurante.rating)) == (2, 3.5)
@@ -0,0 +1,113 @@
+# test_reservations.py
+import re
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db, Usuario, Restaurante, HorarioRestaurante, Reserva
+from reservations import DIAS_SEMANA, ReservaNoDisponible, cache_disponibilidad, disponibilidad_del_dia, reservar
+
+
+def preparar(app):
+    app.config['RESERVAS_CAPACIDAD'] = {'interior': 4, 'terraza': 2}
+    app.config['RESERVAS_DURACION_MINUTOS'] = 60
+    cache_disponibilidad.clear()
+
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurante = Restaurante(nombre="Milano")
+    db.session.add_all([usuario, restaurante])
+    db.session.flush()
+    fecha = date.today() + timedelta(days=7)
+    db.session.add(HorarioRestaurante(restaurante_id=restaurante.id, dia_semana=DIAS_SEMANA[fecha.weekday()],
+                                      hora_apertura=time(19, 0), hora_cierre=time(22, 0)))
+    db.session.commit()
+    return usuario, restaurante, fecha
+
+
+def test_huecos_segun_horario(app):
+    usuario, restaurante, fecha = preparar(app)
+
+    huecos = disponibilidad_del_dia(restaurante.id, fecha).huecos_libres(2)
+    assert [h['hora'] for h in huecos] == ['19:00', '19:30', '20:00', '20:30', '21:00']
+
+    # Otro día de la semana no tiene horario
+    assert disponibilidad_del_dia(restaurante.id, fecha + timedelta(days=1)) is None
+
+
+def test_reserva_ocupa_capacidad(app):
+    usuario, restaurante, fecha = preparar(app)
+
+    reservar(usuario.id, restaurante.id, fecha, time(20, 0), 4)
+    reserva = Reserva.query.one()
+    assert reserva.zona_mesa == 'interior'
+    assert reserva.codigo_reserva
+
+    # El interior está lleno de 20:00 a 21:00, la terraza sigue libre para 2
+    huecos = {h['hora']: h['zonas'] for h in disponibilidad_del_dia(restaurante.id, fecha).huecos_libres(2)}
+    assert huecos['20:00'] == ['terraza']
+    assert huecos['21:00'] == ['interior', 'terraza']
+
+    with pytest.raises(ReservaNoDisponible):
+        reservar(usuario.id, restaurante.id, fecha, time(20, 30), 3)
+    assert Reserva.query.count() == 1
+
+
+def test_ruta_reserve(app, client):
+    usuario, restaurante, fecha = preparar(app)
+    datos = {'restaurant_id': restaurante.id, 'date': fecha.isoformat(), 'time': '19:00', 'guests': 2}
+
+    assert client.post('/reserve', data=datos).status_code == 401
+
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    respuesta = client.post('/reserve', data=datos)
+    assert respuesta.get_json()['success'] is True
+
+    datos['guests'] = 5
+    respuesta = client.post('/reserve', data=datos)
+    assert respuesta.status_code == 409
+
+    slots = client.get(f'/api/v1/restaurants/{restaurante.id}/availability?date={fecha}&guests=4').get_json()['slots']
+    assert '19:00' not in [s['hora'] for s in slots]
+
+
+def test_horario_despues_de_medianoche(app):
+    usuario, restaurante, fecha = preparar(app)
+    horario = HorarioRestaurante.query.one()
+    horario.hora_apertura, horario.hora_cierre = time(20, 0), time(2, 0)
+    db.session.commit()
+
+    huecos = [h['hora'] for h in disponibilidad_del_dia(restaurante.id, fecha).huecos_libres(2)]
+    assert huecos[-2:] == ['00:30', '01:00']
+
+    # Las de la madrugada se pueden reservar y ocupan su tramo
+    reservar(usuario.id, restaurante.id, fecha, time(0, 30), 4)
+    reservar(usuario.id, restaurante.id, fecha, time(0, 30), 2)
+    with pytest.raises(ReservaNoDisponible):
+        reservar(usuario.id, restaurante.id, fecha, time(1, 0), 1)
+    huecos = {h['hora']: h['zonas'] for h in disponibilidad_del_dia(restaurante.id, fecha).huecos_libres(1)}
+    assert '00:30' not in huecos and huecos['23:00'] == ['interior', 'terraza']
+
+
+def test_reservas_se_leen_tras_el_bloqueo(app):
+    usuario, restaurante, fecha = preparar(app)
+    usuario_id, restaurante_id = usuario.id, restaurante.id
+    db.session.expunge_all()
+    lecturas = []
+
+    def anotar(estado):
+        if estado.is_select:
+            sql = str(estado.statement)
+            lecturas.append((re.search(r'FROM (\w+)', sql).group(1), 'FOR UPDATE' in sql))
+
+    event.listen(db.session, 'do_orm_execute', anotar)
+    try:
+        reservar(usuario_id, restaurante_id, fecha, time(20, 0), 2)
+    finally:
+        event.remove(db.session, 'do_orm_execute', anotar)
+
+    # Nada se lee antes del bloqueo y las reservas se leen también bloqueando
+    assert lecturas[0] == ('horarios_restaurantes', True)
+    assert ('reservas', True) in lecturas
+    assert all(bloqueo for tabla, bloqueo in lecturas)
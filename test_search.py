@@ -0,0 +1,90 @@
+# test_search.py
+from models import db, Restaurante, MenuItem
+from search import indice, normalizar, tokenizar
+
+
+def crear_restaurantes():
+    milano = Restaurante(nombre="Milano Italiano", tipo_cocina="italiana",
+                         descripcion="Auténtica cocina italiana.", rating=4.8)
+    sakura = Restaurante(nombre="Sakura Sushi", tipo_cocina="japonesa",
+                         descripcion="Sushi fresco y auténtico.", rating=4.9)
+    db.session.add_all([milano, sakura])
+    db.session.flush()
+    db.session.add(MenuItem(restaurante_id=milano.id, nombre="Lasaña Boloñesa", precio=12))
+    db.session.commit()
+    return milano, sakura
+
+
+def test_normalizacion():
+    assert normalizar("Lasaña Auténtica") == "lasana autentica"
+    assert tokenizar("Tempura de Camarón!") == ["tempura", "de", "camaron"]
+
+
+def test_busqueda_por_prefijo_y_acentos(app, client):
+    indice.reiniciar()
+    milano, sakura = crear_restaurantes()
+
+    data = client.get('/api/search?q=lasa').get_json()
+    assert [r['id'] for r in data['results']] == [milano.id]
+
+    data = client.get('/api/search?q=AUTENT').get_json()
+    assert data['total'] == 2
+
+    data = client.get('/api/search?q=sushi japo').get_json()
+    assert [r['id'] for r in data['results']] == [sakura.id]
+
+
+def test_ranking_y_paginacion(app, client):
+    indice.reiniciar()
+    milano, sakura = crear_restaurantes()
+
+    # Coincidencia en el nombre pesa más que en la descripción
+    db.session.add(MenuItem(restaurante_id=milano.id, nombre="Sushi italiano", precio=10))
+    db.session.commit()
+    indice.sincronizar(forzar=True)
+    data = client.get('/api/search?q=sushi').get_json()
+    assert [r['id'] for r in data['results']] == [sakura.id, milano.id]
+
+    data = client.get('/api/search?q=aut&per_page=1&page=2').get_json()
+    assert data['total'] == 2
+    assert len(data['results']) == 1
+
+
+def test_actualizacion_incremental(app, client):
+    indice.reiniciar()
+    milano, sakura = crear_restaurantes()
+    app.config['SEARCH_SYNC_INTERVAL'] = 0
+
+    assert client.get('/api/search?q=tacos').get_json()['total'] == 0
+
+    db.session.add(MenuItem(restaurante_id=sakura.id, nombre="Tacos de atún", precio=9))
+    db.session.commit()
+    data = client.get('/api/search?q=tacos').get_json()
+    assert [r['id'] for r in data['results']] == [sakura.id]
+
+    milano.estado = 'inactivo'
+    db.session.commit()
+    assert client.get('/api/search?q=milano').get_json()['total'] == 0
+
+
+def test_borrados_salen_del_indice(app, client):
+    indice.reiniciar()
+    milano, sakura = crear_restaurantes()
+    otro = Restaurante(nombre="Trattoria")
+    db.session.add(otro)
+    db.session.add(MenuItem(restaurante_id=sakura.id, nombre="Ramen", precio=9))
+    db.session.commit()
+    indice.sincronizar(forzar=True)
+    assert client.get('/api/search?q=ramen').get_json()['total'] == 1
+
+    # Ni el borrado ni el cambio de restaurante tocan el updated_at del que pierde el plato
+    MenuItem.query.filter_by(nombre="Lasaña Boloñesa").delete()
+    ramen = MenuItem.query.filter_by(nombre="Ramen").one()
+    ramen.restaurante_id = otro.id
+    db.session.delete(milano)
+    db.session.commit()
+    indice.sincronizar(forzar=True)
+
+    assert client.get('/api/search?q=milano').get_json()['total'] == 0
+    assert client.get('/api/search?q=lasana').get_json()['total'] == 0
+    assert [r['id'] for r in client.get('/api/search?q=ramen').get_json()['results']] == [otro.id]
@@ -0,0 +1,58 @@
+# test_settings.py
+from datetime import datetime, timedelta
+
+from metrics import contar_consultas
+from models import db, ConfiguracionSistema
+from settings import ajustes, guardar
+
+
+def test_valores_tipados_y_sin_consultas(app):
+    db.session.add_all([
+        ConfiguracionSistema(clave='pedidos.tasa_impuesto', valor='0.21', tipo='numero', grupo='pedidos'),
+        ConfiguracionSistema(clave='pedidos.maximo', valor='30', tipo='numero', grupo='pedidos'),
+        ConfiguracionSistema(clave='mantenimiento', valor='sí', tipo='booleano'),
+        ConfiguracionSistema(clave='portada', valor='{"banners": [1, 2]}', tipo='json', grupo='web'),
+        ConfiguracionSistema(clave='roto', valor='x', tipo='numero'),
+    ])
+    db.session.commit()
+    ajustes.configurar(60)
+
+    assert ajustes.get('pedidos.tasa_impuesto') == 0.21 and ajustes.get('pedidos.maximo') == 30
+    assert ajustes.get('mantenimiento') is True
+    assert ajustes.get('portada') == {'banners': [1, 2]}
+    assert ajustes.get('roto', 'defecto') == 'defecto'
+    assert dict(ajustes.grupo('pedidos')) == {'pedidos.tasa_impuesto': 0.21, 'pedidos.maximo': 30}
+    with contar_consultas() as sentencias:
+        for _ in range(100):
+            ajustes.get('mantenimiento')
+            ajustes.grupo('web')
+    assert sentencias == []
+
+    # Un cambio de otro worker (aquí, por SQL) se ve al pasar el intervalo
+    db.session.execute(db.update(ConfiguracionSistema).where(ConfiguracionSistema.clave == 'mantenimiento')
+                       .values(valor='no', updated_at=datetime.utcnow() + timedelta(seconds=1)))
+    db.session.commit()
+    assert ajustes.get('mantenimiento') is True
+    ajustes._comprobado -= 60
+    assert ajustes.get('mantenimiento') is False
+
+    # Las escrituras de este proceso se ven enseguida
+    guardar('pedidos.maximo', 40)
+    assert ajustes.get('pedidos.maximo') == 40
+
+
+def test_api_de_administracion(app, client):
+    app.config['ADMIN_API_TOKEN'] = 'secreto'
+    cabeceras = {'Authorization': 'Bearer secreto'}
+    guardar('pedidos.costo_envio', 2.5, tipo='numero', grupo='pedidos')
+    db.session.add(ConfiguracionSistema(clave='interno', valor='1', tipo='numero', editable=False))
+    db.session.commit()
+
+    assert client.get('/api/admin/settings?grupo=pedidos',
+                      headers=cabeceras).get_json()['settings'] == {'pedidos.costo_envio': 2.5}
+    respuesta = client.put('/api/admin/settings/pedidos.costo_envio', json={'valor': 3}, headers=cabeceras)
+    assert respuesta.get_json()['valor'] == 3
+    assert client.put('/api/admin/settings/pedidos.costo_envio', json={'valor': 'gratis'},
+                      headers=cabeceras).status_code == 400
+    assert client.put('/api/admin/settings/interno', json={'valor': 2}, headers=cabeceras).status_code == 403
+    assert client.put('/api/admin/settings/nada', json={'valor': 2}, headers=cabeceras).status_code == 404
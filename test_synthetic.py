@@ -0,0 +1,54 @@
+# test_synthetic.py
+from datetime import date
+
+from sqlalchemy import func
+
+from models import db, Usuario, Restaurante, MenuItem, Pedido, PedidoItem, Reseña, Promocion, UsoPromocion
+from synthetic import Generador
+
+HASTA = date(2026, 1, 15)
+
+
+def generar(semilla=7):
+    return Generador(semilla, tamano_lote=50, hasta=HASTA).generar(
+        usuarios=30, restaurantes=5, platos=6, reservas=20, pedidos=200)
+
+
+def huella():
+    return (
+        [(u.email, u.estado) for u in Usuario.query.order_by(Usuario.id)],
+        [(p.restaurante_id, float(p.total)) for p in Pedido.query.order_by(Pedido.id)],
+        [(r.id, float(r.rating), r.numero_reviews) for r in Restaurante.query.order_by(Restaurante.id)],
+    )
+
+
+def test_determinista(app):
+    insertadas = generar()
+    assert insertadas['pedidos'] == 200 and insertadas['menu_items'] == 30
+    primera = huella()
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    generar()
+    assert huella() == primera
+
+
+def test_integridad(app):
+    generar()
+    # Cada línea apunta a un plato del restaurante del pedido
+    cruzadas = (db.session.query(func.count(PedidoItem.id))
+                .join(Pedido, Pedido.id == PedidoItem.pedido_id)
+                .join(MenuItem, MenuItem.id == PedidoItem.menu_item_id)
+                .filter(MenuItem.restaurante_id != Pedido.restaurante_id)
+                .scalar())
+    assert cruzadas == 0
+    assert db.session.query(func.count(PedidoItem.id)).scalar() >= 200
+
+    for pedido in Pedido.query:
+        assert sum(i.subtotal for i in pedido.items) == pedido.subtotal
+        assert pedido.total == pedido.subtotal + pedido.impuestos + pedido.costo_envio - pedido.descuento
+
+    aprobadas = Reseña.query.filter_by(estado='aprobada').count()
+    assert db.session.query(func.sum(Restaurante.numero_reviews)).scalar() == aprobadas
+    assert (db.session.query(func.sum(Promocion.usos_actuales)).scalar() or 0) == UsoPromocion.query.count()
@@ -0,0 +1,90 @@
+# test_tracking.py
+import json
+
+import pytest
+
+from models import db, Usuario, Restaurante, Pedido, EventoPedido
+from tracking import bus, cambiar_estado, TransicionInvalida
+
+
+def preparar(client):
+    usuario = Usuario(nombre="Ana", apellido="Soto", email="ana@test.com", password_hash="x")
+    restaurante = Restaurante(nombre="Milano")
+    db.session.add_all([usuario, restaurante])
+    db.session.flush()
+    pedido = Pedido(usuario_id=usuario.id, restaurante_id=restaurante.id, subtotal=10, total=10,
+                    metodo_pago='efectivo')
+    db.session.add(pedido)
+    db.session.commit()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario.id
+    return pedido.id, restaurante.id
+
+
+def eventos(texto):
+    return [json.loads(linea[6:]) for linea in texto.splitlines() if linea.startswith('data: ')]
+
+
+def test_transiciones_y_repeticion_con_last_event_id(app, client):
+    pedido_id, restaurante_id = preparar(client)
+    cocina = bus.suscribir((f'restaurante:{restaurante_id}',))
+
+    cambiar_estado(pedido_id, 'preparando')
+    with pytest.raises(TransicionInvalida):
+        cambiar_estado(pedido_id, 'entregado')
+    cambiar_estado(pedido_id, 'enviado')
+    cambiar_estado(pedido_id, 'entregado')
+    bus.cancelar(cocina)
+
+    assert [e['estado'] for e in cocina.esperar(0)] == ['preparando', 'enviado', 'entregado']
+    pedido = db.session.get(Pedido, pedido_id)
+    assert pedido.fecha_preparacion <= pedido.fecha_envio <= pedido.fecha_entrega
+    ids = [e.id for e in EventoPedido.query.order_by(EventoPedido.id)]
+    assert len(ids) == 4
+
+    # Reconexión: sólo lo que faltó, y el stream se cierra en el estado final
+    respuesta = client.get(f'/api/orders/{pedido_id}/events', headers={'Last-Event-ID': str(ids[1])})
+    assert respuesta.mimetype == 'text/event-stream'
+    assert [e['estado'] for e in eventos(respuesta.get_data(as_text=True))] == ['enviado', 'entregado']
+    # Ya no queda nada: 204 para que el navegador no reintente
+    respuesta = client.get(f'/api/orders/{pedido_id}/events', headers={'Last-Event-ID': str(ids[-1])})
+    assert respuesta.status_code == 204
+
+    assert client.get('/api/orders/999/events').status_code == 404
+    assert client.get(f'/api/restaurants/{restaurante_id}/orders/events').status_code == 404
+
+
+def test_stream_en_vivo(app, client):
+    pedido_id, restaurante_id = preparar(client)
+    app.config['ADMIN_API_TOKEN'] = 'secreto'
+    cabeceras = {'Authorization': 'Bearer secreto'}
+
+    respuesta = client.get(f'/api/orders/{pedido_id}/events', buffered=False)
+    partes = iter(respuesta.response)
+    assert next(partes).startswith(b'retry:')
+    # Sin Last-Event-ID el primer evento es el estado actual
+    assert eventos(next(partes).decode())[0]['estado'] == 'pendiente'
+
+    cambio = client.post(f'/api/admin/orders/{pedido_id}/status', json={'estado': 'preparando'}, headers=cabeceras)
+    assert cambio.get_json()['pedido']['estado'] == 'preparando'
+    assert eventos(next(partes).decode())[0]['estado'] == 'preparando'
+
+    assert client.post(f'/api/admin/orders/{pedido_id}/status', json={'estado': 'pendiente'},
+                       headers=cabeceras).status_code == 409
+    respuesta.close()
+    assert not bus._canales
+
+
+def test_maximo_de_streams_por_proceso(app, client):
+    pedido_id, _ = preparar(client)
+    app.config['PEDIDOS_SSE_MAXIMO'] = 1
+
+    abierta = client.get(f'/api/orders/{pedido_id}/events', buffered=False)
+    rechazada = client.get(f'/api/orders/{pedido_id}/events')
+    assert rechazada.status_code == 503 and rechazada.headers['Retry-After']
+    abierta.close()
+    assert bus.abiertas == 0
+
+    otra = client.get(f'/api/orders/{pedido_id}/events', buffered=False)
+    assert otra.status_code == 200
+    otra.close()
@@ -0,0 +1,353 @@
+# tracking.py - Estado de los pedidos en vivo con Server-Sent Events
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, session
+from sqlalchemy import event, func, insert, inspect
+from sqlalchemy.orm import Session
+
+from auth import requiere_admin
+from models import db, Pedido, EventoPedido, Restaurante
+from orders import serializar_pedido
+
+tracking_bp = Blueprint('tracking', __name__)
+
+TRANSICIONES = {
+    'pendiente': ('preparando', 'cancelado', 'rechazado'),
+    'preparando': ('enviado', 'cancelado'),
+    'enviado': ('entregado',),
+}
+FINALES = ('entregado', 'cancelado', 'rechazado')
+FECHAS = {'preparando': 'fecha_preparacion', 'enviado': 'fecha_envio', 'entregado': 'fecha_entrega'}
+
+RECONEXION_MS = 3000
+# Segundos que se pide esperar cuando el proceso ya tiene su máximo de streams
+REINTENTO_SATURADO = 15
+MAXIMO_REPETIDOS = 500
+
+
+class TransicionInvalida(Exception):
+    pass
+
+
+# ====================================================
+# TRANSICIONES
+# ====================================================
+
+def cambiar_estado(pedido_id, estado):
+    # Devuelve el pedido o None si no existe
+    pedido = db.session.get(Pedido, pedido_id, with_for_update=True)
+    if pedido is None:
+        return None
+    if estado not in TRANSICIONES.get(pedido.estado, ()):
+        db.session.rollback()
+        raise TransicionInvalida(f'Un pedido {pedido.estado} no puede pasar a {estado}.')
+    pedido.estado = estado
+    if estado in FECHAS:
+        setattr(pedido, FECHAS[estado], datetime.utcnow())
+    db.session.commit()
+    return pedido
+
+
+def _serializar(evento):
+    return {
+        'id': evento.id,
+        'pedido_id': evento.pedido_id,
+        'restaurante_id': evento.restaurante_id,
+        'estado': evento.estado,
+        'fecha': evento.created_at.isoformat() if evento.created_at else None,
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_eventos(session, flush_context):
+    # Cada cambio de estado (y cada pedido nuevo) deja una fila en
+    # pedido_eventos en la misma transacción; se publica tras el commit
+    cambios = []
+    for obj in session.new:
+        if isinstance(obj, Pedido):
+            cambios.append((obj, inspect(obj).dict.get('estado') or 'pendiente'))
+    for obj in session.dirty:
+        if isinstance(obj, Pedido):
+            historial = inspect(obj).attrs.estado.history
+            if historial.added and historial.added[0] not in historial.deleted:
+                cambios.append((obj, historial.added[0]))
+    if not cambios:
+        return
+    conexion = session.connection()
+    pendientes = session.info.setdefault('pedido_eventos', [])
+    for pedido, estado in cambios:
+        fila = {'pedido_id': pedido.id, 'restaurante_id': pedido.restaurante_id, 'estado': estado,
+                'created_at': datetime.utcnow()}
+        resultado = conexion.execute(insert(EventoPedido.__table__).values(**fila))
+        pendientes.append(_serializar(EventoPedido(id=resultado.inserted_primary_key[0], **fila)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publicar(session):
+    for evento in session.info.pop('pedido_eventos', ()):
+        bus.publicar(evento)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, previous_transaction):
+    session.info.pop('pedido_eventos', None)
+
+
+# ====================================================
+# PUB/SUB EN EL PROCESO
+# ====================================================
+# Cada conexión abierta es una Suscripcion: una cola corta y un Event en el
+# que el hilo espera sin consultar nada. Publicar es repartir el evento a las
+# suscripciones de sus canales (pedido:<id> y restaurante:<id>).
+
+class Suscripcion:
+    def __init__(self, canales, maximo=100):
+        self.canales = canales
+        self.abierta = True
+        self._eventos = deque(maxlen=maximo)
+        self._aviso = threading.Event()
+        # El mismo evento puede llegar publicado en este proceso y desde el relevo
+        self._vistos = deque(maxlen=256)
+
+    def entregar(self, evento):
+        self._eventos.append(evento)
+        self._aviso.set()
+
+    def visto(self, evento_id):
+        if evento_id in self._vistos:
+            return True
+        self._vistos.append(evento_id)
+        return False
+
+    def esperar(self, timeout):
+        if not self._eventos:
+            self._aviso.wait(timeout)
+        self._aviso.clear()
+        eventos = []
+        while self._eventos:
+            evento = self._eventos.popleft()
+            if not self.visto(evento['id']):
+                eventos.append(evento)
+        return eventos
+
+
+class Bus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._canales = {}
+        self.abiertas = 0
+
+    def suscribir(self, canales, limite=None):
+        # None si ya hay `limite` suscripciones abiertas en este proceso
+        suscripcion = Suscripcion(canales)
+        with self._lock:
+            if limite and self.abiertas >= limite:
+                return None
+            self.abiertas += 1
+            for canal in canales:
+                self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        # Idempotente: la cancelan tanto el generador como call_on_close
+        with self._lock:
+            if not suscripcion.abierta:
+                return
+            suscripcion.abierta = False
+            self.abiertas -= 1
+            for canal in suscripcion.canales:
+                grupo = self._canales.get(canal)
+                if grupo is not None:
+                    grupo.discard(suscripcion)
+                    if not grupo:
+                        del self._canales[canal]
+
+    def publicar(self, evento):
+        with self._lock:
+            destinos = set()
+            for canal in (f'pedido:{evento["pedido_id"]}', f'restaurante:{evento["restaurante_id"]}'):
+                destinos.update(self._canales.get(canal, ()))
+        for suscripcion in destinos:
+            suscripcion.entregar(evento)
+
+
+bus = Bus()
+
+
+# ====================================================
+# RELEVO ENTRE WORKERS
+# ====================================================
+# Sustituto local de un broker: cada worker, desde su primera conexión,
+# lee pedido_eventos una vez por intervalo y reparte lo que publicaron los
+# demás workers. Es una consulta por proceso, no una por cliente. Se relee
+# un margen de ids por debajo del último visto porque dos transacciones
+# pueden confirmar sus ids fuera de orden.
+
+class Relevo:
+    MARGEN = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def asegurar(self, app):
+        # Arranca con la primera conexión de cada proceso (los hilos no
+        # sobreviven al fork de gunicorn --preload)
+        if not app.config.get('PEDIDOS_RELEVO_ENABLED', True) or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._trabajar, args=(app,), name='relevo-pedidos', daemon=True).start()
+
+    def _trabajar(self, app):
+        intervalo = app.config.get('PEDIDOS_RELEVO_INTERVAL', 1.0)
+        publicados = deque(maxlen=1000)
+        with app.app_context():
+            ultimo = db.session.query(func.max(EventoPedido.id)).scalar() or 0
+            publicados.extend(i for i, in db.session.query(EventoPedido.id).filter(EventoPedido.id > ultimo - self.MARGEN))
+            db.session.remove()
+            while True:
+                time.sleep(intervalo)
+                try:
+                    filas = (EventoPedido.query
+                             .filter(EventoPedido.id > ultimo - self.MARGEN)
+                             .order_by(EventoPedido.id)
+                             .limit(MAXIMO_REPETIDOS)
+                             .all())
+                    for fila in filas:
+                        if fila.id not in publicados:
+                            publicados.append(fila.id)
+                            bus.publicar(_serializar(fila))
+                        ultimo = max(ultimo, fila.id)
+                except Exception:
+                    app.logger.exception('Relevo de eventos de pedidos')
+                finally:
+                    db.session.remove()
+
+
+relevo = Relevo()
+
+
+# ====================================================
+# STREAMS
+# ====================================================
+
+def _formatear(evento):
+    return f'id: {evento["id"]}\nevent: estado\ndata: {json.dumps(evento)}\n\n'
+
+
+def _ultimo_evento_id():
+    # El navegador la manda sola al reconectar; ?last_event_id para clientes que no
+    valor = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        return int(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _transmitir(canal, filtro, solo_ultimo=False, terminar_en_final=False, terminado=False):
+    # Se suscribe antes de leer el historial para no perder nada entre
+    # medias; los repetidos se descartan por id. La conexión a la base se
+    # devuelve al pool antes de empezar a transmitir: una conexión inactiva
+    # sólo ocupa un hilo esperando en un Event. Aun así ese hilo no atiende
+    # otra cosa, por eso hay un máximo por proceso (PEDIDOS_SSE_MAXIMO, ver
+    # gunicorn.conf.py); pasado el máximo se responde 503 y script.js
+    # reintenta más tarde.
+    app = current_app._get_current_object()
+    suscripcion = bus.suscribir((canal,), app.config.get('PEDIDOS_SSE_MAXIMO'))
+    if suscripcion is None:
+        respuesta = jsonify({'success': False, 'error': 'Demasiadas conexiones abiertas'})
+        respuesta.status_code = 503
+        respuesta.headers['Retry-After'] = str(REINTENTO_SATURADO)
+        return respuesta
+    relevo.asegurar(app)
+    try:
+        ultimo_id = _ultimo_evento_id()
+        consulta = EventoPedido.query.filter(filtro)
+        if ultimo_id is not None:
+            filas = consulta.filter(EventoPedido.id > ultimo_id).order_by(EventoPedido.id).limit(MAXIMO_REPETIDOS).all()
+        elif solo_ultimo:
+            filas = consulta.order_by(EventoPedido.id.desc()).limit(1).all()
+        else:
+            filas = []
+        repetidos = [_serializar(f) for f in filas]
+    finally:
+        db.session.close()
+
+    if terminado and not repetidos and ultimo_id is not None:
+        # Reconexión a un pedido ya terminado: 204 hace que EventSource no reintente
+        bus.cancelar(suscripcion)
+        return Response(status=204)
+
+    latido = app.config.get('PEDIDOS_SSE_LATIDO', 15)
+    duracion = app.config.get('PEDIDOS_SSE_DURACION', 300)
+
+    def generar():
+        try:
+            yield f'retry: {RECONEXION_MS}\n\n'
+            for evento in repetidos:
+                suscripcion.visto(evento['id'])
+                yield _formatear(evento)
+                if terminar_en_final and evento['estado'] in FINALES:
+                    return
+            # Pasada la duración máxima se cierra y el cliente reconecta con
+            # Last-Event-ID: ningún hilo queda tomado indefinidamente
+            limite = time.monotonic() + duracion
+            while (restante := limite - time.monotonic()) > 0:
+                eventos = suscripcion.esperar(min(latido, restante))
+                if not eventos:
+                    yield ': latido\n\n'
+                for evento in eventos:
+                    yield _formatear(evento)
+                    if terminar_en_final and evento['estado'] in FINALES:
+                        return
+        finally:
+            bus.cancelar(suscripcion)
+
+    respuesta = Response(generar(), mimetype='text/event-stream',
+                         headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # call_on_close también corre si el cliente se va antes del primer byte
+    respuesta.call_on_close(lambda: bus.cancelar(suscripcion))
+    return respuesta
+
+
+@tracking_bp.route('/api/orders/<int:pedido_id>/events')
+def eventos_pedido(pedido_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'No autenticado'}), 401
+    pedido = db.session.get(Pedido, pedido_id)
+    if pedido is None or pedido.usuario_id != session['user_id']:
+        return jsonify({'success': False, 'error': 'Pedido no encontrado'}), 404
+    # Sin Last-Event-ID se envía el estado actual como primer evento
+    return _transmitir(f'pedido:{pedido_id}', EventoPedido.pedido_id == pedido_id,
+                       solo_ultimo=True, terminar_en_final=True, terminado=pedido.estado in FINALES)
+
+
+@tracking_bp.route('/api/restaurants/<int:restaurante_id>/orders/events')
+def eventos_cocina(restaurante_id):
+    # Para la pantalla de cocina u otros clientes que no son un navegador:
+    # EventSource no puede enviar la cabecera Authorization que pide
+    # requiere_admin (hay que usar un cliente SSE que sí la envíe)
+    requiere_admin()
+    if db.session.get(Restaurante, restaurante_id) is None:
+        return jsonify({'success': False, 'error': 'Restaurante no encontrado'}), 404
+    return _transmitir(f'restaurante:{restaurante_id}', EventoPedido.restaurante_id == restaurante_id)
+
+
+@tracking_bp.route('/api/admin/orders/<int:pedido_id>/status', methods=['POST'])
+def estado_pedido(pedido_id):
+    requiere_admin()
+    estado = (request.get_json(silent=True) or {}).get('estado')
+    try:
+        pedido = cambiar_estado(pedido_id, estado)
+    except TransicionInvalida as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    if pedido is None:
+        return jsonify({'success': False, 'error': 'Pedido no encontrado'}), 404
+    return jsonify({'success': True, 'pedido': serializar_pedido(pedido)})
@@ -0,0 +1,18 @@
+# wsgi.py - Punto de entrada para servidores WSGI
+#
+#   gunicorn wsgi:app                                  (workers e hilos en gunicorn.conf.py)
+#   GUNICORN_ROL=streams PORT=8082 gunicorn wsgi:app   (pool de los streams SSE)
+#
+# Con --preload la aplicación se crea una sola vez en el proceso maestro y
+# los workers la heredan por fork, compartiendo esas páginas de memoria.
+# create_app() no abre conexiones ni arranca hilos, así que nada del maestro
+# queda compartido por error: cada worker abre su propio pool con la primera
+# consulta y arranca sus hilos de logs y métricas con la primera petición.
+#
+# Los streams SSE de tracking.py se sirven desde un pool aparte con muchos
+# hilos: cada conexión abierta espera en su hilo sin conexión a la base, así
+# que SSE_THREADS puede superar DB_POOL_SIZE + DB_MAX_OVERFLOW sin agotar el
+# pool.
+from app import create_app
+
+app = create_app()